@@ -45,9 +45,12 @@ from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
 from nerfstudio.data.dataparsers.nerfstudio_dataparser import NerfstudioDataParserConfig
 from nerfstudio.data.datasets.base_dataset import InputDataset
 from nerfstudio.data.utils.data_utils import identity_collate
-from nerfstudio.data.utils.dataloaders import ImageBatchStream, _undistort_image
+from nerfstudio.data.utils.dataloaders import ImageBatchStream, TrainViewPrefetcher, _undistort_image
+from nerfstudio.data.utils.decoded_image_cache import DecodedImageCache, is_cacheable
+from nerfstudio.utils import writer
 from nerfstudio.utils.misc import get_dict_to_torch, get_orig_class
 from nerfstudio.utils.rich_utils import CONSOLE
+from nerfstudio.utils.writer import EventName
 
 
 @dataclass
@@ -70,8 +73,21 @@ class FullImageDatamanagerConfig(DataManagerConfig):
         - If "disk", keeps images on disk which conserves memory. Datamanager will use parallel dataloader"""
     cache_images_type: Literal["uint8", "float32"] = "float32"
     """The image type returned from manager, caching images in uint8 saves memory"""
+    cache_images_gpu_budget: float = 0.5
+    """With cache_images "gpu", the fraction of free GPU memory the cached train and eval images may use. If the
+    estimated size of the images is larger, they are cached on cpu instead."""
+    prefetch_train_views: int = 2
+    """With cache_images "cpu", number of upcoming training views copied to the device in the background (on a side
+    CUDA stream when training on GPU) while the current step runs. 0 copies synchronously in next_train."""
+    cache_images_packed: bool = True
+    """With cache_images "gpu", copy all images of a split into one contiguous device buffer instead of one
+    allocation per image, which avoids allocator fragmentation and rounding."""
     max_thread_workers: Optional[int] = None
     """The maximum number of threads to use for caching images. If None, uses all available threads."""
+    decoded_image_cache_dir: Optional[Path] = None
+    """If set, decoded and undistorted images are stored in this directory as uint8, keyed by image content, camera
+    parameters and scale factor, and memory-mapped from it on later runs instead of being decoded again. Datasets
+    with extra metadata such as depth are not cached."""
     train_cameras_sampling_strategy: Literal["random", "fps"] = "random"
     """Specifies which sampling strategy is used to generate train cameras, 'random' means sampling 
     uniformly random without replacement, 'fps' means farthest point sampling which is helpful to reduce the artifacts 
@@ -90,6 +106,11 @@ class FullImageDatamanagerConfig(DataManagerConfig):
     More details are described here: https://pytorch.org/docs/stable/data.html#torch.utils.data.DataLoader"""
     cache_compressed_images: bool = False
     """If True, cache raw image files as byte strings to RAM."""
+    disk_cache_max_gb: float = 4.0
+    """With cache_images "disk", host memory in GB for decoded and undistorted train views, reused across epochs
+    instead of decoding them again. Split between the dataloader workers. 0 disables it."""
+    disk_read_ahead: int = 2
+    """With cache_images "disk", number of upcoming train views each dataloader worker decodes in the background."""
 
 
 class FullImageDatamanager(DataManager, Generic[TDataset]):
@@ -122,6 +143,7 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         self.world_size = world_size
         self.local_rank = local_rank
         self.sampler = None
+        self.train_prefetcher: Optional[TrainViewPrefetcher] = None
         self.test_mode = test_mode
         self.test_split = "test" if test_mode in ["test", "inference"] else "val"
         self.dataparser_config = self.config.dataparser
@@ -136,12 +158,17 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         self.train_dataparser_outputs: DataparserOutputs = self.dataparser.get_dataparser_outputs(split="train")
         self.train_dataset = self.create_train_dataset()
         self.eval_dataset = self.create_eval_dataset()
-        if len(self.train_dataset) > 500 and self.config.cache_images == "gpu":
-            CONSOLE.print(
-                "Train dataset has over 500 images, overriding cache_images to cpu. If you still get OOM errors or segfault, please consider seting cache_images to 'disk'",
-                style="bold yellow",
-            )
-            self.config.cache_images = "cpu"
+        if self.config.cache_images == "gpu" and torch.device(self.device).type == "cuda":
+            required = self.estimate_image_cache_bytes()
+            budget = self.config.cache_images_gpu_budget * torch.cuda.mem_get_info(torch.device(self.device))[0]
+            if required > budget:
+                CONSOLE.print(
+                    f"Cached images need about {required / 2**30:.1f} GB, more than the GPU budget of "
+                    f"{budget / 2**30:.1f} GB, overriding cache_images to cpu. Consider cache_images_type uint8, or "
+                    "cache_images 'disk' if you still get OOM errors or segfault",
+                    style="bold yellow",
+                )
+                self.config.cache_images = "cpu"
 
         # Some logic to make sure we sample every camera in equal amounts
         self.train_unseen_cameras = self.sample_train_cameras()
@@ -149,6 +176,18 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         assert len(self.train_unseen_cameras) > 0, "No data found in dataset"
         super().__init__()
 
+    def estimate_image_cache_bytes(self) -> int:
+        """Estimated memory of the cached train and eval images, from the camera resolutions of the datasets."""
+        bytes_per_pixel = 3 * (1 if self.config.cache_images_type == "uint8" else 4)
+        total = 0
+        for dataset in (self.train_dataset, self.eval_dataset):
+            if len(dataset) == 0:
+                continue
+            pixels = int((dataset.cameras.width.long() * dataset.cameras.height.long()).sum().item())
+            has_masks = dataset._dataparser_outputs.mask_filenames is not None
+            total += pixels * (bytes_per_pixel + (1 if has_masks else 0))
+        return total
+
     def sample_train_cameras(self):
         """Return a list of camera indices sampled using the strategy specified by
         self.config.train_cameras_sampling_strategy"""
@@ -210,8 +249,19 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
         else:
             assert_never(split)
 
+        disk_cache = None
+        if self.config.decoded_image_cache_dir is not None:
+            if is_cacheable(dataset):
+                disk_cache = DecodedImageCache(self.config.decoded_image_cache_dir)
+            else:
+                CONSOLE.log(
+                    f"[bold yellow]{type(dataset).__name__} returns metadata, not caching decoded {split} images"
+                )
+        # Images are cached on disk as uint8 and converted afterwards, so cached and fresh runs see the same images
+        image_type = "uint8" if disk_cache is not None else self.config.cache_images_type
+
         def undistort_idx(idx: int) -> Dict[str, torch.Tensor]:
-            data = dataset.get_data(idx, image_type=self.config.cache_images_type)
+            data = dataset.get_data(idx, image_type=image_type)
             camera = dataset.cameras[idx].reshape(())
             assert data["image"].shape[1] == camera.width.item() and data["image"].shape[0] == camera.height.item(), (
                 f"The size of image ({data['image'].shape[1]}, {data['image'].shape[0]}) loaded "
@@ -236,38 +286,81 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
             dataset.cameras.height[idx] = image.shape[0]
             return data
 
-        CONSOLE.log(f"Caching / undistorting {split} images")
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            undistorted_images = list(
-                track(
-                    executor.map(
-                        undistort_idx,
-                        range(len(dataset)),
-                    ),
-                    description=f"Caching / undistorting {split} images",
-                    transient=True,
-                    total=len(dataset),
+        decoded = None
+        if disk_cache is not None:
+            cache_key = disk_cache.key(dataset)
+            decoded = disk_cache.load(cache_key)
+        if decoded is not None:
+            CONSOLE.log(f"Loading decoded {split} images from {disk_cache.entry(cache_key)}")
+            undistorted_images = [
+                {"image_idx": idx, "image": torch.from_numpy(image)} for idx, image in enumerate(decoded.images)
+            ]
+            if decoded.masks is not None:
+                for data, mask in zip(undistorted_images, decoded.masks):
+                    data["mask"] = torch.from_numpy(mask)
+            intrinsics = torch.from_numpy(decoded.intrinsics)
+            for i, name in enumerate(("fx", "fy", "cx", "cy", "width", "height")):
+                values = getattr(dataset.cameras, name)
+                values[:] = intrinsics[:, i : i + 1].to(values.dtype)
+        else:
+            CONSOLE.log(f"Caching / undistorting {split} images")
+            with ThreadPoolExecutor(max_workers=self.config.max_thread_workers) as executor:
+                undistorted_images = list(
+                    track(
+                        executor.map(
+                            undistort_idx,
+                            range(len(dataset)),
+                        ),
+                        description=f"Caching / undistorting {split} images",
+                        transient=True,
+                        total=len(dataset),
+                    )
                 )
-            )
+            if disk_cache is not None:
+                cameras = dataset.cameras
+                intrinsics = torch.cat(
+                    [cameras.fx, cameras.fy, cameras.cx, cameras.cy, cameras.width, cameras.height], dim=1
+                )
+                disk_cache.store(cache_key, undistorted_images, intrinsics.double().numpy())
+        if disk_cache is not None and self.config.cache_images_type == "float32":
+            for data in undistorted_images:
+                data["image"] = data["image"].float() / 255.0
         # Move to device.
         if cache_images_device == "gpu":
+            if self.config.cache_images_packed:
+                self._pack_images(undistorted_images)
             for cache in undistorted_images:
                 cache["image"] = cache["image"].to(self.device)
                 if "mask" in cache:
                     cache["mask"] = cache["mask"].to(self.device)
                 if "depth" in cache:
                     cache["depth"] = cache["depth"].to(self.device)
-                self.train_cameras = self.train_dataset.cameras.to(self.device)
+            self.train_cameras = self.train_dataset.cameras.to(self.device)
         elif cache_images_device == "cpu":
-            for cache in undistorted_images:
-                cache["image"] = cache["image"].pin_memory()
-                if "mask" in cache:
-                    cache["mask"] = cache["mask"].pin_memory()
-                self.train_cameras = self.train_dataset.cameras
+            # Pinned memory makes host to device copies asynchronous, it needs CUDA
+            if torch.cuda.is_available():
+                for cache in undistorted_images:
+                    cache["image"] = cache["image"].pin_memory()
+                    if "mask" in cache:
+                        cache["mask"] = cache["mask"].pin_memory()
+            self.train_cameras = self.train_dataset.cameras
         else:
             assert_never(cache_images_device)
         return undistorted_images
 
+    def _pack_images(self, cached: List[Dict[str, torch.Tensor]]) -> None:
+        """Copy the images into one contiguous device buffer and replace them by views into it."""
+        if len(cached) == 0:
+            return
+        sizes = [cache["image"].numel() for cache in cached]
+        buffer = torch.empty(sum(sizes), dtype=cached[0]["image"].dtype, device=self.device)
+        offset = 0
+        for cache, size in zip(cached, sizes):
+            view = buffer[offset : offset + size].view(cache["image"].shape)
+            view.copy_(cache["image"])
+            cache["image"] = view
+            offset += size
+
     def create_train_dataset(self) -> TDataset:
         """Sets up the data loaders for training"""
         return self.dataset_type(
@@ -320,6 +413,8 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
                 cache_images_type=self.config.cache_images_type,
                 device=self.device,
                 custom_image_processor=self.custom_image_processor,
+                cache_max_bytes=int(self.config.disk_cache_max_gb * 2**30),
+                read_ahead=self.config.disk_read_ahead,
             )
             self.train_image_dataloader = DataLoader(
                 self.train_imagebatch_stream,
@@ -391,27 +486,52 @@ class FullImageDatamanager(DataManager, Generic[TDataset]):
             camera, data = next(self.iter_train_image_dataloader)[0]
             camera = camera.to(self.device)
             data = get_dict_to_torch(data, self.device)
-            print(camera.metadata)
             return camera, data
 
-        image_idx = self.train_unseen_cameras.pop(0)
-        # Make sure to re-populate the unseen cameras list if we have exhausted it
-        if len(self.train_unseen_cameras) == 0:
-            self.train_unseen_cameras = self.sample_train_cameras()
-
-        data = self.cached_train[image_idx]
-        # We're going to copy to make sure we don't mutate the cached dictionary.
-        # This can cause a memory leak: https://github.com/nerfstudio-project/nerfstudio/issues/3335
-        data = data.copy()
-        data["image"] = data["image"].to(self.device)
-
-        assert len(self.train_cameras.shape) == 1, "Assumes single batch dimension"
-        camera = self.train_cameras[image_idx : image_idx + 1].to(self.device)
+        if self.config.cache_images == "cpu" and self.config.prefetch_train_views > 0:
+            if self.train_prefetcher is None:
+                cached_train = self.cached_train
+                assert len(self.train_cameras.shape) == 1, "Assumes single batch dimension"
+                self.train_prefetcher = TrainViewPrefetcher(
+                    self._next_train_index,
+                    cached_train,
+                    self.train_cameras,
+                    self.device,
+                    num_views=self.config.prefetch_train_views,
+                )
+            image_idx, camera, data, copy_time, wait_time = self.train_prefetcher.next()
+            writer.put_time(name=EventName.TRAIN_DATA_WAIT, duration=wait_time, step=step)
+            writer.put_time(name=EventName.TRAIN_DATA_COPY_HIDDEN, duration=max(copy_time - wait_time, 0.0), step=step)
+        else:
+            image_idx = self._next_train_index()
+            data = self.cached_train[image_idx]
+            # We're going to copy to make sure we don't mutate the cached dictionary.
+            # This can cause a memory leak: https://github.com/nerfstudio-project/nerfstudio/issues/3335
+            data = data.copy()
+            data["image"] = data["image"].to(self.device)
+
+            assert len(self.train_cameras.shape) == 1, "Assumes single batch dimension"
+            camera = self.train_cameras[image_idx : image_idx + 1].to(self.device)
         if camera.metadata is None:
             camera.metadata = {}
         camera.metadata["cam_idx"] = image_idx
         return camera, data
 
+    def close_train_prefetcher(self) -> None:
+        """Stops the prefetch thread and releases the views it staged on the device. A later next_train starts a new
+        one."""
+        if self.train_prefetcher is not None:
+            self.train_prefetcher.close()
+            self.train_prefetcher = None
+
+    def _next_train_index(self) -> int:
+        """Pops the index of the next training view."""
+        image_idx = self.train_unseen_cameras.pop(0)
+        # Make sure to re-populate the unseen cameras list if we have exhausted it
+        if len(self.train_unseen_cameras) == 0:
+            self.train_unseen_cameras = self.sample_train_cameras()
+        return image_idx
+
     def next_eval(self, step: int) -> Tuple[Cameras, Dict]:
         """Returns the next evaluation batch
         Returns a Camera instead of raybundle"""
@@ -20,7 +20,7 @@ import sys
 from dataclasses import dataclass, field
 from functools import partial
 from pathlib import Path
-from typing import List, Literal, Optional, Type
+from typing import List, Literal, Optional, Tuple, Type
 
 import numpy as np
 import torch
@@ -399,12 +399,14 @@ class ColmapDataParser(DataParser):
 
     def _load_3D_points(self, colmap_path: Path, transform_matrix: torch.Tensor, scale_factor: float):
         if (colmap_path / "points3D.bin").exists():
-            colmap_points = colmap_utils.read_points3D_binary(colmap_path / "points3D.bin")
+            colmap_points = colmap_utils.read_points3D_binary_columnar(colmap_path / "points3D.bin")
         elif (colmap_path / "points3D.txt").exists():
-            colmap_points = colmap_utils.read_points3D_text(colmap_path / "points3D.txt")
+            colmap_points = colmap_utils.ColmapPoints3D.from_points3D(
+                colmap_utils.read_points3D_text(colmap_path / "points3D.txt")
+            )
         else:
             raise ValueError(f"Could not find points3D.txt or points3D.bin in {colmap_path}")
-        points3D = torch.from_numpy(np.array([p.xyz for p in colmap_points.values()], dtype=np.float32))
+        points3D = torch.from_numpy(colmap_points.xyz.astype(np.float32))
         points3D = (
             torch.cat(
                 (
@@ -418,51 +420,65 @@ class ColmapDataParser(DataParser):
         points3D *= scale_factor
 
         # Load point colours
-        points3D_rgb = torch.from_numpy(np.array([p.rgb for p in colmap_points.values()], dtype=np.uint8))
-        points3D_num_points = torch.tensor([len(p.image_ids) for p in colmap_points.values()], dtype=torch.int64)
+        points3D_rgb = torch.from_numpy(colmap_points.rgb.astype(np.uint8))
+        points3D_num_points = torch.from_numpy(colmap_points.track_lengths.astype(np.int64))
         out = {
             "points3D_xyz": points3D,
             "points3D_rgb": points3D_rgb,
-            "points3D_error": torch.from_numpy(np.array([p.error for p in colmap_points.values()], dtype=np.float32)),
+            "points3D_error": torch.from_numpy(colmap_points.error.astype(np.float32)),
             "points3D_num_points2D": points3D_num_points,
         }
         if self.config.max_2D_matches_per_3D_point != 0:
             if (colmap_path / "images.txt").exists():
-                im_id_to_image = colmap_utils.read_images_text(colmap_path / "images.txt")
+                colmap_images = colmap_utils.ColmapImages.from_images(
+                    colmap_utils.read_images_text(colmap_path / "images.txt")
+                )
             elif (colmap_path / "images.bin").exists():
-                im_id_to_image = colmap_utils.read_images_binary(colmap_path / "images.bin")
+                colmap_images = colmap_utils.read_images_binary_columnar(colmap_path / "images.bin")
             else:
                 raise ValueError(f"Could not find images.txt or images.bin in {colmap_path}")
-            downscale_factor = self._downscale_factor
-            max_num_points = int(torch.max(points3D_num_points).item())
-            if self.config.max_2D_matches_per_3D_point > 0:
-                max_num_points = min(max_num_points, self.config.max_2D_matches_per_3D_point)
-            points3D_image_ids = []
-            points3D_image_xy = []
-            for p in colmap_points.values():
-                nids = np.array(p.image_ids, dtype=np.int64)
-                nxy_ids = np.array(p.point2D_idxs, dtype=np.int32)
-                if self.config.max_2D_matches_per_3D_point != -1:
-                    # Randomly sample 2D matches
-                    idxs = np.argsort(p.error)[: self.config.max_2D_matches_per_3D_point]
-                    nids = nids[idxs]
-                    nxy_ids = nxy_ids[idxs]
-                nxy = [im_id_to_image[im_id].xys[pt_idx] for im_id, pt_idx in zip(nids, nxy_ids)]
-                nxy = torch.from_numpy(np.stack(nxy).astype(np.float32))
-                nids = torch.from_numpy(nids)
-                assert len(nids.shape) == 1
-                assert len(nxy.shape) == 2
-                points3D_image_ids.append(
-                    torch.cat((nids, torch.full((max_num_points - len(nids),), -1, dtype=torch.int64)))
-                )
-                points3D_image_xy.append(
-                    torch.cat((nxy, torch.full((max_num_points - len(nxy), nxy.shape[-1]), 0, dtype=torch.float32)))
-                    / downscale_factor
-                )
-            out["points3D_image_ids"] = torch.stack(points3D_image_ids, dim=0)
-            out["points3D_points2D_xy"] = torch.stack(points3D_image_xy, dim=0)
+            image_ids, points2D_xy = self._gather_track_points2D(colmap_points, colmap_images)
+            out["points3D_image_ids"] = image_ids
+            out["points3D_points2D_xy"] = points2D_xy / self._downscale_factor
         return out
 
+    def _gather_track_points2D(
+        self, colmap_points: colmap_utils.ColmapPoints3D, colmap_images: colmap_utils.ColmapImages
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Image ids and keypoint positions of the first max_2D_matches_per_3D_point observations of every 3D
+        point, padded with -1 and 0 to the longest kept track. COLMAP does not store per observation errors, so
+        observations are kept in track order."""
+        lengths = colmap_points.track_lengths
+        kept = lengths
+        if self.config.max_2D_matches_per_3D_point > 0:
+            kept = np.minimum(lengths, self.config.max_2D_matches_per_3D_point)
+        max_num_points = int(kept.max()) if len(kept) > 0 else 0
+
+        # Row and column in the padded output of every observation, keeping the first ones of each track
+        rows = np.repeat(np.arange(len(colmap_points)), lengths)
+        cols = np.arange(colmap_points.track_offsets[-1]) - np.repeat(colmap_points.track_offsets[:-1], lengths)
+        mask = cols < kept[rows]
+        rows, cols = rows[mask], cols[mask]
+        track_image_ids = colmap_points.track_image_ids[mask].astype(np.int64)
+        track_point2D_idxs = colmap_points.track_point2D_idxs[mask]
+
+        # Observations index into one keypoint array of all images
+        by_id = np.argsort(colmap_images.ids)
+        sorted_ids = colmap_images.ids[by_id]
+        positions = np.searchsorted(sorted_ids, track_image_ids)
+        found = positions < len(sorted_ids)
+        found[found] = sorted_ids[positions[found]] == track_image_ids[found]
+        if not found.all():
+            raise KeyError(f"3D points are observed in unknown images {np.unique(track_image_ids[~found]).tolist()}")
+        image_rows = by_id[positions]
+        points2D_xy = colmap_images.xys[colmap_images.points2D_offsets[image_rows] + track_point2D_idxs]
+
+        image_ids = torch.full((len(colmap_points), max_num_points), -1, dtype=torch.int64)
+        image_ids[rows, cols] = torch.from_numpy(track_image_ids)
+        xy = torch.zeros((len(colmap_points), max_num_points, 2), dtype=torch.float32)
+        xy[rows, cols] = torch.from_numpy(points2D_xy.astype(np.float32))
+        return image_ids, xy
+
     def _downscale_images(
         self,
         paths,
@@ -34,6 +34,7 @@ from nerfstudio.data.utils.dataparsers_utils import (
     get_train_eval_split_interval,
 )
 from nerfstudio.utils.io import load_from_json
+from nerfstudio.utils.ply_utils import read_ply, vertex_colors
 from nerfstudio.utils.rich_utils import CONSOLE
 
 MAX_AUTO_RESOLUTION = 1600
@@ -430,15 +431,14 @@ class Nerfstudio(DataParser):
         Returns:
             A dictionary of points: points3D_xyz and colors: points3D_rgb
         """
-        import open3d as o3d  # Importing open3d is slow, so we only do it if we need it.
-
-        pcd = o3d.io.read_point_cloud(str(ply_file_path))
+        # Only the vertices are read, so point clouds with faces, e.g. from RealityCapture, load as well
+        vertices = read_ply(ply_file_path, ["vertex"])["vertex"]
 
         # if no points found don't read in an initial point cloud
-        if len(pcd.points) == 0:
+        if len(vertices) == 0:
             return None
 
-        points3D = torch.from_numpy(np.asarray(pcd.points, dtype=np.float32))
+        points3D = torch.from_numpy(np.stack([vertices[axis] for axis in "xyz"], axis=-1).astype(np.float32))
         points3D = (
             torch.cat(
                 (
@@ -450,7 +450,7 @@ class Nerfstudio(DataParser):
             @ transform_matrix.T
         )
         points3D *= scale_factor
-        points3D_rgb = torch.from_numpy((np.asarray(pcd.colors) * 255).astype(np.uint8))
+        points3D_rgb = torch.from_numpy(vertex_colors(vertices))
 
         out = {
             "points3D_xyz": points3D,
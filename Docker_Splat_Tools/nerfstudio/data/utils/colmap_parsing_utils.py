@@ -39,8 +39,12 @@ TODO(1480) Delete this file when moving to pycolmap.
 # Author: Johannes L. Schoenberger (jsch-at-demuc-dot-de)
 
 import collections
+import mmap
 import os
 import struct
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import List
 
 import numpy as np
 
@@ -226,35 +230,7 @@ def read_images_binary(path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
-    images = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_reg_images):
-            binary_image_properties = read_next_bytes(fid, num_bytes=64, format_char_sequence="idddddddi")
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = b""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            image_name = image_name.decode("utf-8")
-            num_points2D = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
-            x_y_id_s = read_next_bytes(fid, num_bytes=24 * num_points2D, format_char_sequence="ddq" * num_points2D)
-            xys = np.column_stack([tuple(map(float, x_y_id_s[0::3])), tuple(map(float, x_y_id_s[1::3]))])
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
-            )
-    return images
+    return ImagesView(read_images_binary_columnar(path_to_model_file))
 
 
 def write_images_text(images, path):
@@ -293,19 +269,9 @@ def write_images_binary(images, path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
-    with open(path_to_model_file, "wb") as fid:
-        write_next_bytes(fid, len(images), "Q")
-        for _, img in images.items():
-            write_next_bytes(fid, img.id, "i")
-            write_next_bytes(fid, img.qvec.tolist(), "dddd")
-            write_next_bytes(fid, img.tvec.tolist(), "ddd")
-            write_next_bytes(fid, img.camera_id, "i")
-            for char in img.name:
-                write_next_bytes(fid, char.encode("utf-8"), "c")
-            write_next_bytes(fid, b"\x00", "c")
-            write_next_bytes(fid, len(img.point3D_ids), "Q")
-            for xy, p3d_id in zip(img.xys, img.point3D_ids):
-                write_next_bytes(fid, [*xy, p3d_id], "ddq")
+    if not isinstance(images, ImagesView):
+        images = ImagesView(ColmapImages.from_images(images))
+    write_images_binary_columnar(images.images, path_to_model_file)
 
 
 def read_points3D_text(path):
@@ -341,23 +307,7 @@ def read_points3D_binary(path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
-    points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_points):
-            binary_point_line_properties = read_next_bytes(fid, num_bytes=43, format_char_sequence="QdddBBBd")
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
-            track_elems = read_next_bytes(fid, num_bytes=8 * track_length, format_char_sequence="ii" * track_length)
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id, xyz=xyz, rgb=rgb, error=error, image_ids=image_ids, point2D_idxs=point2D_idxs
-            )
-    return points3D
+    return Points3DView(read_points3D_binary_columnar(path_to_model_file))
 
 
 def write_points3D_text(points3D, path):
@@ -393,17 +343,305 @@ def write_points3D_binary(points3D, path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
+    if not isinstance(points3D, Points3DView):
+        points3D = Points3DView(ColmapPoints3D.from_points3D(points3D))
+    write_points3D_binary_columnar(points3D.points, path_to_model_file)
+
+
+POINT3D_HEADER_DTYPE = np.dtype(
+    [("id", "<u8"), ("xyz", "<f8", (3,)), ("rgb", "u1", (3,)), ("error", "<f8"), ("track_length", "<u8")]
+)
+TRACK_ELEMENT_DTYPE = np.dtype([("image_id", "<i4"), ("point2D_idx", "<i4")])
+IMAGE_HEADER_DTYPE = np.dtype([("id", "<i4"), ("qvec", "<f8", (4,)), ("tvec", "<f8", (3,)), ("camera_id", "<i4")])
+POINT2D_DTYPE = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+
+COLUMNAR_CHUNK_SIZE = 1 << 16
+"""Number of 3D points gathered or scattered per numpy call when reading or writing points3D.bin."""
+
+
+@dataclass
+class ColmapPoints3D:
+    """All 3D points of a COLMAP model as flat arrays. The track of point i is
+    track_image_ids[track_offsets[i]:track_offsets[i + 1]] (and likewise track_point2D_idxs)."""
+
+    ids: np.ndarray
+    xyz: np.ndarray
+    rgb: np.ndarray
+    error: np.ndarray
+    track_offsets: np.ndarray
+    track_image_ids: np.ndarray
+    track_point2D_idxs: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def track_lengths(self):
+        return np.diff(self.track_offsets)
+
+    @classmethod
+    def from_points3D(cls, points3D):
+        """Build the columnar representation from a dict of Point3D."""
+        points = list(points3D.values())
+        lengths = np.array([len(pt.image_ids) for pt in points], dtype=np.int64)
+        return cls(
+            ids=np.array([pt.id for pt in points], dtype=np.uint64),
+            xyz=np.array([pt.xyz for pt in points], dtype=np.float64).reshape(-1, 3),
+            rgb=np.array([pt.rgb for pt in points], dtype=np.uint8).reshape(-1, 3),
+            error=np.array([np.squeeze(pt.error) for pt in points], dtype=np.float64),
+            track_offsets=np.concatenate([[0], np.cumsum(lengths)]),
+            track_image_ids=np.concatenate([np.asarray(pt.image_ids, dtype=np.int32) for pt in points] + [[]]).astype(
+                np.int32
+            ),
+            track_point2D_idxs=np.concatenate(
+                [np.asarray(pt.point2D_idxs, dtype=np.int32) for pt in points] + [[]]
+            ).astype(np.int32),
+        )
+
+
+@dataclass
+class ColmapImages:
+    """All registered images of a COLMAP model as flat arrays. The keypoints of image i are
+    xys[points2D_offsets[i]:points2D_offsets[i + 1]] (and likewise point3D_ids)."""
+
+    ids: np.ndarray
+    qvecs: np.ndarray
+    tvecs: np.ndarray
+    camera_ids: np.ndarray
+    names: List[str]
+    points2D_offsets: np.ndarray
+    xys: np.ndarray
+    point3D_ids: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_images(cls, images):
+        """Build the columnar representation from a dict of Image."""
+        images = list(images.values())
+        lengths = np.array([len(img.point3D_ids) for img in images], dtype=np.int64)
+        return cls(
+            ids=np.array([img.id for img in images], dtype=np.int32),
+            qvecs=np.array([img.qvec for img in images], dtype=np.float64).reshape(-1, 4),
+            tvecs=np.array([img.tvec for img in images], dtype=np.float64).reshape(-1, 3),
+            camera_ids=np.array([img.camera_id for img in images], dtype=np.int32),
+            names=[img.name for img in images],
+            points2D_offsets=np.concatenate([[0], np.cumsum(lengths)]),
+            xys=np.concatenate(
+                [np.asarray(img.xys, dtype=np.float64).reshape(-1, 2) for img in images] + [np.empty((0, 2))]
+            ),
+            point3D_ids=np.concatenate([np.asarray(img.point3D_ids, dtype=np.int64) for img in images] + [[]]).astype(
+                np.int64
+            ),
+        )
+
+
+class Points3DView(Mapping):
+    """Read-only dict of Point3D over a ColmapPoints3D. Entries are created on access and share memory with it."""
+
+    def __init__(self, points):
+        self.points = points
+        self._rows = None
+
+    def __getitem__(self, point3D_id):
+        if self._rows is None:
+            self._rows = dict(zip(self.points.ids.tolist(), range(len(self.points))))
+        row = self._rows[point3D_id]
+        start, end = self.points.track_offsets[row], self.points.track_offsets[row + 1]
+        return Point3D(
+            id=int(self.points.ids[row]),
+            xyz=self.points.xyz[row],
+            rgb=self.points.rgb[row],
+            error=self.points.error[row],
+            image_ids=self.points.track_image_ids[start:end],
+            point2D_idxs=self.points.track_point2D_idxs[start:end],
+        )
+
+    def __iter__(self):
+        return iter(self.points.ids.tolist())
+
+    def __len__(self):
+        return len(self.points)
+
+
+class ImagesView(Mapping):
+    """Read-only dict of Image over a ColmapImages. Entries are created on access and share memory with it."""
+
+    def __init__(self, images):
+        self.images = images
+        self._rows = None
+
+    def __getitem__(self, image_id):
+        if self._rows is None:
+            self._rows = dict(zip(self.images.ids.tolist(), range(len(self.images))))
+        row = self._rows[image_id]
+        start, end = self.images.points2D_offsets[row], self.images.points2D_offsets[row + 1]
+        return Image(
+            id=int(self.images.ids[row]),
+            qvec=self.images.qvecs[row],
+            tvec=self.images.tvecs[row],
+            camera_id=int(self.images.camera_ids[row]),
+            name=self.images.names[row],
+            xys=self.images.xys[start:end],
+            point3D_ids=self.images.point3D_ids[start:end],
+        )
+
+    def __iter__(self):
+        return iter(self.images.ids.tolist())
+
+    def __len__(self):
+        return len(self.images)
+
+
+def _header_mask(size, header_starts, header_size):
+    """Boolean mask over a byte range that is True on the fixed-size record headers."""
+    mask = np.zeros(size, dtype=bool)
+    mask[(header_starts[:, None] + np.arange(header_size)).ravel()] = True
+    return mask
+
+
+def _gather_points3D_chunk(buffer, positions, points, start, stop):
+    """Split the records start:stop of points3D.bin into their fixed-size headers and track elements."""
+    chunk = np.frombuffer(buffer, dtype=np.uint8, count=positions[stop] - positions[start], offset=positions[start])
+    mask = _header_mask(len(chunk), positions[start:stop] - positions[start], POINT3D_HEADER_DTYPE.itemsize)
+    headers = chunk[mask].view(POINT3D_HEADER_DTYPE)
+    points.ids[start:stop] = headers["id"]
+    points.xyz[start:stop] = headers["xyz"]
+    points.rgb[start:stop] = headers["rgb"]
+    points.error[start:stop] = headers["error"]
+    tracks = chunk[~mask].view(TRACK_ELEMENT_DTYPE)
+    track_start, track_stop = points.track_offsets[start], points.track_offsets[stop]
+    points.track_image_ids[track_start:track_stop] = tracks["image_id"]
+    points.track_point2D_idxs[track_start:track_stop] = tracks["point2D_idx"]
+
+
+def read_points3D_binary_columnar(path_to_model_file):
+    """Read points3D.bin into a ColmapPoints3D without creating a Python object per point.
+
+    The file is memory mapped. Only the track lengths are read record by record to locate the
+    variable-length records; all fields are then gathered with numpy in chunks.
+    """
+    with open(path_to_model_file, "rb") as fid, mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        num_points = struct.unpack_from("<Q", buffer, 0)[0]
+        length_offset = POINT3D_HEADER_DTYPE.fields["track_length"][1]
+        header_size = POINT3D_HEADER_DTYPE.itemsize
+        element_size = TRACK_ELEMENT_DTYPE.itemsize
+        unpack_length = struct.Struct("<Q").unpack_from
+        positions = [0] * (num_points + 1)
+        lengths = [0] * num_points
+        position = 8
+        for i in range(num_points):
+            positions[i] = position
+            lengths[i] = unpack_length(buffer, position + length_offset)[0]
+            position += header_size + element_size * lengths[i]
+        positions[num_points] = position
+        if position != len(buffer):
+            raise ValueError(f"{path_to_model_file} is corrupt: expected {position} bytes, found {len(buffer)}")
+
+        positions = np.array(positions, dtype=np.int64)
+        track_offsets = np.zeros(num_points + 1, dtype=np.int64)
+        np.cumsum(lengths, out=track_offsets[1:])
+        points = ColmapPoints3D(
+            ids=np.empty(num_points, dtype=np.uint64),
+            xyz=np.empty((num_points, 3), dtype=np.float64),
+            rgb=np.empty((num_points, 3), dtype=np.uint8),
+            error=np.empty(num_points, dtype=np.float64),
+            track_offsets=track_offsets,
+            track_image_ids=np.empty(track_offsets[-1], dtype=np.int32),
+            track_point2D_idxs=np.empty(track_offsets[-1], dtype=np.int32),
+        )
+        for start in range(0, num_points, COLUMNAR_CHUNK_SIZE):
+            _gather_points3D_chunk(buffer, positions, points, start, min(start + COLUMNAR_CHUNK_SIZE, num_points))
+    return points
+
+
+def write_points3D_binary_columnar(points, path_to_model_file):
+    """Write a ColmapPoints3D to points3D.bin, scattering headers and tracks into one buffer per chunk."""
+    num_points = len(points)
+    offsets = np.asarray(points.track_offsets, dtype=np.int64)
     with open(path_to_model_file, "wb") as fid:
-        write_next_bytes(fid, len(points3D), "Q")
-        for _, pt in points3D.items():
-            write_next_bytes(fid, pt.id, "Q")
-            write_next_bytes(fid, pt.xyz.tolist(), "ddd")
-            write_next_bytes(fid, pt.rgb.tolist(), "BBB")
-            write_next_bytes(fid, pt.error, "d")
-            track_length = pt.image_ids.shape[0]
-            write_next_bytes(fid, track_length, "Q")
-            for image_id, point2D_id in zip(pt.image_ids, pt.point2D_idxs):
-                write_next_bytes(fid, [image_id, point2D_id], "ii")
+        fid.write(struct.pack("<Q", num_points))
+        for start in range(0, num_points, COLUMNAR_CHUNK_SIZE):
+            stop = min(start + COLUMNAR_CHUNK_SIZE, num_points)
+            headers = np.empty(stop - start, dtype=POINT3D_HEADER_DTYPE)
+            headers["id"] = points.ids[start:stop]
+            headers["xyz"] = points.xyz[start:stop]
+            headers["rgb"] = points.rgb[start:stop]
+            headers["error"] = points.error[start:stop]
+            headers["track_length"] = np.diff(offsets[start : stop + 1])
+            tracks = np.empty(offsets[stop] - offsets[start], dtype=TRACK_ELEMENT_DTYPE)
+            tracks["image_id"] = points.track_image_ids[offsets[start] : offsets[stop]]
+            tracks["point2D_idx"] = points.track_point2D_idxs[offsets[start] : offsets[stop]]
+
+            header_starts = (
+                np.arange(stop - start) * POINT3D_HEADER_DTYPE.itemsize
+                + (offsets[start:stop] - offsets[start]) * TRACK_ELEMENT_DTYPE.itemsize
+            )
+            chunk = np.empty(headers.nbytes + tracks.nbytes, dtype=np.uint8)
+            mask = _header_mask(len(chunk), header_starts, POINT3D_HEADER_DTYPE.itemsize)
+            chunk[mask] = headers.view(np.uint8)
+            chunk[~mask] = tracks.view(np.uint8)
+            chunk.tofile(fid)
+
+
+def read_images_binary_columnar(path_to_model_file):
+    """Read images.bin into a ColmapImages. Keypoints of all images end up in two contiguous arrays."""
+    with open(path_to_model_file, "rb") as fid, mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        num_reg_images = struct.unpack_from("<Q", buffer, 0)[0]
+        headers = np.empty(num_reg_images, dtype=IMAGE_HEADER_DTYPE)
+        names = []
+        lengths = np.zeros(num_reg_images, dtype=np.int64)
+        starts = []
+        position = 8
+        for i in range(num_reg_images):
+            headers[i] = np.frombuffer(buffer, dtype=IMAGE_HEADER_DTYPE, count=1, offset=position)[0]
+            name_end = buffer.find(b"\x00", position + IMAGE_HEADER_DTYPE.itemsize)
+            names.append(buffer[position + IMAGE_HEADER_DTYPE.itemsize : name_end].decode("utf-8"))
+            lengths[i] = struct.unpack_from("<Q", buffer, name_end + 1)[0]
+            starts.append(name_end + 9)
+            position = name_end + 9 + POINT2D_DTYPE.itemsize * lengths[i]
+
+        points2D_offsets = np.zeros(num_reg_images + 1, dtype=np.int64)
+        np.cumsum(lengths, out=points2D_offsets[1:])
+        xys = np.empty((points2D_offsets[-1], 2), dtype=np.float64)
+        point3D_ids = np.empty(points2D_offsets[-1], dtype=np.int64)
+        for i in range(num_reg_images):
+            points2D = np.frombuffer(buffer, dtype=POINT2D_DTYPE, count=lengths[i], offset=starts[i])
+            xys[points2D_offsets[i] : points2D_offsets[i + 1]] = points2D["xy"]
+            point3D_ids[points2D_offsets[i] : points2D_offsets[i + 1]] = points2D["point3D_id"]
+            del points2D
+
+    return ColmapImages(
+        ids=headers["id"].copy(),
+        qvecs=headers["qvec"].copy(),
+        tvecs=headers["tvec"].copy(),
+        camera_ids=headers["camera_id"].copy(),
+        names=names,
+        points2D_offsets=points2D_offsets,
+        xys=xys,
+        point3D_ids=point3D_ids,
+    )
+
+
+def write_images_binary_columnar(images, path_to_model_file):
+    """Write a ColmapImages to images.bin with one numpy write per image."""
+    with open(path_to_model_file, "wb") as fid:
+        fid.write(struct.pack("<Q", len(images)))
+        for i in range(len(images)):
+            header = np.empty(1, dtype=IMAGE_HEADER_DTYPE)
+            header["id"] = images.ids[i]
+            header["qvec"] = images.qvecs[i]
+            header["tvec"] = images.tvecs[i]
+            header["camera_id"] = images.camera_ids[i]
+            start, end = images.points2D_offsets[i], images.points2D_offsets[i + 1]
+            points2D = np.empty(end - start, dtype=POINT2D_DTYPE)
+            points2D["xy"] = images.xys[start:end]
+            points2D["point3D_id"] = images.point3D_ids[start:end]
+            fid.write(header.tobytes())
+            fid.write(images.names[i].encode("utf-8") + b"\x00")
+            fid.write(struct.pack("<Q", end - start))
+            fid.write(points2D.tobytes())
 
 
 def detect_model_format(path, ext):
@@ -18,12 +18,14 @@ Code for sampling images from a dataset of images.
 
 # for multithreading
 import concurrent.futures
+import contextlib
 import math
 import multiprocessing
 import random
+import time
 from abc import abstractmethod
-from collections import defaultdict
-from typing import Any, Callable, Dict, List, Literal, Optional, Sized, Tuple, Union, cast
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Literal, Optional, Sized, Tuple, Union, cast
 
 import cv2
 import numpy as np
@@ -592,11 +594,52 @@ class RayBatchStream(IterableDataset):
             yield ray_bundle, batch
 
 
+class ViewCache:
+    """Least recently used cache of (camera, data) views, bounded by the bytes of their tensors.
+
+    Args:
+        max_bytes: Budget of the cache. Views larger than it are not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.views: OrderedDict[int, Tuple[Cameras, Dict]] = OrderedDict()
+        self.sizes: Dict[int, int] = {}
+        self.nbytes = 0
+
+    def __contains__(self, idx: int) -> bool:
+        return idx in self.views
+
+    def get(self, idx: int) -> Optional[Tuple[Cameras, Dict]]:
+        view = self.views.get(idx)
+        if view is not None:
+            self.views.move_to_end(idx)
+        return view
+
+    def put(self, idx: int, view: Tuple[Cameras, Dict]) -> None:
+        size = sum(value.nbytes for value in view[1].values() if isinstance(value, torch.Tensor))
+        if size > self.max_bytes or idx in self.views:
+            return
+        while self.nbytes + size > self.max_bytes:
+            evicted, _ = self.views.popitem(last=False)
+            self.nbytes -= self.sizes.pop(evicted)
+        self.views[idx] = view
+        self.sizes[idx] = size
+        self.nbytes += size
+
+
 class ImageBatchStream(IterableDataset):
     """
     A wrapper of InputDataset that outputs undistorted full images and cameras. This makes the
     datamanager more lightweight since we don't have to do generate rays. Useful for full-image
     training e.g. rasterization pipelines
+
+    Each worker keeps the views it decoded in a ViewCache, reused in later epochs, and decodes the next views of its
+    shuffle order in background threads. Workers own disjoint sets of views, so the budget is split between them.
+
+    Args:
+        cache_max_bytes: Budget of the decoded views kept in memory by all workers together. 0 disables the cache.
+        read_ahead: Number of upcoming views each worker decodes in the background. 0 decodes on demand.
     """
 
     def __init__(
@@ -606,12 +649,23 @@ class ImageBatchStream(IterableDataset):
         cache_images_type: Literal["uint8", "float32"] = "float32",
         device: Union[torch.device, str] = "cpu",
         custom_image_processor: Optional[Callable[[Cameras, Dict], Tuple[Cameras, Dict]]] = None,
+        cache_max_bytes: int = 0,
+        read_ahead: int = 0,
     ):
         self.input_dataset = input_dataset
         self.sampling_seed = sampling_seed
         self.cache_images_type = cache_images_type
         self.device = device
         self.custom_image_processor = custom_image_processor
+        self.cache_max_bytes = cache_max_bytes
+        self.read_ahead = read_ahead
+
+    def _load_view(self, idx: int) -> Tuple[Cameras, Dict]:
+        camera, data = undistort_view(idx, self.input_dataset, self.cache_images_type)  # type: ignore
+        if camera.metadata is None:
+            camera.metadata = {}
+        camera.metadata["cam_idx"] = idx
+        return camera, data
 
     def __iter__(self):
         dataset_indices = list(range(len(self.input_dataset)))
@@ -619,9 +673,11 @@ class ImageBatchStream(IterableDataset):
         if worker_info is not None:  # if we have multiple processes
             per_worker = int(math.ceil(len(dataset_indices) / float(worker_info.num_workers)))
             slice_start = worker_info.id * per_worker
+            num_workers = worker_info.num_workers
         else:  # we only have a single process
             per_worker = len(self.input_dataset)
             slice_start = 0
+            num_workers = 1
         worker_indices = dataset_indices[
             slice_start : slice_start + per_worker
         ]  # the indices of the datapoints in the dataset this worker will load
@@ -629,16 +685,28 @@ class ImageBatchStream(IterableDataset):
         r.shuffle(worker_indices)
         i = 0  # i refers to what image index we are outputting: i=0 => we are yielding our first image,camera
 
+        cache = ViewCache(self.cache_max_bytes // num_workers)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.read_ahead) if self.read_ahead > 0 else None
+        pending: Dict[int, concurrent.futures.Future] = {}
         while True:
             if i >= len(worker_indices):
                 # if we've iterated through all the worker's partition of images, we need to reshuffle
                 r.shuffle(worker_indices)
                 i = 0
+            if executor is not None:
+                # Decode the next views of this epoch's order in the background
+                for upcoming in worker_indices[i + 1 : i + 1 + self.read_ahead]:
+                    if upcoming not in cache and upcoming not in pending:
+                        pending[upcoming] = executor.submit(self._load_view, upcoming)
             idx = worker_indices[i]  # idx refers to the actual datapoint index this worker will retrieve
-            camera, data = undistort_view(idx, self.input_dataset, self.cache_images_type)  # type: ignore
-            if camera.metadata is None:
-                camera.metadata = {}
-            camera.metadata["cam_idx"] = idx
+            view = cache.get(idx)
+            if view is None:
+                future = pending.pop(idx, None)
+                view = future.result() if future is not None else self._load_view(idx)
+                cache.put(idx, view)
+            camera, data = view
+            # Copy so that custom processing does not add to the cached dictionary
+            data = data.copy()
 
             # Apply custom processing if provided
             if self.custom_image_processor:
@@ -648,6 +716,81 @@ class ImageBatchStream(IterableDataset):
             yield camera, data
 
 
+class TrainViewPrefetcher:
+    """Stages the upcoming training views of an in-memory image cache on the device ahead of time.
+
+    A background thread copies the images (from pinned memory) and cameras of the next views. On CUDA the copies
+    are issued on a side stream, and the training stream waits on an event before using them.
+
+    Args:
+        next_index: Returns the index of the next training view. Called in order, ahead of next().
+        cached: Cached data of all views, as returned by the datamanager's image cache.
+        cameras: Cameras of all views.
+        device: Device to stage the views on.
+        num_views: Number of views staged ahead.
+    """
+
+    def __init__(
+        self,
+        next_index: Callable[[], int],
+        cached: List[Dict[str, Any]],
+        cameras: Cameras,
+        device: Union[torch.device, str],
+        num_views: int = 2,
+    ):
+        self.next_index = next_index
+        self.cached = cached
+        self.cameras = cameras
+        self.device = torch.device(device)
+        self.stream = torch.cuda.Stream(self.device) if self.device.type == "cuda" else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="train_prefetch")
+        self.pending: Deque[concurrent.futures.Future] = deque()
+        for _ in range(num_views):
+            self._submit()
+
+    def _submit(self) -> None:
+        image_idx = self.next_index()
+        # Copy so that the cached dictionary is not mutated, see https://github.com/nerfstudio-project/nerfstudio/issues/3335
+        self.pending.append(self.executor.submit(self._stage, image_idx, self.cached[image_idx].copy()))
+
+    def _stage(self, image_idx: int, data: Dict[str, Any]):
+        start = time.perf_counter()
+        ready = None
+        with torch.cuda.stream(self.stream) if self.stream is not None else contextlib.nullcontext():
+            for key, value in data.items():
+                if isinstance(value, torch.Tensor):
+                    data[key] = value.to(self.device, non_blocking=True)
+            camera = self.cameras[image_idx : image_idx + 1].to(self.device)
+            if self.stream is not None:
+                ready = torch.cuda.Event()
+                ready.record(self.stream)
+        if ready is not None:
+            ready.synchronize()
+        return image_idx, camera, data, ready, time.perf_counter() - start
+
+    def next(self) -> Tuple[int, Cameras, Dict[str, Any], float, float]:
+        """Returns the next view as (image index, camera, data, copy time, wait time). The copy time is how long
+        staging the view took, the wait time how long this call blocked on it."""
+        future = self.pending.popleft()
+        self._submit()
+        start = time.perf_counter()
+        image_idx, camera, data, ready, copy_time = future.result()
+        wait_time = time.perf_counter() - start
+        if ready is not None:
+            current = torch.cuda.current_stream(self.device)
+            current.wait_event(ready)
+            # The tensors were allocated on the side stream, keep them alive until the training stream is done
+            for value in data.values():
+                if isinstance(value, torch.Tensor) and value.is_cuda:
+                    value.record_stream(current)
+        return image_idx, camera, data, copy_time, wait_time
+
+    def close(self) -> None:
+        """Stops the background thread and drops the staged views."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+
+
 class EvalDataloader(DataLoader):
     """Evaluation dataloader base class
 
@@ -0,0 +1,156 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of decoded and undistorted images for the full image datamanager.
+
+Each entry holds every image of one dataset split as uint8, concatenated into a single file that is memory-mapped
+when the entry is loaded. Layout of the cache directory::
+
+    hashes.json             path -> [mtime_ns, size, sha256] so unchanged image files are not hashed again
+    <key>/images.u8         all images, row-major (H, W, C), back to back
+    <key>/masks.u8          all masks as bools (H, W, 1), only if the dataset has masks
+    <key>/index.npz         byte offsets and shapes of images and masks, undistorted intrinsics
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.process_data.process_data_cache import FileHashIndex, sha256_json
+
+CACHE_VERSION = 1
+"""Bumped whenever the decoding or undistortion of cached images changes."""
+
+
+@dataclass
+class DecodedImages:
+    """Images of one dataset split, memory-mapped from a cache entry."""
+
+    images: List[np.ndarray]
+    """Undistorted uint8 images of shape (H, W, C)."""
+    masks: Optional[List[np.ndarray]]
+    """Undistorted bool masks of shape (H, W, 1), if the dataset has masks."""
+    intrinsics: np.ndarray
+    """Undistorted fx, fy, cx, cy, width, height per image, shape (N, 6)."""
+
+
+def is_cacheable(dataset: InputDataset) -> bool:
+    """Whether everything get_data returns for this dataset can be cached. Datasets adding metadata (depth,
+    semantics, ...) are not."""
+    return type(dataset).get_metadata is InputDataset.get_metadata
+
+
+def _write_arrays(path: Path, arrays: List[np.ndarray]) -> np.ndarray:
+    """Write arrays back to back and return their byte offsets, shape (N + 1,)."""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    with open(path, "wb") as f:
+        for i, array in enumerate(arrays):
+            data = np.ascontiguousarray(array)
+            f.write(data.tobytes())
+            offsets[i + 1] = offsets[i] + data.nbytes
+    return offsets
+
+
+def _map_arrays(path: Path, dtype: type, offsets: np.ndarray, shapes: np.ndarray) -> List[np.ndarray]:
+    if offsets[-1] == 0:
+        return [np.zeros(shape, dtype=dtype) for shape in shapes]
+    # Copy-on-write, so torch.from_numpy gets a writable array and the file is never modified
+    buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    return [
+        buffer[start:end].view(dtype).reshape(tuple(shape)) for start, end, shape in zip(offsets, offsets[1:], shapes)
+    ]
+
+
+class DecodedImageCache:
+    """Content-addressed store of decoded, undistorted dataset splits.
+
+    Args:
+        root: Cache directory. Created if it does not exist.
+        num_hash_workers: Threads used to hash image files.
+    """
+
+    def __init__(self, root: Path, num_hash_workers: int = 8) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._hash_index = FileHashIndex(self.root / "hashes.json", num_workers=num_hash_workers)
+
+    def key(self, dataset: InputDataset) -> str:
+        """Key of a dataset split: content of its image and mask files, its camera parameters and everything
+        else get_data depends on. Must be computed before the cameras are updated by undistortion."""
+        outputs = dataset._dataparser_outputs
+        files = list(outputs.image_filenames)
+        if outputs.mask_filenames is not None:
+            files += list(outputs.mask_filenames)
+        cameras = dataset.cameras
+        params = [cameras.fx, cameras.fy, cameras.cx, cameras.cy, cameras.width, cameras.height, cameras.camera_type]
+        if cameras.distortion_params is not None:
+            params.append(cameras.distortion_params)
+        camera_array = torch.cat([p.reshape(len(cameras), -1).double() for p in params], dim=1).numpy()
+        return sha256_json(
+            {
+                "version": CACHE_VERSION,
+                "files": self._hash_index.hash_files(files),
+                "cameras": hashlib.sha256(camera_array.tobytes()).hexdigest(),
+                "scale_factor": dataset.scale_factor,
+                "alpha_color": None if outputs.alpha_color is None else outputs.alpha_color.tolist(),
+                "mask_color": dataset.mask_color,
+            }
+        )
+
+    def entry(self, key: str) -> Path:
+        return self.root / key
+
+    def load(self, key: str) -> Optional[DecodedImages]:
+        """Memory-map a cached dataset split, or return None on a miss."""
+        entry = self.entry(key)
+        if not (entry / "index.npz").exists():
+            return None
+        index = np.load(entry / "index.npz")
+        masks = None
+        if "mask_offsets" in index:
+            masks = _map_arrays(entry / "masks.u8", np.bool_, index["mask_offsets"], index["mask_shapes"])
+        return DecodedImages(
+            images=_map_arrays(entry / "images.u8", np.uint8, index["image_offsets"], index["image_shapes"]),
+            masks=masks,
+            intrinsics=index["intrinsics"],
+        )
+
+    def store(self, key: str, data: List[Dict[str, torch.Tensor]], intrinsics: np.ndarray) -> None:
+        """Store the uint8 images and masks of a dataset split with their undistorted intrinsics."""
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging_"))
+        images = [d["image"].numpy() for d in data]
+        index = {
+            "image_offsets": _write_arrays(staging / "images.u8", images),
+            "image_shapes": np.array([image.shape for image in images], dtype=np.int64),
+            "intrinsics": intrinsics,
+        }
+        if all("mask" in d for d in data):
+            masks = [d["mask"].numpy().astype(np.bool_) for d in data]
+            index["mask_offsets"] = _write_arrays(staging / "masks.u8", masks)
+            index["mask_shapes"] = np.array([mask.shape for mask in masks], dtype=np.int64)
+        # Written last, its presence marks a complete entry
+        np.savez(staging / "index.npz", **index)
+        try:
+            os.rename(staging, self.entry(key))
+        except OSError:
+            # A concurrent run stored the same entry
+            shutil.rmtree(staging, ignore_errors=True)
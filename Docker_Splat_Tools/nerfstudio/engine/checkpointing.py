@@ -0,0 +1,175 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checkpoint writing that does not block training on serialization and disk writes.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import torch
+
+from nerfstudio.utils.safetensors_utils import save_tensors
+
+
+def inference_checkpoint_path(path: Path) -> Path:
+    """Path of the inference checkpoint written next to a training checkpoint."""
+    return path.with_suffix(".safetensors")
+
+
+def write_inference_checkpoint(
+    state: Dict[str, Any], path: Path, dtype: Optional[torch.dtype] = None, delete_others: bool = False
+) -> None:
+    """Save only the pipeline weights of a training checkpoint state as a memory-mappable safetensors file.
+
+    Args:
+        state: Training checkpoint state, with the step and the pipeline state dict.
+        path: Output file.
+        dtype: If set, floating point weights are cast to this dtype.
+        delete_others: Whether to delete all other inference checkpoints of the directory afterwards.
+    """
+    tensors = {
+        name: value.to(dtype) if dtype is not None and value.is_floating_point() else value
+        for name, value in state["pipeline"].items()
+    }
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    save_tensors(tensors, tmp_path, metadata={"step": str(state["step"])})
+    os.replace(tmp_path, path)
+    if delete_others:
+        for other in path.parent.glob("*.safetensors"):
+            if other != path:
+                other.unlink()
+
+
+def write_checkpoint(
+    state: Dict[str, Any],
+    path: Path,
+    delete_others: bool = False,
+    inference_dtype: Optional[torch.dtype] = None,
+    save_inference: bool = False,
+) -> None:
+    """Save a checkpoint to a temporary file and rename it into place, so that path never holds a partial
+    checkpoint. Optionally delete all other checkpoints of the directory afterwards.
+
+    If save_inference is set, the pipeline weights are also written to inference_checkpoint_path(path) first, cast
+    to inference_dtype if given, so that every training checkpoint has its inference checkpoint next to it."""
+    if save_inference:
+        write_inference_checkpoint(state, inference_checkpoint_path(path), inference_dtype, delete_others)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+    if delete_others:
+        for other in path.parent.glob("*.ckpt"):
+            if other != path:
+                other.unlink()
+
+
+class AsyncCheckpointWriter:
+    """Writes checkpoints from a background thread.
+
+    submit() snapshots the state into CPU buffers, pinned if the state is on a CUDA device, and returns once the
+    snapshot is complete, so training can modify the state right away. Serialization and the write happen in the
+    background. Snapshot buffers are reused between saves while tensor shapes do not change.
+
+    Args:
+        max_in_flight: Maximum number of checkpoints being written at once. submit() blocks until a write finishes
+            if this many are in flight.
+    """
+
+    def __init__(self, max_in_flight: int = 1):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint_writer")
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight: Deque[Tuple[int, concurrent.futures.Future]] = deque()
+        self.free_buffers: List[Dict[Tuple, torch.Tensor]] = [{} for _ in range(self.max_in_flight)]
+        self.finished: List[Tuple[int, float]] = []
+
+    def _snapshot(self, value: Any, buffers: Dict[Tuple, torch.Tensor], key: Tuple = ()) -> Any:
+        """Copy of a nested state dict with every tensor copied into a reusable CPU buffer."""
+        if isinstance(value, torch.Tensor):
+            buffer = buffers.get(key)
+            if buffer is None or buffer.shape != value.shape or buffer.dtype != value.dtype:
+                buffer = torch.empty(value.shape, dtype=value.dtype, pin_memory=value.is_cuda)
+                buffers[key] = buffer
+            return buffer.copy_(value.detach(), non_blocking=value.is_cuda)
+        if isinstance(value, dict):
+            return type(value)((k, self._snapshot(v, buffers, (*key, k))) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return type(value)(self._snapshot(v, buffers, (*key, i)) for i, v in enumerate(value))
+        return value
+
+    def _collect(self, block: bool) -> None:
+        """Move writes that finished to self.finished, waiting for the oldest one if block is set. Raises the
+        exception of a failed write."""
+        while self.in_flight and (block or self.in_flight[0][1].done()):
+            step, future = self.in_flight.popleft()
+            latency, buffers = future.result()
+            self.free_buffers.append(buffers)
+            self.finished.append((step, latency))
+            block = False
+
+    def submit(
+        self,
+        step: int,
+        state: Dict[str, Any],
+        path: Path,
+        *,
+        delete_others: bool = False,
+        inference_dtype: Optional[torch.dtype] = None,
+        save_inference: bool = False,
+    ) -> None:
+        """Snapshot the state and write it to path in the background, deleting other checkpoints of the directory
+        afterwards if delete_others is set. See write_checkpoint() for the inference checkpoint arguments."""
+        self._collect(block=False)
+        if len(self.in_flight) >= self.max_in_flight:
+            self._collect(block=True)
+        buffers = self.free_buffers.pop()
+        snapshot = self._snapshot(state, buffers)
+        if torch.cuda.is_available():
+            torch.cuda.current_stream().synchronize()
+        submitted = time.perf_counter()
+
+        def write() -> Tuple[float, Dict[Tuple, torch.Tensor]]:
+            write_checkpoint(
+                snapshot,
+                path,
+                delete_others=delete_others,
+                inference_dtype=inference_dtype,
+                save_inference=save_inference,
+            )
+            return time.perf_counter() - submitted, buffers
+
+        self.in_flight.append((step, self.executor.submit(write)))
+
+    def pop_finished(self) -> List[Tuple[int, float]]:
+        """Steps and latencies, from submission until the file is in place, of the writes finished so far."""
+        self._collect(block=False)
+        finished, self.finished = self.finished, []
+        return finished
+
+    def wait(self) -> None:
+        """Block until all writes are finished."""
+        while self.in_flight:
+            self._collect(block=True)
+
+    def close(self) -> None:
+        """Wait for all writes and stop the background thread."""
+        self.wait()
+        self.executor.shutdown()
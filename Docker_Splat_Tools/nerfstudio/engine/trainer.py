@@ -37,6 +37,7 @@ from torch.cuda.amp.grad_scaler import GradScaler
 
 from nerfstudio.configs.experiment_config import ExperimentConfig
 from nerfstudio.engine.callbacks import TrainingCallback, TrainingCallbackAttributes, TrainingCallbackLocation
+from nerfstudio.engine.checkpointing import AsyncCheckpointWriter, write_checkpoint
 from nerfstudio.engine.optimizers import Optimizers
 from nerfstudio.pipelines.base_pipeline import VanillaPipeline
 from nerfstudio.utils import profiler, writer
@@ -73,6 +74,16 @@ class TrainerConfig(ExperimentConfig):
     """Use gradient scaler even if the automatic mixed precision is disabled."""
     save_only_latest_checkpoint: bool = True
     """Whether to only save the latest checkpoint or all checkpoints."""
+    async_checkpoints: bool = True
+    """Whether to write checkpoints from a background thread. Training only pauses to copy the state to CPU."""
+    max_in_flight_checkpoints: int = 1
+    """Maximum number of checkpoints written in the background at once. Saving waits for a write to finish if
+    this many are in flight."""
+    save_inference_checkpoint: bool = True
+    """Whether to also save the model weights alone, without optimizer state, as a .safetensors file next to each
+    checkpoint. Evaluation, rendering, viewing and export load it instead of the full checkpoint."""
+    inference_checkpoint_dtype: Literal["float32", "float16"] = "float32"
+    """Dtype of the floating point weights in the inference checkpoint."""
     # optional parameters if we want to resume training
     load_dir: Optional[Path] = None
     """Optionally specify a pre-trained model directory to load from."""
@@ -142,6 +153,9 @@ class Trainer:
         CONSOLE.log(f"Saving checkpoints to: {self.checkpoint_dir}")
 
         self.viewer_state = None
+        self.checkpoint_writer: Optional[AsyncCheckpointWriter] = (
+            AsyncCheckpointWriter(config.max_in_flight_checkpoints) if config.async_checkpoints else None
+        )
 
         # used to keep track of the current step
         self.step = 0
@@ -326,6 +340,12 @@ class Trainer:
         self.training_state = "completed"  # used to update the webui state
         # save checkpoint at the end of training
         self.save_checkpoint(self.step)
+        # training views staged ahead on the device are no longer needed
+        if hasattr(self.pipeline.datamanager, "close_train_prefetcher"):
+            self.pipeline.datamanager.close_train_prefetcher()  # type: ignore
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+            self._put_checkpoint_latencies()
         # write out any remaining events (e.g., total train time)
         writer.write_out_storage()
         table = Table(
@@ -426,7 +446,9 @@ class Trainer:
             if load_step is None:
                 print("Loading latest Nerfstudio checkpoint from load_dir...")
                 # NOTE: this is specific to the checkpoint name format
-                load_step = sorted(int(x[x.find("-") + 1 : x.find(".")]) for x in os.listdir(load_dir))[-1]
+                load_step = sorted(
+                    int(x[x.find("-") + 1 : x.find(".")]) for x in os.listdir(load_dir) if x.endswith(".ckpt")
+                )[-1]
             load_path: Path = load_dir / f"step-{load_step:09d}.ckpt"
             assert load_path.exists(), f"Checkpoint {load_path} does not exist"
             loaded_state = torch.load(load_path, map_location="cpu")
@@ -459,29 +481,44 @@ class Trainer:
         Args:
             step: number of steps in training for given checkpoint
         """
+        start = time.perf_counter()
         # possibly make the checkpoint directory
         if not self.checkpoint_dir.exists():
             self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
         # save the checkpoint
         ckpt_path: Path = self.checkpoint_dir / f"step-{step:09d}.ckpt"
-        torch.save(
-            {
-                "step": step,
-                "pipeline": self.pipeline.module.state_dict()  # type: ignore
-                if hasattr(self.pipeline, "module")
-                else self.pipeline.state_dict(),
-                "optimizers": {k: v.state_dict() for (k, v) in self.optimizers.optimizers.items()},
-                "schedulers": {k: v.state_dict() for (k, v) in self.optimizers.schedulers.items()},
-                "scalers": self.grad_scaler.state_dict(),
-            },
-            ckpt_path,
-        )
-        # possibly delete old checkpoints
-        if self.config.save_only_latest_checkpoint:
-            # delete every other checkpoint in the checkpoint folder
-            for f in self.checkpoint_dir.glob("*.ckpt"):
-                if f != ckpt_path:
-                    f.unlink()
+        state = {
+            "step": step,
+            "pipeline": self.pipeline.module.state_dict()  # type: ignore
+            if hasattr(self.pipeline, "module")
+            else self.pipeline.state_dict(),
+            "optimizers": {k: v.state_dict() for (k, v) in self.optimizers.optimizers.items()},
+            "schedulers": {k: v.state_dict() for (k, v) in self.optimizers.schedulers.items()},
+            "scalers": self.grad_scaler.state_dict(),
+        }
+        # possibly delete old checkpoints, once the new one is in place
+        delete_others = self.config.save_only_latest_checkpoint
+        save_kwargs = {
+            "delete_others": delete_others,
+            "inference_dtype": getattr(torch, self.config.inference_checkpoint_dtype),
+            "save_inference": self.config.save_inference_checkpoint,
+        }
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.submit(step, state, ckpt_path, **save_kwargs)
+        else:
+            write_checkpoint(state, ckpt_path, **save_kwargs)
+        stall = time.perf_counter() - start
+        writer.put_time(name=EventName.CHECKPOINT_STALL, duration=stall, step=step, avg_over_steps=False)
+        if self.checkpoint_writer is None:
+            writer.put_time(name=EventName.CHECKPOINT_SAVE_LATENCY, duration=stall, step=step, avg_over_steps=False)
+        else:
+            self._put_checkpoint_latencies()
+
+    def _put_checkpoint_latencies(self) -> None:
+        """Log how long the background checkpoint writes that finished took."""
+        assert self.checkpoint_writer is not None
+        for step, latency in self.checkpoint_writer.pop_finished():
+            writer.put_time(name=EventName.CHECKPOINT_SAVE_LATENCY, duration=latency, step=step, avg_over_steps=False)
 
     @profiler.time_function
     def train_iteration(self, step: int) -> TRAIN_INTERATION_OUTPUT:
@@ -0,0 +1,257 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Quantized, chunked Gaussian splat PLY format.
+
+The layout follows the "compressed PLY" format understood by the PlayCanvas/SuperSplat viewers. Gaussians are sorted
+along a Morton curve and split into chunks of 256. Each chunk stores the min/max bounds of its positions, log scales
+and base colors. Per Gaussian, positions and scales are quantized to 11/10/11 bits relative to the chunk bounds, the
+rotation is stored as the three smallest quaternion components at 10 bits each, color and opacity at 8 bits each and
+every higher-order SH coefficient at 8 bits.
+"""
+
+from __future__ import annotations
+
+import typing
+from collections import OrderedDict
+from importlib.metadata import version
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from nerfstudio.utils.ply_utils import read_ply
+
+CHUNK_SIZE = 256
+"""Number of Gaussians sharing one set of quantization bounds."""
+SH_C0 = 0.28209479177387814
+"""Zeroth order spherical harmonics constant."""
+
+CHUNK_PROPERTIES = (
+    ["min_x", "min_y", "min_z", "max_x", "max_y", "max_z"]
+    + ["min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z"]
+    + ["min_r", "min_g", "min_b", "max_r", "max_g", "max_b"]
+)
+VERTEX_PROPERTIES = ["packed_position", "packed_rotation", "packed_scale", "packed_color"]
+
+
+def _part1by2(x: np.ndarray) -> np.ndarray:
+    """Spread the lower 10 bits of x so that there are two zero bits between each of them."""
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x ^ (x << 16)) & 0xFF0000FF
+    x = (x ^ (x << 8)) & 0x0300F00F
+    x = (x ^ (x << 4)) & 0x030C30C3
+    x = (x ^ (x << 2)) & 0x09249249
+    return x
+
+
+def morton_order(positions: np.ndarray) -> np.ndarray:
+    """Return the permutation that sorts points along a 30 bit Morton (Z-order) curve over their bounding box.
+
+    Args:
+        positions: Array of shape (N, 3).
+    """
+    lo = positions.min(axis=0)
+    extent = positions.max(axis=0) - lo
+    extent[extent == 0] = 1
+    cells = np.clip((positions - lo) / extent * 1023, 0, 1023).astype(np.uint32)
+    codes = _part1by2(cells[:, 0]) | (_part1by2(cells[:, 1]) << 1) | (_part1by2(cells[:, 2]) << 2)
+    return np.argsort(codes, kind="stable")
+
+
+def _chunk_bounds(values: np.ndarray):
+    """Per-chunk min and max of a (N, C) array, and the values normalized to [0, 1] within their chunk."""
+    starts = np.arange(0, values.shape[0], CHUNK_SIZE)
+    lo = np.minimum.reduceat(values, starts, axis=0)
+    hi = np.maximum.reduceat(values, starts, axis=0)
+    chunk_index = np.arange(values.shape[0]) // CHUNK_SIZE
+    extent = hi - lo
+    extent[extent == 0] = 1
+    normalized = (values - lo[chunk_index]) / extent[chunk_index]
+    return lo, hi, normalized
+
+
+def _pack_unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    t = (1 << bits) - 1
+    return np.clip(np.floor(values * t + 0.5), 0, t).astype(np.uint32)
+
+
+def _unpack_unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    t = (1 << bits) - 1
+    return (values & t).astype(np.float32) / t
+
+
+def _pack_111011(values: np.ndarray) -> np.ndarray:
+    return (_pack_unorm(values[:, 0], 11) << 21) | (_pack_unorm(values[:, 1], 10) << 11) | _pack_unorm(values[:, 2], 11)
+
+
+def _unpack_111011(packed: np.ndarray) -> np.ndarray:
+    return np.stack([_unpack_unorm(packed >> 21, 11), _unpack_unorm(packed >> 11, 10), _unpack_unorm(packed, 11)], -1)
+
+
+def _pack_rotation(quats_wxyz: np.ndarray) -> np.ndarray:
+    """Smallest-three encoding: 2 bits for the index of the largest component, 10 bits for each of the others."""
+    quats = quats_wxyz[:, [1, 2, 3, 0]].astype(np.float64)  # x, y, z, w as expected by the viewers
+    quats /= np.maximum(np.linalg.norm(quats, axis=-1, keepdims=True), 1e-12)
+    largest = np.argmax(np.abs(quats), axis=-1)
+    rows = np.arange(quats.shape[0])
+    quats *= np.where(quats[rows, largest] < 0, -1.0, 1.0)[:, None]
+    others = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    packed = largest.astype(np.uint32)
+    for i in range(3):
+        packed = (packed << 10) | _pack_unorm(quats[rows, others[:, i]] * np.sqrt(0.5) + 0.5, 10)
+    return packed
+
+
+def _unpack_rotation(packed: np.ndarray) -> np.ndarray:
+    norm = 1.0 / np.sqrt(0.5)
+    abc = np.stack([(_unpack_unorm(packed >> shift, 10) - 0.5) * norm for shift in (20, 10, 0)], axis=-1)
+    largest = (packed >> 30).astype(np.int64)
+    m = np.sqrt(np.maximum(0.0, 1.0 - np.sum(abc * abc, axis=-1)))
+    quats = np.empty((packed.shape[0], 4), dtype=np.float32)
+    rows = np.arange(packed.shape[0])
+    others = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    quats[rows, largest] = m
+    for i in range(3):
+        quats[rows, others[:, i]] = abc[:, i]
+    return quats[:, [3, 0, 1, 2]]  # back to w, x, y, z
+
+
+def write_compressed_ply(
+    filename: Union[str, Path],
+    map_to_tensors: typing.OrderedDict[str, np.ndarray],
+) -> None:
+    """
+    Writes Gaussians in the quantized, chunked PLY format.
+
+    Parameters:
+    filename: The name of the file to write.
+    map_to_tensors: Property map as produced by ExportGaussianSplat, in spherical harmonics color mode. Must contain
+        x, y, z, f_dc_0..2, opacity, scale_0..2 and rot_0..3, and may contain f_rest_* coefficients.
+    """
+    columns = {key: np.asarray(tensor, dtype=np.float32).reshape(-1) for key, tensor in map_to_tensors.items()}
+    missing = [key for key in ("x", "f_dc_0", "opacity", "scale_0", "rot_0") if key not in columns]
+    if missing:
+        raise ValueError(f"Compressed PLY export needs spherical harmonics properties, missing {missing}")
+    count = columns["x"].shape[0]
+    if count == 0:
+        raise ValueError("Cannot write an empty compressed PLY")
+
+    positions = np.stack([columns["x"], columns["y"], columns["z"]], axis=-1)
+    order = morton_order(positions)
+    positions = positions[order]
+    scales = np.clip(np.stack([columns[f"scale_{i}"] for i in range(3)], axis=-1)[order], -20, 20)
+    quats = np.stack([columns[f"rot_{i}"] for i in range(4)], axis=-1)[order]
+    colors = np.stack([columns[f"f_dc_{i}"] for i in range(3)], axis=-1)[order] * SH_C0 + 0.5
+    alpha = 1.0 / (1.0 + np.exp(-columns["opacity"][order]))
+    sh_keys = sorted((key for key in columns if key.startswith("f_rest_")), key=lambda key: int(key[len("f_rest_") :]))
+
+    position_lo, position_hi, positions = _chunk_bounds(positions)
+    scale_lo, scale_hi, scales = _chunk_bounds(scales)
+    color_lo, color_hi, colors = _chunk_bounds(colors)
+
+    chunks = np.concatenate([position_lo, position_hi, scale_lo, scale_hi, color_lo, color_hi], axis=-1)
+    vertices = np.empty(count, dtype=np.dtype([(key, "<u4") for key in VERTEX_PROPERTIES]))
+    vertices["packed_position"] = _pack_111011(positions)
+    vertices["packed_rotation"] = _pack_rotation(quats)
+    vertices["packed_scale"] = _pack_111011(scales)
+    packed_color = np.concatenate([colors, alpha[:, None]], axis=-1)
+    vertices["packed_color"] = (
+        (_pack_unorm(packed_color[:, 0], 8) << 24)
+        | (_pack_unorm(packed_color[:, 1], 8) << 16)
+        | (_pack_unorm(packed_color[:, 2], 8) << 8)
+        | _pack_unorm(packed_color[:, 3], 8)
+    )
+
+    with open(filename, "wb") as ply_file:
+        ply_file.write(b"ply\n")
+        ply_file.write(b"format binary_little_endian 1.0\n")
+        ply_file.write(f"comment Generated by Nerstudio {version('nerfstudio')}\n".encode())
+        ply_file.write(f"element chunk {chunks.shape[0]}\n".encode())
+        for key in CHUNK_PROPERTIES:
+            ply_file.write(f"property float {key}\n".encode())
+        ply_file.write(f"element vertex {count}\n".encode())
+        for key in VERTEX_PROPERTIES:
+            ply_file.write(f"property uint {key}\n".encode())
+        if sh_keys:
+            ply_file.write(f"element sh {count}\n".encode())
+            for key in sh_keys:
+                ply_file.write(f"property uchar {key}\n".encode())
+        ply_file.write(b"end_header\n")
+
+        chunks.astype("<f4").tofile(ply_file)
+        vertices.tofile(ply_file)
+        if sh_keys:
+            sh = np.stack([columns[key][order] for key in sh_keys], axis=-1)
+            np.clip(np.trunc((sh / 8 + 0.5) * 256), 0, 255).astype(np.uint8).tofile(ply_file)
+
+
+def read_compressed_ply(filename: Union[str, Path]) -> typing.OrderedDict[str, np.ndarray]:
+    """
+    Reads a quantized, chunked PLY back into the uncompressed property layout used by ExportGaussianSplat.
+
+    Parameters:
+    filename: The name of the file to read.
+
+    Returns:
+    An ordered dictionary mapping x, y, z, f_dc_*, f_rest_*, opacity, scale_* and rot_* to float32 arrays, in the
+    Morton order the file was written in.
+    """
+    elements = read_ply(filename)
+    if "chunk" not in elements or "vertex" not in elements:
+        raise ValueError(f"{filename} is not a compressed splat PLY")
+    chunks = elements["chunk"]
+    vertices = elements["vertex"]
+    count = vertices.shape[0]
+    chunk_index = np.arange(count) // CHUNK_SIZE
+
+    def bounds(names):
+        return np.stack([chunks[name] for name in names], axis=-1)[chunk_index]
+
+    def lerp(lo, hi, t):
+        return (lo + (hi - lo) * t).astype(np.float32)
+
+    positions = lerp(
+        bounds(["min_x", "min_y", "min_z"]),
+        bounds(["max_x", "max_y", "max_z"]),
+        _unpack_111011(vertices["packed_position"]),
+    )
+    scales = lerp(
+        bounds(["min_scale_x", "min_scale_y", "min_scale_z"]),
+        bounds(["max_scale_x", "max_scale_y", "max_scale_z"]),
+        _unpack_111011(vertices["packed_scale"]),
+    )
+    packed_color = vertices["packed_color"]
+    colors = np.stack([_unpack_unorm(packed_color >> shift, 8) for shift in (24, 16, 8)], axis=-1)
+    if "min_r" in chunks.dtype.names:
+        colors = lerp(bounds(["min_r", "min_g", "min_b"]), bounds(["max_r", "max_g", "max_b"]), colors)
+    alpha = np.clip(_unpack_unorm(packed_color, 8), 1e-6, 1 - 1e-6)
+    quats = _unpack_rotation(vertices["packed_rotation"])
+
+    map_to_tensors: typing.OrderedDict[str, np.ndarray] = OrderedDict()
+    for i, axis in enumerate("xyz"):
+        map_to_tensors[axis] = positions[:, i]
+    for i in range(3):
+        map_to_tensors[f"f_dc_{i}"] = (colors[:, i] - 0.5) / SH_C0
+    if "sh" in elements:
+        sh = elements["sh"]
+        for key in sh.dtype.names:
+            map_to_tensors[key] = (((sh[key].astype(np.float32) + 0.5) / 256) - 0.5) * 8
+    map_to_tensors["opacity"] = np.log(alpha / (1 - alpha)).astype(np.float32)
+    for i in range(3):
+        map_to_tensors[f"scale_{i}"] = scales[:, i]
+    for i in range(4):
+        map_to_tensors[f"rot_{i}"] = quats[:, i]
+    return map_to_tensors
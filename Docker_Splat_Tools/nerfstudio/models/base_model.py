@@ -174,6 +174,15 @@ class Model(nn.Module):
             camera.generate_rays(camera_indices=0, keep_shape=True, obb_box=obb_box)
         )
 
+    @torch.no_grad()
+    def get_outputs_for_cameras(self, cameras: List[Cameras]) -> List[Dict[str, torch.Tensor]]:
+        """Computes the outputs of several single cameras. Models that can render cameras together override this.
+
+        Args:
+            cameras: cameras to render, each of shape [1]
+        """
+        return [self.get_outputs_for_camera(camera) for camera in cameras]
+
     @torch.no_grad()
     def get_outputs_for_camera_ray_bundle(self, camera_ray_bundle: RayBundle) -> Dict[str, torch.Tensor]:
         """Takes in camera parameters and computes the output of the model.
@@ -241,6 +250,23 @@ class Model(nn.Module):
             A dictionary of metrics.
         """
 
+    def get_batched_image_metrics_and_images(
+        self, outputs: List[Dict[str, torch.Tensor]], batches: List[Dict[str, torch.Tensor]]
+    ) -> Tuple[Dict[str, torch.Tensor], List[Dict[str, torch.Tensor]]]:
+        """Computes the test metrics and images of several images. Models that can score images together override
+        this.
+
+        Args:
+            outputs: Outputs of the model for each image.
+            batches: Batch of data for each image.
+
+        Returns:
+            The metrics of the images, each a tensor with one value per image, and the images of each image.
+        """
+        metrics_list, images_list = zip(*(self.get_image_metrics_and_images(o, b) for o, b in zip(outputs, batches)))
+        metrics = {key: torch.tensor([m[key] for m in metrics_list]) for key in metrics_list[0]}
+        return metrics, list(images_list)
+
     def load_model(self, loaded_state: Dict[str, Any]) -> None:
         """Load the checkpoint from the given path
 
@@ -29,7 +29,7 @@ try:
     from gsplat.rendering import rasterization
 except ImportError:
     print("Please install gsplat>=1.0.0")
-from pytorch_msssim import SSIM
+from pytorch_msssim import SSIM, ssim
 from torch.nn import Parameter
 
 from nerfstudio.cameras.camera_optimizers import CameraOptimizer, CameraOptimizerConfig
@@ -40,7 +40,7 @@ from nerfstudio.engine.optimizers import Optimizers
 from nerfstudio.model_components.lib_bilagrid import BilateralGrid, color_correct, slice, total_variation_loss
 from nerfstudio.models.base_model import Model, ModelConfig
 from nerfstudio.utils.colors import get_color
-from nerfstudio.utils.math import k_nearest_sklearn, random_quat_tensor
+from nerfstudio.utils.math import k_nearest_neighbors, random_quat_tensor
 from nerfstudio.utils.misc import torch_compile
 from nerfstudio.utils.rich_utils import CONSOLE
 from nerfstudio.utils.spherical_harmonics import RGB2SH, SH2RGB, num_sh_bases
@@ -124,6 +124,10 @@ class SplatfactoModelConfig(ModelConfig):
     """Number of gaussians to initialize if random init is used"""
     random_scale: float = 10.0
     "Size of the cube to initialize random gaussians within"
+    knn_backend: Literal["sklearn", "grid"] = "sklearn"
+    """KNN search used to initialize the scales of the gaussians: sklearn's NearestNeighbors, or the multi-threaded
+    torch voxel grid search, which can be faster on large, evenly spread seed point clouds but is slower on
+    clustered ones"""
     ssim_lambda: float = 0.2
     """weight of ssim loss"""
     stop_split_at: int = 15000
@@ -191,7 +195,7 @@ class SplatfactoModel(Model):
             means = torch.nn.Parameter(self.seed_points[0])  # (Location, Color)
         else:
             means = torch.nn.Parameter((torch.rand((self.config.num_random, 3)) - 0.5) * self.config.random_scale)
-        distances, _ = k_nearest_sklearn(means.data, 3)
+        distances, _ = k_nearest_neighbors(means.data, 3, backend=self.config.knn_backend)
         # find the average of the three nearest neighbors for each point and use that as the scale
         avg_dist = distances.mean(dim=-1, keepdim=True)
         scales = torch.nn.Parameter(torch.log(avg_dist.repeat(1, 3)))
@@ -496,6 +500,7 @@ class SplatfactoModel(Model):
             print("Called get_outputs with not a camera")
             return {}
 
+        # several cameras of the same resolution can be rendered together for evaluation
         if self.training:
             assert camera.shape[0] == 1, "Only one camera at a time"
             optimized_camera_to_world = self.camera_optimizer.apply_to_camera(camera)
@@ -533,7 +538,7 @@ class SplatfactoModel(Model):
         camera.rescale_output_resolution(1 / camera_scale_fac)
         viewmat = get_viewmat(optimized_camera_to_world)
         K = camera.get_intrinsics_matrices().cuda()
-        W, H = int(camera.width.item()), int(camera.height.item())
+        W, H = int(camera.width[0].item()), int(camera.height[0].item())
         self.last_size = (H, W)
         camera.rescale_output_resolution(camera_scale_fac)  # type: ignore
 
@@ -558,8 +563,8 @@ class SplatfactoModel(Model):
             scales=torch.exp(scales_crop),
             opacities=torch.sigmoid(opacities_crop).squeeze(-1),
             colors=colors_crop,
-            viewmats=viewmat,  # [1, 4, 4]
-            Ks=K,  # [1, 3, 3]
+            viewmats=viewmat,  # [C, 4, 4]
+            Ks=K,  # [C, 3, 3]
             width=W,
             height=H,
             packed=False,
@@ -590,7 +595,7 @@ class SplatfactoModel(Model):
 
         if render_mode == "RGB+ED":
             depth_im = render[:, ..., 3:4]
-            depth_im = torch.where(alpha > 0, depth_im, depth_im.detach().max()).squeeze(0)
+            depth_im = torch.where(alpha > 0, depth_im, depth_im.detach().amax(dim=(1, 2, 3), keepdim=True)).squeeze(0)
         else:
             depth_im = None
 
@@ -722,6 +727,78 @@ class SplatfactoModel(Model):
         outs = self.get_outputs(camera.to(self.device))
         return outs  # type: ignore
 
+    @torch.no_grad()
+    def get_outputs_for_cameras(self, cameras: List[Cameras]) -> List[Dict[str, torch.Tensor]]:
+        """Renders cameras of the same resolution together, with one rasterization call per resolution.
+
+        Args:
+            cameras: cameras to render, each of shape [1]
+        """
+        self.set_crop(None)
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i, camera in enumerate(cameras):
+            groups.setdefault((int(camera.width), int(camera.height)), []).append(i)
+        outputs: List[Dict[str, torch.Tensor]] = [{} for _ in cameras]
+        for indices in groups.values():
+            group = [cameras[i] for i in indices]
+            batched_camera = Cameras(
+                camera_to_worlds=torch.cat([camera.camera_to_worlds for camera in group]),
+                fx=torch.cat([camera.fx for camera in group]),
+                fy=torch.cat([camera.fy for camera in group]),
+                cx=torch.cat([camera.cx for camera in group]),
+                cy=torch.cat([camera.cy for camera in group]),
+                width=torch.cat([camera.width for camera in group]),
+                height=torch.cat([camera.height for camera in group]),
+                camera_type=torch.cat([camera.camera_type for camera in group]),
+            )
+            group_outputs = self.get_outputs(batched_camera.to(self.device))
+            for key, value in group_outputs.items():
+                if key != "background":
+                    value = value.reshape(len(indices), *value.shape[-3:])  # type: ignore
+                for j, i in enumerate(indices):
+                    outputs[i][key] = value if key == "background" else value[j]  # type: ignore
+        return outputs
+
+    def _get_batched_image_metrics(self, gt_rgb: torch.Tensor, predicted_rgb: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """PSNR, SSIM and LPIPS of each image of [B, 3, H, W] batches, with the same values as self.psnr, self.ssim
+        and self.lpips on single images."""
+        mse = (gt_rgb - predicted_rgb).square().mean(dim=(1, 2, 3))
+        return {
+            "psnr": -10.0 * torch.log10(mse),
+            "ssim": ssim(gt_rgb, predicted_rgb, data_range=1.0, size_average=False),
+            "lpips": self.lpips.net(gt_rgb, predicted_rgb, normalize=True).reshape(-1),
+        }
+
+    def get_batched_image_metrics_and_images(
+        self, outputs: List[Dict[str, torch.Tensor]], batches: List[Dict[str, torch.Tensor]]
+    ) -> Tuple[Dict[str, torch.Tensor], List[Dict[str, torch.Tensor]]]:
+        """Computes the test metrics of images of the same resolution in batches. The metrics stay on the device.
+
+        Args:
+            outputs: Outputs of the model for each image.
+            batches: Batch of data for each image.
+
+        Returns:
+            The metrics of the images, each a tensor with one value per image, and the images of each image.
+        """
+        gt_rgbs = [
+            self.composite_with_background(self.get_gt_img(batch["image"]), output["background"])
+            for output, batch in zip(outputs, batches)
+        ]
+        if len({gt.shape for gt in gt_rgbs} | {output["rgb"].shape for output in outputs}) > 1:
+            return super().get_batched_image_metrics_and_images(outputs, batches)
+        gt_rgb = torch.stack(gt_rgbs)
+        predicted_rgb = torch.stack([output["rgb"] for output in outputs])
+        images = [{"img": torch.cat([gt, predicted], dim=1)} for gt, predicted in zip(gt_rgb, predicted_rgb)]
+
+        # Switch images from [B, H, W, C] to [B, C, H, W] for metrics computations
+        metrics_dict = self._get_batched_image_metrics(gt_rgb.permute(0, 3, 1, 2), predicted_rgb.permute(0, 3, 1, 2))
+        if self.config.color_corrected_metrics:
+            cc_rgb = torch.stack([color_correct(predicted, gt) for predicted, gt in zip(predicted_rgb, gt_rgb)])
+            cc_metrics = self._get_batched_image_metrics(gt_rgb.permute(0, 3, 1, 2), cc_rgb.permute(0, 3, 1, 2))
+            metrics_dict.update({f"cc_{key}": value for key, value in cc_metrics.items()})
+        return metrics_dict, images
+
     def get_image_metrics_and_images(
         self, outputs: Dict[str, torch.Tensor], batch: Dict[str, torch.Tensor]
     ) -> Tuple[Dict[str, float], Dict[str, torch.Tensor]]:
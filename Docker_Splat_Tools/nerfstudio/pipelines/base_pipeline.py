@@ -18,12 +18,15 @@ Abstracts for the Pipeline class.
 
 from __future__ import annotations
 
+import concurrent.futures
 import typing
 from abc import abstractmethod
+from collections import deque
 from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 from time import time
-from typing import Any, Dict, List, Literal, Mapping, Optional, Tuple, Type, Union, cast
+from typing import Any, Deque, Dict, List, Literal, Mapping, Optional, Tuple, Type, Union, cast
 
 import torch
 import torch.distributed as dist
@@ -218,6 +221,10 @@ class VanillaPipelineConfig(InstantiateConfig):
     """specifies the datamanager config"""
     model: ModelConfig = field(default_factory=ModelConfig)
     """specifies the model config"""
+    eval_batch_size: int = 4
+    """Number of evaluation images rendered and scored together when averaging the metrics of all images."""
+    eval_image_writer_threads: int = 4
+    """Number of threads encoding and writing the rendered evaluation images."""
 
 
 class VanillaPipeline(Pipeline):
@@ -353,6 +360,9 @@ class VanillaPipeline(Pipeline):
     ):
         """Iterate over all the images in the dataset and get the average.
 
+        Images are rendered and scored config.eval_batch_size at a time, and the rendered images are written by a
+        pool of writer threads. The throughput over all images is reported as images_per_sec.
+
         Args:
             data_loader: the data loader to iterate over
             image_prefix: prefix to use for the saved image filenames
@@ -364,54 +374,72 @@ class VanillaPipeline(Pipeline):
             metrics_dict: dictionary of metrics
         """
         self.eval()
-        metrics_dict_list = []
+        metrics_lists: Dict[str, List[torch.Tensor]] = {}
         num_images = len(data_loader)
+        batch_size = max(1, self.config.eval_batch_size)
         if output_path is not None:
             output_path.mkdir(exist_ok=True, parents=True)
+        writer_threads = max(1, self.config.eval_image_writer_threads)
+        pending_writes: Deque[concurrent.futures.Future] = deque()
+        eval_start = time()
         with Progress(
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TimeElapsedColumn(),
             MofNCompleteColumn(),
             transient=True,
-        ) as progress:
+        ) as progress, concurrent.futures.ThreadPoolExecutor(writer_threads, "eval_image_writer") as image_writer:
             task = progress.add_task("[green]Evaluating all images...", total=num_images)
             idx = 0
-            for camera, batch in data_loader:
-                # time this the following line
+            data_iter = iter(data_loader)
+            while chunk := list(islice(data_iter, batch_size)):
+                # time this the following lines
                 inner_start = time()
-                outputs = self.model.get_outputs_for_camera(camera=camera)
-                height, width = camera.height, camera.width
-                num_rays = height * width
-                metrics_dict, image_dict = self.model.get_image_metrics_and_images(outputs, batch)
+                cameras = [camera for camera, _ in chunk]
+                outputs = self.model.get_outputs_for_cameras(cameras)
+                metrics, images = self.model.get_batched_image_metrics_and_images(
+                    outputs, [batch for _, batch in chunk]
+                )
                 if output_path is not None:
-                    for key in image_dict.keys():
-                        image = image_dict[key]  # [H, W, C] order
-                        vutils.save_image(
-                            image.permute(2, 0, 1).cpu(), output_path / f"{image_prefix}_{key}_{idx:04d}.png"
-                        )
-
-                assert "num_rays_per_sec" not in metrics_dict
-                metrics_dict["num_rays_per_sec"] = (num_rays / (time() - inner_start)).item()
+                    for image_dict in images:
+                        for key, image in image_dict.items():
+                            # [H, W, C] order, PNG encoding happens in the writer threads
+                            image = image.permute(2, 0, 1).cpu()
+                            path = output_path / f"{image_prefix}_{key}_{idx:04d}.png"
+                            pending_writes.append(image_writer.submit(vutils.save_image, image, path))
+                        idx = idx + 1
+                    while len(pending_writes) > 2 * writer_threads:
+                        pending_writes.popleft().result()
+                if self.device.type == "cuda":
+                    torch.cuda.synchronize(self.device)
+                seconds_per_image = (time() - inner_start) / len(chunk)
+
+                num_rays = torch.tensor([float(int(camera.height) * int(camera.width)) for camera in cameras])
+                assert "num_rays_per_sec" not in metrics
+                metrics["num_rays_per_sec"] = num_rays / seconds_per_image
                 fps_str = "fps"
-                assert fps_str not in metrics_dict
-                metrics_dict[fps_str] = (metrics_dict["num_rays_per_sec"] / (height * width)).item()
-                metrics_dict_list.append(metrics_dict)
-                progress.advance(task)
-                idx = idx + 1
+                assert fps_str not in metrics
+                metrics[fps_str] = torch.full((len(chunk),), 1.0 / seconds_per_image)
+                # metrics stay on the pipeline device until all images are scored. Batched chunks score on the
+                # device, chunks of mixed resolutions fall back to per-image metrics on the CPU
+                for key, values in metrics.items():
+                    metrics_lists.setdefault(key, []).append(values.reshape(-1).to(self.device))
+                progress.advance(task, len(chunk))
+            for write in pending_writes:
+                write.result()
+        images_per_sec = num_images / (time() - eval_start)
 
         metrics_dict = {}
-        for key in metrics_dict_list[0].keys():
+        for key, values_list in metrics_lists.items():
+            values = torch.cat(values_list).float()
             if get_std:
-                key_std, key_mean = torch.std_mean(
-                    torch.tensor([metrics_dict[key] for metrics_dict in metrics_dict_list])
-                )
+                key_std, key_mean = torch.std_mean(values)
                 metrics_dict[key] = float(key_mean)
                 metrics_dict[f"{key}_std"] = float(key_std)
             else:
-                metrics_dict[key] = float(
-                    torch.mean(torch.tensor([metrics_dict[key] for metrics_dict in metrics_dict_list]))
-                )
+                metrics_dict[key] = float(torch.mean(values))
+        assert "images_per_sec" not in metrics_dict
+        metrics_dict["images_per_sec"] = images_per_sec
 
         self.train()
         return metrics_dict
@@ -104,6 +104,18 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
     use_single_camera_mode: bool = True
     """Whether to assume all images taken with the same camera characteristics, set to False for multiple cameras in colmap (only works with hloc sfm_tool).
     """
+    cache_dir: Optional[Path] = None
+    """Optional content-addressed cache directory. Processed images are hard-linked from it and the conversion of an
+       unchanged COLMAP model is copied from it instead of being redone. Can be shared between output directories.
+    """
+    image_engine: Literal["ffmpeg", "opencv", "pillow"] = "ffmpeg"
+    """Backend that copies, crops and downscales images. opencv and pillow process images in parallel in-process."""
+    image_workers: Optional[int] = None
+    """Worker processes of the opencv and pillow image engines. Defaults to the number of CPU cores."""
+    resize_filter: Literal["area", "nearest", "linear", "cubic", "lanczos"] = "area"
+    """Interpolation used by the opencv and pillow image engines to downscale."""
+    link_mode: Literal["copy", "hardlink", "reflink"] = "copy"
+    """How the opencv and pillow image engines place full resolution images that are not cropped or converted."""
 
     @staticmethod
     def default_colmap_path() -> Path:
@@ -140,6 +152,7 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
                     camera_mask_path=camera_mask_path,
                     image_rename_map=image_rename_map,
                     use_single_camera_mode=self.use_single_camera_mode,
+                    cache_dir=self.cache_dir,
                 )
                 summary_log.append(f"Colmap matched {num_matched_frames} images")
             summary_log.append(colmap_utils.get_matching_summary(num_frames, num_matched_frames))
@@ -175,6 +188,8 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
                     folder_name="depths",
                     nearest_neighbor=True,
                     verbose=self.verbose,
+                    engine=self.image_engine,
+                    num_workers=self.image_workers,
                 )
             )
             return image_id_to_depth_path, summary_log
@@ -17,8 +17,12 @@ Tools supporting the execution of COLMAP and preparation of COLMAP-based dataset
 """
 
 import json
+import os
+import shlex
+import sqlite3
+from contextlib import closing
 from pathlib import Path
-from typing import Any, Dict, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
 import appdirs
 import cv2
@@ -31,14 +35,18 @@ from rich.progress import track
 # TODO(1480) use pycolmap instead of colmap_parsing_utils
 # import pycolmap
 from nerfstudio.data.utils.colmap_parsing_utils import (
+    ColmapPoints3D,
     qvec2rotmat,
     read_cameras_binary,
     read_images_binary,
     read_points3D_binary,
+    read_points3D_binary_columnar,
     read_points3D_text,
 )
+from nerfstudio.process_data.process_data_cache import ProcessDataCache, sha256_json
 from nerfstudio.process_data.process_data_utils import CameraModel
 from nerfstudio.utils import colormaps
+from nerfstudio.utils.ply_utils import write_ply
 from nerfstudio.utils.rich_utils import CONSOLE, status
 from nerfstudio.utils.scripts import run_command
 
@@ -64,12 +72,24 @@ def get_colmap_version(colmap_cmd: str, default_version: str = "3.8") -> Version
     return Version(default_version)
 
 
+"""Environment variable with the path of a local vocab tree, used instead of downloading one, e.g. on machines
+without internet access."""
+VOCAB_TREE_ENV = "NERFSTUDIO_VOCAB_TREE"
+
+
 def get_vocab_tree() -> Path:
-    """Return path to vocab tree. Downloads vocab tree if it doesn't exist.
+    """Return path to vocab tree. Uses the file NERFSTUDIO_VOCAB_TREE points to if set, else downloads the vocab tree
+    if it doesn't exist.
 
     Returns:
         The path to the vocab tree.
     """
+    local_vocab_tree = os.environ.get(VOCAB_TREE_ENV)
+    if local_vocab_tree:
+        if not Path(local_vocab_tree).exists():
+            raise FileNotFoundError(f"{VOCAB_TREE_ENV} points to {local_vocab_tree}, which does not exist")
+        return Path(local_vocab_tree)
+
     vocab_tree_filename = Path(appdirs.user_data_dir("nerfstudio")) / "vocab_tree.fbow"
 
     if not vocab_tree_filename.exists():
@@ -89,6 +109,48 @@ def get_vocab_tree() -> Path:
     return vocab_tree_filename
 
 
+def get_matcher_args(
+    matching_method: Literal["vocab_tree", "exhaustive", "sequential"],
+    loop_detection: bool = False,
+    vocab_tree_path: Optional[Path] = None,
+) -> List[str]:
+    """Returns the COLMAP subcommand and the options specific to a matching method.
+
+    Args:
+        matching_method: Matching method to use.
+        loop_detection: If True, sequential matching also matches each image against its most similar images in the
+            vocab tree, which closes loops when a video returns to a place seen before.
+        vocab_tree_path: Vocab tree to use. Defaults to get_vocab_tree().
+
+    Returns:
+        The arguments following the COLMAP executable, without the database path and shared matching options.
+    """
+    matcher_args = [f"{matching_method}_matcher"]
+    if matching_method == "vocab_tree":
+        matcher_args += ["--VocabTreeMatching.vocab_tree_path", str(vocab_tree_path or get_vocab_tree())]
+    elif matching_method == "sequential" and loop_detection:
+        matcher_args += [
+            "--SequentialMatching.loop_detection",
+            "1",
+            "--SequentialMatching.vocab_tree_path",
+            str(vocab_tree_path or get_vocab_tree()),
+        ]
+    return matcher_args
+
+
+def count_matched_image_pairs(database_path: Path) -> Tuple[int, int]:
+    """Returns the number of image pairs with feature matches in a COLMAP database, and how many of them were
+    geometrically verified.
+
+    Args:
+        database_path: Path to the COLMAP database.
+    """
+    with closing(sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)) as database:
+        matched = database.execute("SELECT COUNT(*) FROM matches WHERE rows > 0").fetchone()[0]
+        verified = database.execute("SELECT COUNT(*) FROM two_view_geometries WHERE rows > 0").fetchone()[0]
+    return matched, verified
+
+
 def run_colmap(
     image_dir: Path,
     colmap_dir: Path,
@@ -138,13 +200,10 @@ def run_colmap(
 
     # Feature matching
     feature_matcher_cmd = [
-        f"{colmap_cmd} {matching_method}_matcher",
+        f"{colmap_cmd} {shlex.join(get_matcher_args(matching_method))}",
         f"--database_path {colmap_dir / 'database.db'}",
         f"--SiftMatching.use_gpu {int(gpu)}",
     ]
-    if matching_method == "vocab_tree":
-        vocab_tree_filename = get_vocab_tree()
-        feature_matcher_cmd.append(f'--VocabTreeMatching.vocab_tree_path "{vocab_tree_filename}"')
     feature_matcher_cmd = " ".join(feature_matcher_cmd)
     with status(msg="[bold yellow]Running COLMAP feature matcher...", spinner="runner", verbose=verbose):
         run_command(feature_matcher_cmd, verbose=verbose)
@@ -396,6 +455,7 @@ def colmap_to_json(
     ply_filename="sparse_pc.ply",
     keep_original_world_coordinate: bool = False,
     use_single_camera_mode: bool = True,
+    cache_dir: Optional[Path] = None,
 ) -> int:
     """Converts COLMAP's cameras.bin and images.bin to a JSON file.
 
@@ -409,9 +469,34 @@ def colmap_to_json(
         keep_original_world_coordinate: If True, no extra transform will be applied to world coordinate.
                     Colmap optimized world often have y direction of the first camera pointing towards down direction,
                     while nerfstudio world set z direction to be up direction for viewer.
+        cache_dir: If set, an earlier conversion of the same model files with the same arguments is copied from
+                    this content-addressed cache instead of being redone, and new conversions are added to it.
     Returns:
         The number of registered images.
     """
+    cache = None
+    if cache_dir is not None:
+        cache = ProcessDataCache(cache_dir)
+        model_files = sorted(
+            p for p in recon_dir.iterdir() if p.name in ("cameras.bin", "images.bin", "points3D.bin", "points3D.txt")
+        )
+        cache_key = sha256_json(
+            {
+                "model": dict(zip([p.name for p in model_files], cache.hash_files(model_files))),
+                "camera_mask_path": camera_mask_path,
+                "image_id_to_depth_path": image_id_to_depth_path,
+                "image_rename_map": image_rename_map,
+                "ply_filename": ply_filename,
+                "keep_original_world_coordinate": keep_original_world_coordinate,
+                "use_single_camera_mode": use_single_camera_mode,
+            }
+        )
+        num_frames = cache.restore_colmap(cache_key, output_dir)
+        if num_frames is not None:
+            CONSOLE.log(
+                f"[bold green]Reused transforms.json and {ply_filename} of an identical COLMAP model from cache"
+            )
+            return num_frames
 
     # TODO(1480) use pycolmap
     # recon = pycolmap.Reconstruction(recon_dir)
@@ -491,6 +576,9 @@ def colmap_to_json(
     with open(output_dir / "transforms.json", "w", encoding="utf-8") as f:
         json.dump(out, f, indent=4)
 
+    if cache is not None:
+        cache.store_colmap(cache_key, [output_dir / "transforms.json", output_dir / ply_filename], len(frames))
+
     return len(frames)
 
 
@@ -671,7 +759,7 @@ def get_matching_summary(num_initial_frames: int, num_matched_frames: int) -> st
 def create_ply_from_colmap(
     filename: str, recon_dir: Path, output_dir: Path, applied_transform: Union[torch.Tensor, None]
 ) -> None:
-    """Writes a ply file from colmap.
+    """Writes a binary ply file from colmap.
 
     Args:
         filename: file name for .ply
@@ -679,36 +767,25 @@ def create_ply_from_colmap(
         output_dir: Directory to output .ply
     """
     if (recon_dir / "points3D.bin").exists():
-        colmap_points = read_points3D_binary(recon_dir / "points3D.bin")
+        colmap_points = read_points3D_binary_columnar(recon_dir / "points3D.bin")
     elif (recon_dir / "points3D.txt").exists():
-        colmap_points = read_points3D_text(recon_dir / "points3D.txt")
+        colmap_points = ColmapPoints3D.from_points3D(read_points3D_text(recon_dir / "points3D.txt"))
     else:
         raise ValueError(f"Could not find points3D.txt or points3D.bin in {recon_dir}")
 
     # Load point Positions
-    points3D = torch.from_numpy(np.array([p.xyz for p in colmap_points.values()], dtype=np.float32))
+    points3D = torch.from_numpy(colmap_points.xyz.astype(np.float32))
     if applied_transform is not None:
         assert applied_transform.shape == (3, 4)
         points3D = torch.einsum("ij,bj->bi", applied_transform[:3, :3], points3D) + applied_transform[:3, 3]
 
-    # Load point colours
-    points3D_rgb = torch.from_numpy(np.array([p.rgb for p in colmap_points.values()], dtype=np.uint8))
-
     # write ply
-    with open(output_dir / filename, "w") as f:
-        # Header
-        f.write("ply\n")
-        f.write("format ascii 1.0\n")
-        f.write(f"element vertex {len(points3D)}\n")
-        f.write("property float x\n")
-        f.write("property float y\n")
-        f.write("property float z\n")
-        f.write("property uint8 red\n")
-        f.write("property uint8 green\n")
-        f.write("property uint8 blue\n")
-        f.write("end_header\n")
-
-        for coord, color in zip(points3D, points3D_rgb):
-            x, y, z = coord
-            r, g, b = color
-            f.write(f"{x:8f} {y:8f} {z:8f} {r} {g} {b}\n")
+    vertices = np.empty(
+        len(points3D),
+        dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("red", "u1"), ("green", "u1"), ("blue", "u1")],
+    )
+    for i, axis in enumerate("xyz"):
+        vertices[axis] = points3D[:, i].numpy()
+    for i, channel in enumerate(("red", "green", "blue")):
+        vertices[channel] = colmap_points.rgb[:, i]
+    write_ply(output_dir / filename, {"vertex": vertices})
@@ -72,6 +72,11 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                 verbose=self.verbose,
                 num_downscales=self.num_downscales,
                 same_dimensions=self.same_dimensions,
+                cache_dir=self.cache_dir,
+                engine=self.image_engine,
+                num_workers=self.image_workers,
+                resize_filter=self.resize_filter,
+                link_mode=self.link_mode,
                 keep_image_dir=False,
             )
             image_rename_map = dict(
@@ -86,6 +91,11 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                     verbose=self.verbose,
                     num_downscales=self.num_downscales,
                     same_dimensions=self.same_dimensions,
+                    cache_dir=self.cache_dir,
+                    engine=self.image_engine,
+                    num_workers=self.image_workers,
+                    resize_filter=self.resize_filter,
+                    link_mode=self.link_mode,
                     keep_image_dir=True,
                 )
                 eval_image_rename_map = dict(
@@ -0,0 +1,183 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed cache for the outputs of ns-process-data.
+
+Processed images are stored once per (image content, processing parameters) and hard-linked into the output
+directory. The transforms.json and point cloud converted from a COLMAP model are stored per (model content,
+conversion parameters). Layout of the cache directory::
+
+    hashes.json                  path -> [mtime_ns, size, sha256] so unchanged files are not hashed again
+    images/<key>/<factor><ext>   one file per downscale factor, factor 1 is the full resolution image
+    colmap/<key>/                transforms.json, the point cloud and meta.json
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_json(value: Any) -> str:
+    """SHA-256 of a JSON-serializable value, independent of dict ordering."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hard link src to dst, replacing dst. Falls back to a copy across file systems."""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class FileHashIndex:
+    """Content hashes of files, memoized in a JSON file by path, mtime and size.
+
+    Args:
+        path: JSON file storing path -> [mtime_ns, size, sha256].
+        num_workers: Threads used to hash files.
+    """
+
+    def __init__(self, path: Path, num_workers: int = 8) -> None:
+        self.path = Path(path)
+        self.num_workers = num_workers
+        self._hashes: Dict[str, List] = {}
+        if self.path.exists():
+            try:
+                self._hashes = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                CONSOLE.log(f"[bold yellow]Ignoring unreadable hash index {self.path}")
+
+    def hash_files(self, paths: Iterable[Path]) -> List[str]:
+        """Content hashes of files. Files whose mtime and size are unchanged reuse the stored hash."""
+        paths = [Path(p).resolve() for p in paths]
+        stats = [p.stat() for p in paths]
+
+        def lookup(i: int) -> str:
+            entry = self._hashes.get(str(paths[i]))
+            if entry is not None and entry[0] == stats[i].st_mtime_ns and entry[1] == stats[i].st_size:
+                return entry[2]
+            return sha256_file(paths[i])
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as pool:
+            hashes = list(pool.map(lookup, range(len(paths))))
+        for path, stat, file_hash in zip(paths, stats, hashes):
+            self._hashes[str(path)] = [stat.st_mtime_ns, stat.st_size, file_hash]
+        self._save()
+        return hashes
+
+    def _save(self) -> None:
+        """Write the index through a temp file of its own, so concurrent jobs sharing the index do not collide.
+
+        The index only memoizes hashes, so a failed save is logged and otherwise ignored.
+        """
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps(self._hashes))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            CONSOLE.log(f"[bold yellow]Could not save hash index {self.path}: {e}")
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class ProcessDataCache:
+    """Content-addressed store for processed images and converted COLMAP models.
+
+    Args:
+        root: Cache directory. Created if it does not exist.
+        num_hash_workers: Threads used to hash files.
+    """
+
+    def __init__(self, root: Path, num_hash_workers: int = 8) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._hash_index = FileHashIndex(self.root / "hashes.json", num_workers=num_hash_workers)
+
+    def hash_files(self, paths: Iterable[Path]) -> List[str]:
+        """Content hashes of files. Files whose mtime and size are unchanged reuse the stored hash."""
+        return self._hash_index.hash_files(paths)
+
+    def _commit(self, staging: Path, entry: Path) -> None:
+        """Move a fully written staging directory into place. A concurrent writer of the same entry wins."""
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def image_entry(self, key: str) -> Path:
+        return self.root / "images" / key
+
+    def find_image(self, key: str, factors: List[int]) -> Optional[Dict[int, Path]]:
+        """Cached files of one processed image for every requested downscale factor, or None on a miss."""
+        entry = self.image_entry(key)
+        if not entry.is_dir():
+            return None
+        files = {int(f.stem): f for f in entry.iterdir() if f.stem.isdigit()}
+        if not all(factor in files for factor in factors):
+            return None
+        return {factor: files[factor] for factor in factors}
+
+    def store_image(self, key: str, files: Dict[int, Path]) -> Dict[int, Path]:
+        """Move processed files, given per downscale factor, into the cache and return their cached paths."""
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging_"))
+        for factor, path in files.items():
+            shutil.move(str(path), staging / f"{factor}{path.suffix}")
+        # An entry missing some downscale factors is replaced
+        shutil.rmtree(self.image_entry(key), ignore_errors=True)
+        self._commit(staging, self.image_entry(key))
+        return {factor: self.image_entry(key) / f"{factor}{path.suffix}" for factor, path in files.items()}
+
+    def colmap_entry(self, key: str) -> Path:
+        return self.root / "colmap" / key
+
+    def store_colmap(self, key: str, files: List[Path], num_frames: int) -> None:
+        """Copy the files converted from a COLMAP model into the cache."""
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging_"))
+        for path in files:
+            shutil.copyfile(path, staging / path.name)
+        (staging / "meta.json").write_text(json.dumps({"num_frames": num_frames, "files": [p.name for p in files]}))
+        self._commit(staging, self.colmap_entry(key))
+
+    def restore_colmap(self, key: str, output_dir: Path) -> Optional[int]:
+        """Copy a cached conversion into output_dir and return its number of frames, or None on a miss."""
+        entry = self.colmap_entry(key)
+        if not (entry / "meta.json").exists():
+            return None
+        meta = json.loads((entry / "meta.json").read_text())
+        for name in meta["files"]:
+            # Copied rather than linked, downstream tools rewrite transforms.json in place
+            shutil.copyfile(entry / name, output_dir / name)
+        return meta["num_frames"]
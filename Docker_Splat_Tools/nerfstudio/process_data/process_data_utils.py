@@ -15,16 +15,27 @@
 """Helper utils for processing data into the nerfstudio format."""
 
 import math
+import os
 import random
 import re
 import shutil
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import List, Literal, Optional, OrderedDict, Tuple, Union
+from typing import Dict, List, Literal, Optional, OrderedDict, Tuple, Union
 
 import cv2
 import imageio
+from PIL import Image, ImageOps
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    pass
 
 try:
     import rawpy
@@ -33,6 +44,7 @@ except ImportError:
 
 import numpy as np
 
+from nerfstudio.process_data.process_data_cache import ProcessDataCache, link_or_copy, sha256_json
 from nerfstudio.utils.rich_utils import CONSOLE, status
 from nerfstudio.utils.scripts import run_command
 
@@ -229,6 +241,198 @@ def convert_video_to_images(
         return summary_log, num_final_frames
 
 
+ImageProcessingEngine = Literal["ffmpeg", "opencv", "pillow"]
+"""Backend that crops and downscales images. ffmpeg runs one filter graph per batch, opencv and pillow run in a
+process pool."""
+ResizeFilter = Literal["area", "nearest", "linear", "cubic", "lanczos"]
+LinkMode = Literal["copy", "hardlink", "reflink"]
+
+_OPENCV_FILTERS = {
+    "area": cv2.INTER_AREA,
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+_PILLOW_FILTERS = {
+    "area": Image.Resampling.BOX,
+    "nearest": Image.Resampling.NEAREST,
+    "linear": Image.Resampling.BILINEAR,
+    "cubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+_JPEG_QUALITY = 95
+"""Quality of written JPEGs, close to ffmpeg's -q:v 2."""
+_FICLONE = 0x40049409
+"""ioctl request to clone a file's extents (Linux FICLONE)."""
+
+
+@dataclass
+class _ImageJob:
+    """One input image and the file to write per downscale factor."""
+
+    source: Path
+    outputs: Dict[int, Path]
+    engine: Literal["opencv", "pillow"]
+    resize_filter: ResizeFilter
+    link_mode: LinkMode
+    crop_border_pixels: Optional[int] = None
+    crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+    upscale_factor: Optional[int] = None
+    autorotate: bool = False
+
+    @property
+    def modifies_pixels(self) -> bool:
+        """Whether the full resolution output differs from the source file."""
+        return (
+            self.source.suffix.lower() in ALLOWED_RAW_EXTS
+            or self.autorotate
+            or self.upscale_factor is not None
+            or self.crop_border_pixels is not None
+            or self.crop_factor != (0.0, 0.0, 0.0, 0.0)
+        )
+
+
+def place_file(src: Path, dst: Path, link_mode: LinkMode = "copy") -> None:
+    """Place src at dst by copy, hard link or reflink. Links fall back to a copy where unsupported."""
+    if dst.exists() and src.resolve() == dst.resolve():
+        return
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    elif link_mode == "reflink":
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+            return
+        except (OSError, NameError):
+            # NameError: fcntl is not available on Windows
+            dst.unlink(missing_ok=True)
+    shutil.copy(src, dst)
+
+
+def _crop_box(
+    width: int, height: int, crop_border_pixels: Optional[int], crop_factor: Tuple[float, float, float, float]
+) -> Tuple[int, int, int, int]:
+    """Crop as (x, y, width, height), matching the crop filters of copy_images_list."""
+    if crop_border_pixels is not None:
+        return crop_border_pixels, crop_border_pixels, width - 2 * crop_border_pixels, height - 2 * crop_border_pixels
+    top, bottom, left, right = crop_factor
+    return (
+        int(width * left),
+        int(height * top),
+        int(width * (1 - left - right)),
+        int(height * (1 - top - bottom)),
+    )
+
+
+def _process_image_opencv(job: _ImageJob, factors: List[int]) -> None:
+    if job.source.suffix.lower() in ALLOWED_RAW_EXTS:
+        with rawpy.imread(str(job.source)) as raw:
+            image = cv2.cvtColor(raw.postprocess(), cv2.COLOR_RGB2BGR)
+    else:
+        # IMREAD_UNCHANGED keeps alpha and 16 bit depth and ignores the EXIF orientation, like ffmpeg -noautorotate
+        image = cv2.imread(str(job.source), cv2.IMREAD_COLOR if job.autorotate else cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise RuntimeError(f"Could not read image {job.source}")
+    if job.upscale_factor is not None:
+        image = cv2.resize(
+            image,
+            (image.shape[1] * job.upscale_factor, image.shape[0] * job.upscale_factor),
+            interpolation=cv2.INTER_NEAREST,
+        )
+    x, y, w, h = _crop_box(image.shape[1], image.shape[0], job.crop_border_pixels, job.crop_factor)
+    image = image[y : y + h, x : x + w]
+    for factor in factors:
+        resized = image
+        if factor > 1:
+            size = (image.shape[1] // factor, image.shape[0] // factor)
+            resized = cv2.resize(image, size, interpolation=_OPENCV_FILTERS[job.resize_filter])
+        cv2.imwrite(str(job.outputs[factor]), resized, [cv2.IMWRITE_JPEG_QUALITY, _JPEG_QUALITY])
+
+
+def _process_image_pillow(job: _ImageJob, factors: List[int]) -> None:
+    if job.source.suffix.lower() in ALLOWED_RAW_EXTS:
+        with rawpy.imread(str(job.source)) as raw:
+            image = Image.fromarray(raw.postprocess())
+    else:
+        image = Image.open(job.source)
+        if job.autorotate:
+            image = ImageOps.exif_transpose(image)
+    if job.upscale_factor is not None:
+        image = image.resize(
+            (image.width * job.upscale_factor, image.height * job.upscale_factor), Image.Resampling.NEAREST
+        )
+    x, y, w, h = _crop_box(image.width, image.height, job.crop_border_pixels, job.crop_factor)
+    image = image.crop((x, y, x + w, y + h))
+    for factor in factors:
+        resized = image
+        if factor > 1:
+            resized = image.resize((image.width // factor, image.height // factor), _PILLOW_FILTERS[job.resize_filter])
+        output = job.outputs[factor]
+        if output.suffix.lower() in (".jpg", ".jpeg"):
+            if resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+            resized.save(output, quality=_JPEG_QUALITY)
+        else:
+            resized.save(output)
+
+
+def _process_image_job(job: _ImageJob) -> None:
+    """Write every output of one job. Runs in a worker process."""
+    factors = sorted(job.outputs)
+    if 1 in job.outputs and not job.modifies_pixels:
+        # The full resolution image is the source file itself, no need to decode and encode it again
+        place_file(job.source, job.outputs[1], job.link_mode)
+        factors.remove(1)
+    if not factors:
+        return
+    if job.engine == "opencv":
+        _process_image_opencv(job, factors)
+    else:
+        _process_image_pillow(job, factors)
+
+
+def _init_image_worker() -> None:
+    # One OpenCV thread per worker process, the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def _process_images_parallel(jobs: List[_ImageJob], num_workers: Optional[int] = None, verbose: bool = False) -> float:
+    """Run image jobs in a process pool and log the throughput.
+
+    Args:
+        jobs: Images to process.
+        num_workers: Worker processes. Defaults to the number of CPU cores.
+        verbose: If True, log every finished image.
+    Returns:
+        Throughput in images per second.
+    """
+    workers = max(1, min(num_workers or os.cpu_count() or 1, len(jobs)))
+    start = time.perf_counter()
+    if workers == 1:
+        _init_image_worker()
+        for idx, job in enumerate(jobs):
+            _process_image_job(job)
+            if verbose:
+                CONSOLE.log(f"Processed image {idx + 1} of {len(jobs)}: {job.source}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_image_worker) as pool:
+            chunksize = max(1, len(jobs) // (workers * 8))
+            for idx, _ in enumerate(pool.map(_process_image_job, jobs, chunksize=chunksize)):
+                if verbose:
+                    CONSOLE.log(f"Processed image {idx + 1} of {len(jobs)}: {jobs[idx].source}")
+    elapsed = time.perf_counter() - start
+    throughput = len(jobs) / elapsed if elapsed > 0 else float("inf")
+    CONSOLE.log(f"Processed {len(jobs)} images in {elapsed:.1f} s ({throughput:.1f} images/s, {workers} workers)")
+    return throughput
+
+
 def copy_images_list(
     image_paths: List[Path],
     image_dir: Path,
@@ -241,6 +445,11 @@ def copy_images_list(
     upscale_factor: Optional[int] = None,
     nearest_neighbor: bool = False,
     same_dimensions: bool = True,
+    cache_dir: Optional[Path] = None,
+    engine: ImageProcessingEngine = "ffmpeg",
+    num_workers: Optional[int] = None,
+    resize_filter: ResizeFilter = "area",
+    link_mode: LinkMode = "copy",
 ) -> List[Path]:
     """Copy all images in a list of Paths. Useful for filtering from a directory.
     Args:
@@ -252,9 +461,37 @@ def copy_images_list(
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         verbose: If True, print extra logging.
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        cache_dir: If set, processed images are looked up in and added to this content-addressed cache and
+            hard-linked into image_dir. Only images not found in the cache are processed.
+        engine: Backend that crops and downscales. "opencv" and "pillow" process images in parallel in-process,
+            "ffmpeg" runs one ffmpeg filter graph over all images (or one per image if not same_dimensions).
+        num_workers: Worker processes of the opencv and pillow engines. Defaults to the number of CPU cores.
+        resize_filter: Interpolation used by the opencv and pillow engines to downscale. nearest_neighbor forces
+            "nearest".
+        link_mode: How the opencv and pillow engines place full resolution images that need no crop, upscale or
+            conversion: "copy", "hardlink" or "reflink". Links fall back to a copy where unsupported.
     Returns:
         A list of the copied image Paths.
     """
+    if cache_dir is not None:
+        return _copy_images_list_cached(
+            image_paths=image_paths,
+            image_dir=image_dir,
+            num_downscales=num_downscales,
+            cache_dir=cache_dir,
+            image_prefix=image_prefix,
+            crop_border_pixels=crop_border_pixels,
+            crop_factor=crop_factor,
+            verbose=verbose,
+            keep_image_dir=keep_image_dir,
+            upscale_factor=upscale_factor,
+            nearest_neighbor=nearest_neighbor,
+            same_dimensions=same_dimensions,
+            engine=engine,
+            num_workers=num_workers,
+            resize_filter=resize_filter,
+            link_mode=link_mode,
+        )
 
     # Remove original directory and its downscaled versions
     # only if we provide a proper image folder path and keep_image_dir is False
@@ -266,6 +503,41 @@ def copy_images_list(
                 shutil.rmtree(dir_to_remove, ignore_errors=True)
     image_dir.mkdir(exist_ok=True, parents=True)
 
+    if engine != "ffmpeg":
+        downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
+        for directory in downscale_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+        jobs = []
+        copied_image_paths = []
+        # Images should be 1-indexed for the rest of the pipeline.
+        for idx, image_path in enumerate(image_paths):
+            suffix = RAW_CONVERTED_SUFFIX if image_path.suffix.lower() in ALLOWED_RAW_EXTS else image_path.suffix
+            name = f"{image_prefix}{idx + 1:05d}{suffix}"
+            jobs.append(
+                _ImageJob(
+                    source=image_path,
+                    outputs={2**i: downscale_dirs[i] / name for i in range(num_downscales + 1)},
+                    engine=engine,
+                    resize_filter="nearest" if nearest_neighbor else resize_filter,
+                    link_mode=link_mode,
+                    crop_border_pixels=crop_border_pixels,
+                    crop_factor=crop_factor,
+                    upscale_factor=upscale_factor,
+                    autorotate=not same_dimensions,
+                )
+            )
+            copied_image_paths.append(image_dir / name)
+            if suffix != image_path.suffix:
+                # Same as the ffmpeg engine, converted raw images replace their source for downstream processing
+                image_paths[idx] = image_dir / name
+        if len(jobs) == 0:
+            CONSOLE.log("[bold red]:skull: No usable images in the data folder.")
+        else:
+            _process_images_parallel(jobs, num_workers=num_workers, verbose=verbose)
+            CONSOLE.log(f"[bold green]:tada: Done copying images with prefix '{image_prefix}'.")
+        return copied_image_paths
+
+    start = time.perf_counter()
     copied_image_paths = []
 
     # Images should be 1-indexed for the rest of the pipeline.
@@ -345,11 +617,99 @@ def copy_images_list(
     if num_frames == 0:
         CONSOLE.log("[bold red]:skull: No usable images in the data folder.")
     else:
-        CONSOLE.log(f"[bold green]:tada: Done copying images with prefix '{image_prefix}'.")
+        elapsed = time.perf_counter() - start
+        CONSOLE.log(
+            f"[bold green]:tada: Done copying images with prefix '{image_prefix}' "
+            f"({num_frames / elapsed:.1f} images/s)."
+        )
 
     return copied_image_paths
 
 
+def _copy_images_list_cached(
+    image_paths: List[Path],
+    image_dir: Path,
+    num_downscales: int,
+    cache_dir: Path,
+    image_prefix: str,
+    crop_border_pixels: Optional[int],
+    crop_factor: Tuple[float, float, float, float],
+    verbose: bool,
+    keep_image_dir: bool,
+    upscale_factor: Optional[int],
+    nearest_neighbor: bool,
+    same_dimensions: bool,
+    engine: ImageProcessingEngine,
+    num_workers: Optional[int],
+    resize_filter: ResizeFilter,
+    link_mode: LinkMode,
+) -> List[Path]:
+    """copy_images_list backed by a ProcessDataCache. See copy_images_list for the arguments."""
+    cache = ProcessDataCache(cache_dir)
+    factors = [2**i for i in range(num_downscales + 1)]
+    params = {
+        "crop_border_pixels": crop_border_pixels,
+        "crop_factor": list(crop_factor),
+        "upscale_factor": upscale_factor,
+        "nearest_neighbor": nearest_neighbor,
+        "same_dimensions": same_dimensions,
+    }
+    if engine != "ffmpeg":
+        # Keys of images processed by ffmpeg stay those of caches written before the engine could be chosen
+        params.update(engine=engine, resize_filter="nearest" if nearest_neighbor else resize_filter)
+    keys = [sha256_json({"image": image_hash, **params}) for image_hash in cache.hash_files(image_paths)]
+    cached = [cache.find_image(key, factors) for key in keys]
+    missing = [i for i, files in enumerate(cached) if files is None]
+
+    if missing:
+        with tempfile.TemporaryDirectory(dir=cache.root, prefix=".processing_") as tmp:
+            staging_dir = Path(tmp) / "images"
+            staged = copy_images_list(
+                image_paths=[image_paths[i] for i in missing],
+                image_dir=staging_dir,
+                num_downscales=num_downscales,
+                crop_border_pixels=crop_border_pixels,
+                crop_factor=crop_factor,
+                verbose=verbose,
+                upscale_factor=upscale_factor,
+                nearest_neighbor=nearest_neighbor,
+                same_dimensions=same_dimensions,
+                engine=engine,
+                num_workers=num_workers,
+                resize_filter=resize_filter,
+                link_mode=link_mode,
+            )
+            for i, staged_path in zip(missing, staged):
+                files = {
+                    factor: Path(str(staging_dir) + (f"_{factor}" if factor > 1 else "")) / staged_path.name
+                    for factor in factors
+                }
+                cached[i] = cache.store_image(
+                    keys[i], {factor: path for factor, path in files.items() if path.exists()}
+                )
+
+    # Remove original directory and its downscaled versions, as copy_images_list does
+    if image_dir.is_dir() and len(image_paths) and not keep_image_dir and image_dir != image_paths[0].parent:
+        for factor in factors:
+            shutil.rmtree(image_dir if factor == 1 else f"{image_dir}_{factor}", ignore_errors=True)
+    downscale_dirs = {factor: Path(str(image_dir) + (f"_{factor}" if factor > 1 else "")) for factor in factors}
+    for directory in downscale_dirs.values():
+        directory.mkdir(parents=True, exist_ok=True)
+
+    copied_image_paths = []
+    for idx, files in enumerate(cached):
+        assert files is not None
+        for factor, path in files.items():
+            link_or_copy(path, downscale_dirs[factor] / f"{image_prefix}{idx + 1:05d}{path.suffix}")
+        copied_image_paths.append(image_dir / f"{image_prefix}{idx + 1:05d}{files[1].suffix}")
+
+    CONSOLE.log(
+        f"[bold green]:tada: Reused {len(image_paths) - len(missing)} of {len(image_paths)} images from {cache_dir}, "
+        f"processed {len(missing)}."
+    )
+    return copied_image_paths
+
+
 def copy_and_upscale_polycam_depth_maps_list(
     polycam_depth_image_filenames: List[Path],
     depth_dir: Path,
@@ -403,6 +763,11 @@ def copy_images(
     crop_factor: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
     num_downscales: int = 0,
     same_dimensions: bool = True,
+    cache_dir: Optional[Path] = None,
+    engine: ImageProcessingEngine = "ffmpeg",
+    num_workers: Optional[int] = None,
+    resize_filter: ResizeFilter = "area",
+    link_mode: LinkMode = "copy",
 ) -> OrderedDict[Path, Path]:
     """Copy images from a directory to a new directory.
 
@@ -413,6 +778,8 @@ def copy_images(
         verbose: If True, print extra logging.
         crop_factor: Portion of the image to crop. Should be in [0,1] (top, bottom, left, right)
         keep_image_dir: If True, don't delete the output directory if it already exists.
+        cache_dir: If set, reuse processed images from this content-addressed cache. See copy_images_list.
+        engine, num_workers, resize_filter, link_mode: Image processing backend. See copy_images_list.
     Returns:
         The mapping from the original filenames to the new ones.
     """
@@ -432,6 +799,11 @@ def copy_images(
             keep_image_dir=keep_image_dir,
             num_downscales=num_downscales,
             same_dimensions=same_dimensions,
+            cache_dir=cache_dir,
+            engine=engine,
+            num_workers=num_workers,
+            resize_filter=resize_filter,
+            link_mode=link_mode,
         )
         return OrderedDict((original_path, new_path) for original_path, new_path in zip(image_paths, copied_images))
 
@@ -442,9 +814,12 @@ def downscale_images(
     folder_name: str = "images",
     nearest_neighbor: bool = False,
     verbose: bool = False,
+    engine: ImageProcessingEngine = "ffmpeg",
+    num_workers: Optional[int] = None,
+    resize_filter: ResizeFilter = "area",
 ) -> str:
     """(Now deprecated; much faster integrated into copy_images.)
-    Downscales the images in the directory. Uses FFMPEG.
+    Downscales the images in the directory. Uses FFMPEG, or OpenCV or Pillow in a process pool.
 
     Args:
         image_dir: Path to the directory containing the images.
@@ -452,6 +827,7 @@ def downscale_images(
         folder_name: Name of the output folder
         nearest_neighbor: Use nearest neighbor sampling (useful for depth images)
         verbose: If True, logs the output of the command.
+        engine, num_workers, resize_filter: Image processing backend. See copy_images_list.
 
     Returns:
         Summary of downscaling.
@@ -466,6 +842,23 @@ def downscale_images(
         verbose=verbose,
     ):
         downscale_factors = [2**i for i in range(num_downscales + 1)[1:]]
+        if engine != "ffmpeg":
+            downscale_dirs = {factor: image_dir.parent / f"{folder_name}_{factor}" for factor in downscale_factors}
+            for directory in downscale_dirs.values():
+                directory.mkdir(parents=True, exist_ok=True)
+            jobs = [
+                _ImageJob(
+                    source=f,
+                    outputs={factor: downscale_dirs[factor] / f.name for factor in downscale_factors},
+                    engine=engine,
+                    resize_filter="nearest" if nearest_neighbor else resize_filter,
+                    link_mode="copy",
+                )
+                for f in list_images(image_dir)
+            ]
+            if jobs:
+                _process_images_parallel(jobs, num_workers=num_workers, verbose=verbose)
+            downscale_factors = []
         for downscale_factor in downscale_factors:
             assert downscale_factor > 1
             assert isinstance(downscale_factor, int)
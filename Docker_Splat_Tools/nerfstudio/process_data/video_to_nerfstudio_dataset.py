@@ -123,7 +123,14 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
 
             # # Downscale images
             summary_log.append(
-                process_data_utils.downscale_images(self.image_dir, self.num_downscales, verbose=self.verbose)
+                process_data_utils.downscale_images(
+                    self.image_dir,
+                    self.num_downscales,
+                    verbose=self.verbose,
+                    engine=self.image_engine,
+                    num_workers=self.image_workers,
+                    resize_filter=self.resize_filter,
+                )
             )
 
         # Create mask
@@ -0,0 +1,132 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python
+"""
+Benchmark loading the 3D points and their 2D observations in the COLMAP dataparser.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+import tyro
+
+from nerfstudio.data.dataparsers.colmap_dataparser import ColmapDataParser, ColmapDataParserConfig
+from nerfstudio.data.utils import colmap_parsing_utils as colmap_utils
+from nerfstudio.scripts.benchmarking.benchmark_colmap_reader import make_synthetic_images, make_synthetic_points3D
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def load_3D_points_per_point(
+    dataparser: ColmapDataParser, colmap_path: Path, transform_matrix: torch.Tensor, scale_factor: float
+) -> Dict[str, torch.Tensor]:
+    """The implementation previously shipped in ColmapDataParser._load_3D_points, for binary models and
+    max_2D_matches_per_3D_point == -1: one Point3D and one padded tensor per point."""
+    colmap_points = colmap_utils.read_points3D_binary(colmap_path / "points3D.bin")
+    points3D = torch.from_numpy(np.array([p.xyz for p in colmap_points.values()], dtype=np.float32))
+    points3D = torch.cat((points3D, torch.ones_like(points3D[..., :1])), -1) @ transform_matrix.T
+    points3D *= scale_factor
+    points3D_rgb = torch.from_numpy(np.array([p.rgb for p in colmap_points.values()], dtype=np.uint8))
+    points3D_num_points = torch.tensor([len(p.image_ids) for p in colmap_points.values()], dtype=torch.int64)
+    out = {
+        "points3D_xyz": points3D,
+        "points3D_rgb": points3D_rgb,
+        "points3D_error": torch.from_numpy(np.array([p.error for p in colmap_points.values()], dtype=np.float32)),
+        "points3D_num_points2D": points3D_num_points,
+    }
+    im_id_to_image = colmap_utils.read_images_binary(colmap_path / "images.bin")
+    max_num_points = int(torch.max(points3D_num_points).item())
+    points3D_image_ids = []
+    points3D_image_xy = []
+    for p in colmap_points.values():
+        nids = np.array(p.image_ids, dtype=np.int64)
+        nxy_ids = np.array(p.point2D_idxs, dtype=np.int32)
+        nxy = [im_id_to_image[im_id].xys[pt_idx] for im_id, pt_idx in zip(nids, nxy_ids)]
+        nxy = torch.from_numpy(np.stack(nxy).astype(np.float32)) if len(nxy) > 0 else torch.zeros((0, 2))
+        nids = torch.from_numpy(nids)
+        points3D_image_ids.append(torch.cat((nids, torch.full((max_num_points - len(nids),), -1, dtype=torch.int64))))
+        points3D_image_xy.append(
+            torch.cat((nxy, torch.full((max_num_points - len(nxy), nxy.shape[-1]), 0, dtype=torch.float32)))
+            / dataparser._downscale_factor
+        )
+    out["points3D_image_ids"] = torch.stack(points3D_image_ids, dim=0)
+    out["points3D_points2D_xy"] = torch.stack(points3D_image_xy, dim=0)
+    return out
+
+
+@dataclass
+class BenchmarkColmapPoints:
+    """Compare the per point and the vectorized loading of COLMAP 3D points with all their 2D observations."""
+
+    num_points: int = 1_000_000
+    """Number of synthetic 3D points."""
+    mean_track_length: int = 8
+    """Mean number of observations per 3D point."""
+    num_images: int = 500
+    """Number of synthetic registered images."""
+    points2D_per_image: int = 8000
+    """Number of keypoints per image."""
+    output_dir: Optional[Path] = None
+    """Directory to write the model to. Defaults to a temporary directory."""
+
+    def main(self) -> None:
+        """Main function."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = self.output_dir if self.output_dir is not None else Path(tmp_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            points = make_synthetic_points3D(self.num_points, self.mean_track_length)
+            # Observations must refer to existing images and keypoints
+            points.track_image_ids = (points.track_image_ids % self.num_images + 1).astype(np.int32)
+            points.track_point2D_idxs = (points.track_point2D_idxs % self.points2D_per_image).astype(np.int32)
+            colmap_utils.write_points3D_binary_columnar(points, output_dir / "points3D.bin")
+            images = make_synthetic_images(self.num_images, self.points2D_per_image)
+            colmap_utils.write_images_binary_columnar(images, output_dir / "images.bin")
+            CONSOLE.print(f"{self.num_points} points, {points.track_offsets[-1]} observations")
+            del points, images
+
+            dataparser = ColmapDataParser(ColmapDataParserConfig(max_2D_matches_per_3D_point=-1))
+            dataparser._downscale_factor = 2
+            transform_matrix = torch.eye(4)[:3]
+            results = {}
+            outputs = {}
+            for name, load in (
+                ("per point", lambda: load_3D_points_per_point(dataparser, output_dir, transform_matrix, 0.5)),
+                ("vectorized", lambda: dataparser._load_3D_points(output_dir, transform_matrix, 0.5)),
+            ):
+                start = time.perf_counter()
+                outputs[name] = load()
+                results[name] = time.perf_counter() - start
+                CONSOLE.print(f"{name:<12} {results[name]:8.2f} s")
+
+        for key, value in outputs["per point"].items():
+            assert torch.equal(value, outputs["vectorized"][key]), f"{key} differs"
+        CONSOLE.print(f"Outputs are identical, speedup: {results['per point'] / results['vectorized']:.1f}x")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkColmapPoints).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
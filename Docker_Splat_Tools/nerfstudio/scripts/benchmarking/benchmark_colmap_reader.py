@@ -0,0 +1,198 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python
+"""
+Benchmark the columnar COLMAP binary reader against the per-record struct reader on a synthetic model.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import tyro
+
+from nerfstudio.data.utils import colmap_parsing_utils as colmap_utils
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def make_synthetic_points3D(num_points: int, mean_track_length: int, seed: int = 0) -> colmap_utils.ColmapPoints3D:
+    """Random 3D points with Poisson distributed track lengths."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.poisson(mean_track_length, num_points)
+    offsets = np.zeros(num_points + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return colmap_utils.ColmapPoints3D(
+        ids=np.arange(1, num_points + 1, dtype=np.uint64),
+        xyz=rng.standard_normal((num_points, 3)),
+        rgb=rng.integers(0, 256, (num_points, 3), dtype=np.uint8),
+        error=rng.random(num_points),
+        track_offsets=offsets,
+        track_image_ids=rng.integers(1, 1000, offsets[-1], dtype=np.int32),
+        track_point2D_idxs=rng.integers(0, 10000, offsets[-1], dtype=np.int32),
+    )
+
+
+def make_synthetic_images(num_images: int, points2D_per_image: int, seed: int = 0) -> colmap_utils.ColmapImages:
+    """Random registered images with a fixed number of keypoints each."""
+    rng = np.random.default_rng(seed)
+    num_points2D = num_images * points2D_per_image
+    return colmap_utils.ColmapImages(
+        ids=np.arange(1, num_images + 1, dtype=np.int32),
+        qvecs=rng.standard_normal((num_images, 4)),
+        tvecs=rng.standard_normal((num_images, 3)),
+        camera_ids=np.ones(num_images, dtype=np.int32),
+        names=[f"frame_{i:05d}.jpg" for i in range(num_images)],
+        points2D_offsets=np.arange(num_images + 1, dtype=np.int64) * points2D_per_image,
+        xys=rng.random((num_points2D, 2)) * 1000,
+        point3D_ids=rng.integers(-1, 1_000_000, num_points2D, dtype=np.int64),
+    )
+
+
+def read_points3D_binary_per_record(path: Path):
+    """The reader previously shipped in colmap_parsing_utils: one struct.unpack and one Point3D per point."""
+    points3D = {}
+    with open(path, "rb") as fid:
+        num_points = colmap_utils.read_next_bytes(fid, 8, "Q")[0]
+        for _ in range(num_points):
+            properties = colmap_utils.read_next_bytes(fid, num_bytes=43, format_char_sequence="QdddBBBd")
+            track_length = colmap_utils.read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
+            track_elems = colmap_utils.read_next_bytes(
+                fid, num_bytes=8 * track_length, format_char_sequence="ii" * track_length
+            )
+            points3D[properties[0]] = colmap_utils.Point3D(
+                id=properties[0],
+                xyz=np.array(properties[1:4]),
+                rgb=np.array(properties[4:7]),
+                error=np.array(properties[7]),
+                image_ids=np.array(tuple(map(int, track_elems[0::2]))),
+                point2D_idxs=np.array(tuple(map(int, track_elems[1::2]))),
+            )
+    return points3D
+
+
+def read_images_binary_per_record(path: Path):
+    """The reader previously shipped in colmap_parsing_utils: one struct.unpack and one Image per image."""
+    images = {}
+    with open(path, "rb") as fid:
+        num_reg_images = colmap_utils.read_next_bytes(fid, 8, "Q")[0]
+        for _ in range(num_reg_images):
+            properties = colmap_utils.read_next_bytes(fid, num_bytes=64, format_char_sequence="idddddddi")
+            image_name = b""
+            current_char = colmap_utils.read_next_bytes(fid, 1, "c")[0]
+            while current_char != b"\x00":
+                image_name += current_char
+                current_char = colmap_utils.read_next_bytes(fid, 1, "c")[0]
+            num_points2D = colmap_utils.read_next_bytes(fid, num_bytes=8, format_char_sequence="Q")[0]
+            x_y_id_s = colmap_utils.read_next_bytes(
+                fid, num_bytes=24 * num_points2D, format_char_sequence="ddq" * num_points2D
+            )
+            images[properties[0]] = colmap_utils.Image(
+                id=properties[0],
+                qvec=np.array(properties[1:5]),
+                tvec=np.array(properties[5:8]),
+                camera_id=properties[8],
+                name=image_name.decode("utf-8"),
+                xys=np.column_stack([tuple(map(float, x_y_id_s[0::3])), tuple(map(float, x_y_id_s[1::3]))]),
+                point3D_ids=np.array(tuple(map(int, x_y_id_s[2::3]))),
+            )
+    return images
+
+
+def time_and_trace(reader: Callable[[Path], object], path: Path, trace_memory: bool) -> Tuple[float, Optional[float]]:
+    """Time one read and, in a separate run, record the peak traced allocation in MB."""
+    start = time.perf_counter()
+    reader(path)
+    elapsed = time.perf_counter() - start
+    if not trace_memory:
+        return elapsed, None
+    tracemalloc.start()
+    reader(path)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@dataclass
+class BenchmarkColmapReader:
+    """Compare reading points3D.bin and images.bin per record and columnar."""
+
+    num_points: int = 1_000_000
+    """Number of synthetic 3D points."""
+    mean_track_length: int = 8
+    """Mean number of observations per 3D point."""
+    num_images: int = 500
+    """Number of synthetic registered images."""
+    points2D_per_image: int = 8000
+    """Number of keypoints per image."""
+    trace_memory: bool = True
+    """Also report peak allocated memory. Runs each reader a second time under tracemalloc."""
+    output_dir: Optional[Path] = None
+    """Directory to write the model to. Defaults to a temporary directory."""
+
+    def main(self) -> None:
+        """Main function."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = self.output_dir if self.output_dir is not None else Path(tmp_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            points_path = output_dir / "points3D.bin"
+            images_path = output_dir / "images.bin"
+
+            points = make_synthetic_points3D(self.num_points, self.mean_track_length)
+            start = time.perf_counter()
+            colmap_utils.write_points3D_binary_columnar(points, points_path)
+            CONSOLE.print(
+                f"points3D.bin: {self.num_points} points, {points.track_offsets[-1]} track elements, "
+                f"{points_path.stat().st_size / (1024 * 1024):.1f} MB, written in {time.perf_counter() - start:.2f} s"
+            )
+            images = make_synthetic_images(self.num_images, self.points2D_per_image)
+            colmap_utils.write_images_binary_columnar(images, images_path)
+            CONSOLE.print(
+                f"images.bin: {self.num_images} images, {len(images.xys)} keypoints, "
+                f"{images_path.stat().st_size / (1024 * 1024):.1f} MB"
+            )
+            del points, images
+
+            cases = [
+                ("points3D per record", read_points3D_binary_per_record, points_path),
+                ("points3D columnar", colmap_utils.read_points3D_binary_columnar, points_path),
+                ("images per record", read_images_binary_per_record, images_path),
+                ("images columnar", colmap_utils.read_images_binary_columnar, images_path),
+            ]
+            results = {}
+            for name, reader, path in cases:
+                elapsed, peak = time_and_trace(reader, path, self.trace_memory)
+                results[name] = elapsed
+                memory = f", peak {peak:.0f} MB" if peak is not None else ""
+                CONSOLE.print(f"{name:<20} {elapsed:8.2f} s{memory}")
+
+        for kind in ("points3D", "images"):
+            speedup = results[f"{kind} per record"] / results[f"{kind} columnar"]
+            CONSOLE.print(f"{kind} speedup: {speedup:.1f}x")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkColmapReader).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,112 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python
+"""
+Benchmark the image engines of copy_images_list on a folder of synthetic frames.
+"""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+import tyro
+
+from nerfstudio.process_data import process_data_utils
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def create_synthetic_frames(output_dir: Path, count: int, width: int, height: int) -> None:
+    """Write smooth random JPEG frames, which compress like photographs rather than like noise."""
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8), (width, height))
+    for i in range(count):
+        frame = np.roll(base, 7 * i, axis=1)
+        cv2.imwrite(str(output_dir / f"frame_{i:05d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+
+@dataclass
+class BenchmarkCopyImages:
+    """Compare the ffmpeg, opencv and pillow engines of copy_images_list."""
+
+    count: int = 200
+    """Number of synthetic frames."""
+    width: int = 4000
+    """Frame width. The default is a 12 MP frame."""
+    height: int = 3000
+    """Frame height."""
+    num_downscales: int = 3
+    """Number of downscale levels to write."""
+    num_workers: Optional[int] = None
+    """Worker processes of the opencv and pillow engines. Defaults to the number of CPU cores."""
+    work_dir: Optional[Path] = None
+    """Directory for the frames and outputs. Frames are reused between runs if their count matches."""
+
+    def main(self) -> None:
+        """Main function."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            work_dir = self.work_dir if self.work_dir is not None else Path(tmp_dir)
+            frames_dir = work_dir / "frames"
+            frames_dir.mkdir(parents=True, exist_ok=True)
+            if len(list(frames_dir.glob("*.jpg"))) != self.count:
+                CONSOLE.print(f"Writing {self.count} synthetic {self.width}x{self.height} frames to {frames_dir}")
+                shutil.rmtree(frames_dir)
+                frames_dir.mkdir()
+                create_synthetic_frames(frames_dir, self.count, self.width, self.height)
+            image_paths = sorted(frames_dir.glob("*.jpg"))
+
+            cases = [("opencv", "copy"), ("opencv", "hardlink"), ("pillow", "copy")]
+            if shutil.which("ffmpeg") is not None:
+                cases.insert(0, ("ffmpeg", "copy"))
+            else:
+                CONSOLE.print("[bold yellow]ffmpeg not found, skipping the ffmpeg engine")
+
+            results = {}
+            for engine, link_mode in cases:
+                output_dir = work_dir / "output" / "images"
+                start = time.perf_counter()
+                process_data_utils.copy_images_list(
+                    list(image_paths),
+                    output_dir,
+                    num_downscales=self.num_downscales,
+                    engine=engine,
+                    num_workers=self.num_workers,
+                    link_mode=link_mode,
+                )
+                elapsed = time.perf_counter() - start
+                name = f"{engine}, {link_mode}"
+                results[name] = elapsed
+                shutil.rmtree(work_dir / "output")
+                CONSOLE.print(f"{name:<20} {elapsed:8.2f} s  {len(image_paths) / elapsed:8.1f} images/s")
+
+        baseline = next(iter(results.values()))
+        for name, elapsed in list(results.items())[1:]:
+            CONSOLE.print(f"{name} speedup over {next(iter(results))}: {baseline / elapsed:.1f}x")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkCopyImages).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
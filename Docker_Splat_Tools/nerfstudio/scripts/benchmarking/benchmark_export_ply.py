@@ -0,0 +1,100 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python
+"""
+Benchmark the Gaussian splat PLY writer on a synthetic model.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import tyro
+
+from nerfstudio.scripts.exporter import ExportGaussianSplat
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def make_synthetic_splat(num_gaussians: int, sh_degree: int = 3, seed: int = 0) -> "OrderedDict[str, np.ndarray]":
+    """Build the property map that ExportGaussianSplat.main would produce for a random model."""
+    rng = np.random.default_rng(seed)
+    map_to_tensors: OrderedDict[str, np.ndarray] = OrderedDict()
+    positions = rng.standard_normal((num_gaussians, 3), dtype=np.float32)
+    for i, axis in enumerate("xyz"):
+        map_to_tensors[axis] = positions[:, i]
+    for axis in ("nx", "ny", "nz"):
+        map_to_tensors[axis] = np.zeros(num_gaussians, dtype=np.float32)
+    for i in range(3):
+        map_to_tensors[f"f_dc_{i}"] = rng.standard_normal((num_gaussians, 1), dtype=np.float32)
+    for i in range(3 * ((sh_degree + 1) ** 2 - 1)):
+        map_to_tensors[f"f_rest_{i}"] = rng.standard_normal((num_gaussians, 1), dtype=np.float32)
+    map_to_tensors["opacity"] = rng.standard_normal((num_gaussians, 1), dtype=np.float32)
+    for i in range(3):
+        map_to_tensors[f"scale_{i}"] = rng.standard_normal((num_gaussians, 1), dtype=np.float32)
+    for i in range(4):
+        map_to_tensors[f"rot_{i}"] = rng.standard_normal((num_gaussians, 1), dtype=np.float32)
+    return map_to_tensors
+
+
+@dataclass
+class BenchmarkExportPly:
+    """Time ExportGaussianSplat.write_ply on a synthetic model and report throughput in MB/s."""
+
+    num_gaussians: int = 2_000_000
+    """Number of synthetic Gaussians to export."""
+    sh_degree: int = 3
+    """Spherical harmonics degree of the synthetic model."""
+    repeats: int = 3
+    """Number of timed runs. The best run is reported."""
+    output_dir: Optional[Path] = None
+    """Directory to write the PLY to. Defaults to a temporary directory."""
+
+    def main(self) -> None:
+        """Main function."""
+        map_to_tensors = make_synthetic_splat(self.num_gaussians, self.sh_degree)
+        CONSOLE.print(f"Exporting {self.num_gaussians} Gaussians with {len(map_to_tensors)} properties each")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = self.output_dir if self.output_dir is not None else Path(tmp_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            filename = output_dir / "benchmark_splat.ply"
+
+            timings = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                ExportGaussianSplat.write_ply(str(filename), self.num_gaussians, map_to_tensors)
+                timings.append(time.perf_counter() - start)
+
+            size_mb = filename.stat().st_size / (1024 * 1024)
+
+        best = min(timings)
+        CONSOLE.print(f"File size: {size_mb:.1f} MB")
+        CONSOLE.print(f"Best of {self.repeats}: {best:.3f} s ({size_mb / best:.1f} MB/s)")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkExportPly).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
@@ -0,0 +1,82 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+#!/usr/bin/env python
+"""
+Benchmark the KNN backends used to initialize the scales of Splatfacto gaussians.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import List, Literal, Tuple
+
+import torch
+import tyro
+
+from nerfstudio.utils.math import k_nearest_neighbors
+from nerfstudio.utils.rich_utils import CONSOLE
+
+
+def create_points(num_points: int, distribution: Literal["uniform", "clustered"]) -> torch.Tensor:
+    """Uniform points like random initialization, or dense clusters with sparse outliers like SfM points."""
+    generator = torch.Generator().manual_seed(0)
+    if distribution == "uniform":
+        return (torch.rand((num_points, 3), generator=generator) - 0.5) * 10.0
+    num_outliers = num_points // 100
+    centers = torch.rand((1000, 3), generator=generator) * 10.0
+    assignment = torch.randint(0, len(centers), (num_points - num_outliers,), generator=generator)
+    clustered = centers[assignment] + 0.05 * torch.randn((len(assignment), 3), generator=generator)
+    outliers = (torch.rand((num_outliers, 3), generator=generator) - 0.5) * 200.0
+    return torch.cat([clustered, outliers])
+
+
+@dataclass
+class BenchmarkKnn:
+    """Compare the sklearn and voxel grid KNN backends on seed point clouds of different sizes."""
+
+    num_points: List[int] = field(default_factory=lambda: [1_000_000, 5_000_000])
+    """Point cloud sizes to benchmark."""
+    distributions: Tuple[Literal["uniform", "clustered"], ...] = ("uniform", "clustered")
+    """Point distributions to benchmark."""
+    k: int = 3
+    """Number of neighbors, as used by Splatfacto."""
+
+    def main(self) -> None:
+        """Main function."""
+        CONSOLE.print(f"torch threads: {torch.get_num_threads()}")
+        for num_points in self.num_points:
+            for distribution in self.distributions:
+                points = create_points(num_points, distribution)
+                distances = {}
+                times = {}
+                for backend in ("sklearn", "grid"):
+                    start = time.perf_counter()
+                    distances[backend], _ = k_nearest_neighbors(points, self.k, backend=backend)
+                    times[backend] = time.perf_counter() - start
+                    CONSOLE.print(f"{num_points:>9} {distribution:<10} {backend:<8} {times[backend]:8.2f} s")
+                max_error = (distances["sklearn"] - distances["grid"]).abs().max().item()
+                speedup = times["sklearn"] / times["grid"]
+                CONSOLE.print(f"grid speedup over sklearn: {speedup:.1f}x, max error {max_error:.2e}")
+
+
+def entrypoint():
+    """Entrypoint for use with pyproject scripts."""
+    tyro.extras.set_accent_color("bright_yellow")
+    tyro.cli(BenchmarkKnn).main()
+
+
+if __name__ == "__main__":
+    entrypoint()
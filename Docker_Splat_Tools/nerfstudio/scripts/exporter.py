@@ -26,7 +26,7 @@ from collections import OrderedDict
 from dataclasses import dataclass, field
 from importlib.metadata import version
 from pathlib import Path
-from typing import List, Optional, Tuple, Union, cast
+from typing import Dict, List, Optional, Tuple, Union, cast
 
 import numpy as np
 import open3d as o3d
@@ -39,13 +39,18 @@ from nerfstudio.data.datamanagers.base_datamanager import VanillaDataManager
 from nerfstudio.data.datamanagers.parallel_datamanager import ParallelDataManager
 from nerfstudio.data.scene_box import OrientedBox
 from nerfstudio.exporter import texture_utils, tsdf_utils
+from nerfstudio.exporter.compressed_ply import write_compressed_ply
 from nerfstudio.exporter.exporter_utils import collect_camera_poses, generate_point_cloud, get_mesh_from_filename
 from nerfstudio.exporter.marching_cubes import generate_mesh_with_multires_marching_cubes
 from nerfstudio.fields.sdf_field import SDFField  # noqa
 from nerfstudio.models.splatfacto import SplatfactoModel
 from nerfstudio.pipelines.base_pipeline import Pipeline, VanillaPipeline
-from nerfstudio.utils.eval_utils import eval_setup
+from nerfstudio.utils.eval_utils import eval_setup, get_checkpoint_path, load_pipeline_state, load_trainer_config
 from nerfstudio.utils.rich_utils import CONSOLE
+from nerfstudio.utils.spherical_harmonics import RGB2SH, SH2RGB
+
+SPLATFACTO_GAUSS_PARAMS = ("means", "scales", "quats", "features_dc", "features_rest", "opacities")
+"""Names of the Gaussian parameters stored in SplatfactoModel.gauss_params."""
 
 
 @dataclass
@@ -497,22 +502,33 @@ class ExportGaussianSplat(Exporter):
     ply_color_mode: Literal["sh_coeffs", "rgb"] = "sh_coeffs"
     """If "rgb", export colors as red/green/blue fields. Otherwise, export colors as
     spherical harmonics coefficients."""
+    ply_format: Literal["float32", "compressed"] = "float32"
+    """If "compressed", write a Morton-sorted PLY with per-chunk bounds and 8-11 bit quantized attributes, about 4x
+    smaller with spherical harmonics degree 3. Requires ply_color_mode "sh_coeffs"."""
+    checkpoint_only: bool = False
+    """If True, read the Gaussians directly from the latest checkpoint on the CPU instead of setting up the full
+    pipeline. Needs neither a GPU nor the training images."""
 
     @staticmethod
     def write_ply(
         filename: str,
         count: int,
         map_to_tensors: typing.OrderedDict[str, np.ndarray],
+        chunk_size: int = 1 << 20,
     ):
         """
         Writes a PLY file with given vertex properties and a tensor of float or uint8 values in the order specified by the OrderedDict.
         Note: All float values will be converted to float32 for writing.
 
+        The vertex data is interleaved into a structured numpy array and written in blocks of `chunk_size`
+        vertices, so memory overhead stays bounded regardless of the number of Gaussians.
+
         Parameters:
         filename (str): The name of the file to write.
         count (int): The number of vertices to write.
         map_to_tensors (OrderedDict[str, np.ndarray]): An ordered dictionary mapping property names to numpy arrays of float or uint8 values.
             Each array should be 1-dimensional and of equal length matching 'count'. Arrays should not be empty.
+        chunk_size (int): Number of vertices to interleave and write per block.
         """
 
         # Ensure count matches the length of all tensors
@@ -544,32 +560,76 @@ class ExportGaussianSplat(Exporter):
 
             ply_file.write(b"end_header\n")
 
-            # Write binary data
-            # Note: If this is a performance bottleneck consider using numpy.hstack for efficiency improvement
-            for i in range(count):
-                for tensor in map_to_tensors.values():
-                    value = tensor[i]
-                    if tensor.dtype.kind == "f":
-                        ply_file.write(np.float32(value).tobytes())
-                    elif tensor.dtype == np.uint8:
-                        ply_file.write(value.tobytes())
+            # Write binary data, one interleaved block of vertices at a time
+            vertex_dtype = np.dtype(
+                [(key, "<f4" if tensor.dtype.kind == "f" else "u1") for key, tensor in map_to_tensors.items()]
+            )
+            columns = [(key, tensor.reshape(-1)) for key, tensor in map_to_tensors.items()]
+            block = np.empty(min(count, chunk_size), dtype=vertex_dtype)
+            for start in range(0, count, chunk_size):
+                end = min(start + chunk_size, count)
+                rows = block[: end - start]
+                for key, column in columns:
+                    rows[key] = column[start:end]
+                rows.tofile(ply_file)
+
+    @staticmethod
+    def load_gaussians_from_checkpoint(config_path: Path) -> Tuple[int, Dict[str, torch.Tensor]]:
+        """
+        Reads the Splatfacto Gaussian parameters straight from the latest checkpoint of a config, without setting up
+        the pipeline, datamanager or model. Tensors stay on the CPU and are memory-mapped when supported. The inference
+        checkpoint is read instead of the training checkpoint when it exists.
+
+        Parameters:
+        config_path (Path): Path to the config YAML file.
+
+        Returns:
+        The spherical harmonics degree of the model and a dictionary mapping gauss_params names to tensors.
+        """
+        config = load_trainer_config(config_path)
+        assert hasattr(config.pipeline.model, "sh_degree"), f"{config.method_name} is not a Gaussian splatting method"
+        load_path, _ = get_checkpoint_path(config)
+        state = load_pipeline_state(load_path)
+
+        gauss_params = {}
+        for key, value in state.items():
+            key = key[len("module.") :] if key.startswith("module.") else key
+            # old checkpoints store the parameters as _model.means instead of _model.gauss_params.means
+            for prefix in ("_model.gauss_params.", "_model."):
+                name = key[len(prefix) :]
+                if key.startswith(prefix) and name in SPLATFACTO_GAUSS_PARAMS:
+                    # inference checkpoints may store float16 weights; float() does not copy float32 ones
+                    gauss_params[name] = value.float()
+        missing = [name for name in SPLATFACTO_GAUSS_PARAMS if name not in gauss_params]
+        if missing:
+            raise ValueError(f"Checkpoint {load_path} is missing Gaussian parameters {missing}")
+        CONSOLE.print(f":white_check_mark: Read {gauss_params['means'].shape[0]} Gaussians from {load_path}")
+        return config.pipeline.model.sh_degree, gauss_params
 
     def main(self) -> None:
+        if self.ply_format == "compressed" and self.ply_color_mode != "sh_coeffs":
+            raise ValueError('The compressed PLY format requires ply_color_mode "sh_coeffs"')
+
         if not self.output_dir.exists():
             self.output_dir.mkdir(parents=True)
 
-        _, pipeline, _, _ = eval_setup(self.load_config, test_mode="inference")
+        if self.checkpoint_only:
+            sh_degree, gauss_params = self.load_gaussians_from_checkpoint(self.load_config)
+        else:
+            _, pipeline, _, _ = eval_setup(self.load_config, test_mode="inference")
 
-        assert isinstance(pipeline.model, SplatfactoModel)
+            assert isinstance(pipeline.model, SplatfactoModel)
 
-        model: SplatfactoModel = pipeline.model
+            model: SplatfactoModel = pipeline.model
+            sh_degree = model.config.sh_degree
+            gauss_params = {name: param.data for name, param in model.gauss_params.items()}
 
         filename = self.output_dir / self.output_filename
 
         map_to_tensors = OrderedDict()
 
         with torch.no_grad():
-            positions = model.means.cpu().numpy()
+            positions = gauss_params["means"].cpu().numpy()
             count = positions.shape[0]
             n = count
             map_to_tensors["x"] = positions[:, 0]
@@ -579,36 +639,39 @@ class ExportGaussianSplat(Exporter):
             map_to_tensors["ny"] = np.zeros(n, dtype=np.float32)
             map_to_tensors["nz"] = np.zeros(n, dtype=np.float32)
 
+            features_dc = gauss_params["features_dc"].float()
             if self.ply_color_mode == "rgb":
-                colors = torch.clamp(model.colors.clone(), 0.0, 1.0).data.cpu().numpy()
+                colors = SH2RGB(features_dc) if sh_degree > 0 else torch.sigmoid(features_dc)
+                colors = torch.clamp(colors, 0.0, 1.0).cpu().numpy()
                 colors = (colors * 255).astype(np.uint8)
                 map_to_tensors["red"] = colors[:, 0]
                 map_to_tensors["green"] = colors[:, 1]
                 map_to_tensors["blue"] = colors[:, 2]
             elif self.ply_color_mode == "sh_coeffs":
-                shs_0 = model.shs_0.contiguous().cpu().numpy()
+                shs_0 = features_dc if sh_degree > 0 else RGB2SH(torch.sigmoid(features_dc))
+                shs_0 = shs_0.contiguous().cpu().numpy()
                 for i in range(shs_0.shape[1]):
                     map_to_tensors[f"f_dc_{i}"] = shs_0[:, i, None]
 
-            if model.config.sh_degree > 0:
+            if sh_degree > 0:
                 if self.ply_color_mode == "rgb":
                     CONSOLE.print(
                         "Warning: model has higher level of spherical harmonics, ignoring them and only export rgb."
                     )
                 elif self.ply_color_mode == "sh_coeffs":
                     # transpose(1, 2) was needed to match the sh order in Inria version
-                    shs_rest = model.shs_rest.transpose(1, 2).contiguous().cpu().numpy()
+                    shs_rest = gauss_params["features_rest"].transpose(1, 2).contiguous().cpu().numpy()
                     shs_rest = shs_rest.reshape((n, -1))
                     for i in range(shs_rest.shape[-1]):
                         map_to_tensors[f"f_rest_{i}"] = shs_rest[:, i, None]
 
-            map_to_tensors["opacity"] = model.opacities.data.cpu().numpy()
+            map_to_tensors["opacity"] = gauss_params["opacities"].cpu().numpy()
 
-            scales = model.scales.data.cpu().numpy()
+            scales = gauss_params["scales"].cpu().numpy()
             for i in range(3):
                 map_to_tensors[f"scale_{i}"] = scales[:, i, None]
 
-            quats = model.quats.data.cpu().numpy()
+            quats = gauss_params["quats"].cpu().numpy()
             for i in range(4):
                 map_to_tensors[f"rot_{i}"] = quats[:, i, None]
 
@@ -646,7 +709,10 @@ class ExportGaussianSplat(Exporter):
                 map_to_tensors[k] = map_to_tensors[k][select]
             count = np.sum(select)
 
-        ExportGaussianSplat.write_ply(str(filename), count, map_to_tensors)
+        if self.ply_format == "compressed":
+            write_compressed_ply(filename, map_to_tensors)
+        else:
+            ExportGaussianSplat.write_ply(str(filename), count, map_to_tensors)
 
 
 Commands = tyro.conf.FlagConversionOff[
@@ -21,26 +21,27 @@ from __future__ import annotations
 import os
 import sys
 from pathlib import Path
-from typing import Callable, Literal, Optional, Tuple
+from typing import Any, Callable, Dict, Literal, Optional, Tuple
 
 import torch
 import yaml
 
 from nerfstudio.configs.method_configs import all_methods
+from nerfstudio.engine.checkpointing import inference_checkpoint_path
 from nerfstudio.engine.trainer import TrainerConfig
 from nerfstudio.pipelines.base_pipeline import Pipeline
 from nerfstudio.utils.rich_utils import CONSOLE
+from nerfstudio.utils.safetensors_utils import load_tensors
 
 
-def eval_load_checkpoint(config: TrainerConfig, pipeline: Pipeline) -> Tuple[Path, int]:
-    ## TODO: ideally eventually want to get this to be the same as whatever is used to load train checkpoint too
-    """Helper function to load checkpointed pipeline
+def get_checkpoint_path(config: TrainerConfig) -> Tuple[Path, int]:
+    """Resolve the checkpoint file to load for a config
 
     Args:
         config (DictConfig): Configuration of pipeline to load
-        pipeline (Pipeline): Pipeline instance of which to load weights
     Returns:
-        A tuple of the path to the loaded checkpoint and the step at which it was saved.
+        A tuple of the path to the checkpoint and the step at which it was saved. The path is that of the inference
+        checkpoint if the directory holds only that, e.g. when only it was downloaded from a cluster.
     """
     assert config.load_dir is not None
     if config.load_step is None:
@@ -54,17 +55,81 @@ def eval_load_checkpoint(config: TrainerConfig, pipeline: Pipeline) -> Tuple[Pat
                 justify="center",
             )
             sys.exit(1)
-        load_step = sorted(int(x[x.find("-") + 1 : x.find(".")]) for x in os.listdir(config.load_dir))[-1]
+        load_step = sorted(
+            int(x[x.find("-") + 1 : x.find(".")])
+            for x in os.listdir(config.load_dir)
+            if x.endswith((".ckpt", ".safetensors")) and not x.startswith(".")
+        )[-1]
     else:
         load_step = config.load_step
     load_path = config.load_dir / f"step-{load_step:09d}.ckpt"
+    if not load_path.exists() and inference_checkpoint_path(load_path).exists():
+        load_path = inference_checkpoint_path(load_path)
     assert load_path.exists(), f"Checkpoint {load_path} does not exist"
-    loaded_state = torch.load(load_path, map_location="cpu")
-    pipeline.load_pipeline(loaded_state["pipeline"], loaded_state["step"])
+    return load_path, load_step
+
+
+def load_checkpoint_state(load_path: Path) -> Dict[str, Any]:
+    """Load a checkpoint onto the CPU, memory-mapping the tensors when the installed torch supports it.
+
+    Args:
+        load_path: Path to the checkpoint file
+    Returns:
+        The checkpoint dictionary.
+    """
+    try:
+        return torch.load(load_path, map_location="cpu", mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1 has no mmap argument, and legacy (non-zip) checkpoints cannot be mapped
+        return torch.load(load_path, map_location="cpu")
+
+
+def load_pipeline_state(load_path: Path) -> Dict[str, torch.Tensor]:
+    """Load the pipeline weights of a checkpoint, preferring the inference checkpoint next to it, which is
+    memory-mapped and holds no optimizer state.
+
+    Args:
+        load_path: Path to the training or inference checkpoint file
+    Returns:
+        The pipeline state dict.
+    """
+    if inference_checkpoint_path(load_path).exists():
+        return load_tensors(inference_checkpoint_path(load_path))[0]
+    return load_checkpoint_state(load_path)["pipeline"]
+
+
+def eval_load_checkpoint(config: TrainerConfig, pipeline: Pipeline) -> Tuple[Path, int]:
+    ## TODO: ideally eventually want to get this to be the same as whatever is used to load train checkpoint too
+    """Helper function to load checkpointed pipeline
+
+    Args:
+        config (DictConfig): Configuration of pipeline to load
+        pipeline (Pipeline): Pipeline instance of which to load weights
+    Returns:
+        A tuple of the path to the loaded checkpoint and the step at which it was saved.
+    """
+    load_path, load_step = get_checkpoint_path(config)
+    pipeline.load_pipeline(load_pipeline_state(load_path), load_step)
     CONSOLE.print(f":white_check_mark: Done loading checkpoint from {load_path}")
     return load_path, load_step
 
 
+def load_trainer_config(config_path: Path) -> TrainerConfig:
+    """Load a saved config and point it at its checkpoint directory.
+
+    Args:
+        config_path: Path to config YAML file.
+
+    Returns:
+        Loaded config.
+    """
+    config = yaml.load(config_path.read_text(), Loader=yaml.Loader)
+    assert isinstance(config, TrainerConfig)
+    # load checkpoints from wherever they were saved
+    config.load_dir = config.get_checkpoint_dir()
+    return config
+
+
 def eval_setup(
     config_path: Path,
     eval_num_rays_per_chunk: Optional[int] = None,
@@ -512,3 +512,231 @@ def k_nearest_sklearn(
 
     # Exclude the point itself from the result and return
     return torch.tensor(distances[:, 1:], dtype=torch.float32), torch.tensor(indices[:, 1:], dtype=torch.int64)
+
+
+_NEIGHBOR_OFFSETS = torch.tensor([(dx, dy, 0) for dx, dy in itertools.product([-1, 0, 1], repeat=2)])
+"""Offsets of the 3x3 columns of voxels around a voxel. Each column of 3 voxels along z has consecutive keys."""
+_MAX_GRID_CELLS_PER_AXIS = 2**20
+"""Largest number of voxels per axis, so that linearized voxel keys fit into int64."""
+_MAX_DENSE_CELLS_PER_POINT = 8
+"""Largest number of voxels per point for which voxel starts are kept in a dense table instead of searched."""
+
+
+def _voxel_keys(coords: Int[Tensor, "*batch 3"], dims: Int[Tensor, "3"]) -> Int[Tensor, "*batch"]:
+    """Linearized keys of integer voxel coordinates."""
+    return (coords[..., 0] * dims[1] + coords[..., 1]) * dims[2] + coords[..., 2]
+
+
+def _grid_knn_round(
+    x: Float[Tensor, "n 3"],
+    queries: Int[Tensor, "m"],
+    cell_size: float,
+    k: int,
+    *,
+    query_chunk_size: int,
+    max_pairs: int,
+) -> Tuple[Float[Tensor, "m k"], Int[Tensor, "m k"], Bool[Tensor, "m"]]:
+    """Searches the k nearest neighbors of the query points among the points of the same and the 26 adjacent voxels.
+
+    A query is resolved if its k-th neighbor is closer than the smallest distance from the query to the border of
+    the searched 3x3x3 voxel block, so no point outside the block can be closer.
+
+    Returns:
+        squared distances, indices and whether each query is resolved
+    """
+    origin = x.min(dim=0).values
+    scaled = (x - origin) / cell_size
+    # Shift by one voxel so that the neighbors of every voxel have non-negative coordinates
+    coords = scaled.floor().long() + 1
+    dims = coords.max(dim=0).values + 2
+    keys = _voxel_keys(coords, dims)
+    sorted_keys, order = torch.sort(keys)
+    # Coordinate planes of the points in voxel order, followed by one point at infinity used for padding
+    sorted_planes = torch.cat([x[order].T, torch.full((3, 1), float("inf"))], dim=1)
+    padding = len(order)
+    sorted_pos = torch.empty_like(order)
+    sorted_pos[order] = torch.arange(len(order))
+    dense = int(dims.prod()) <= _MAX_DENSE_CELLS_PER_POINT * len(x)
+    if dense:
+        # Start of every voxel in the sorted points, so that the segment of a column is looked up directly
+        cell_counts = torch.bincount(keys, minlength=int(dims.prod()) + 1)
+        cell_starts = torch.cumsum(cell_counts, dim=0) - cell_counts
+
+    num_queries = len(queries)
+    sq_distances = torch.full((num_queries, k), float("inf"))
+    indices = torch.zeros((num_queries, k), dtype=torch.int64)
+    resolved = torch.zeros(num_queries, dtype=torch.bool)
+    query_keys, query_order = torch.sort(keys[queries])
+    for chunk_start in range(0, num_queries, query_chunk_size):
+        # Queries of a chunk grouped by voxel. All queries of a voxel share its candidates
+        chunk = query_order[chunk_start : chunk_start + query_chunk_size]
+        _, group_sizes = torch.unique_consecutive(
+            query_keys[chunk_start : chunk_start + query_chunk_size], return_counts=True
+        )
+        group_starts = torch.cumsum(group_sizes, dim=0) - group_sizes
+        group_coords = coords[queries[chunk[group_starts]]]
+        column_keys = _voxel_keys(group_coords[:, None, :] + _NEIGHBOR_OFFSETS[None], dims)
+        # The points of each column are one segment of the sorted points
+        if dense:
+            seg_starts = cell_starts[column_keys - 1]
+            seg_counts = cell_starts[column_keys + 2] - seg_starts
+        else:
+            seg_starts = torch.searchsorted(sorted_keys, column_keys - 1)
+            seg_counts = torch.searchsorted(sorted_keys, column_keys + 1, right=True) - seg_starts
+        seg_ends = torch.cumsum(seg_counts, dim=1)
+        # Candidate j of a group is found in the segment whose end exceeds j, at this offset from j
+        seg_shifts = seg_starts - (seg_ends - seg_counts)
+        totals = seg_ends[:, -1]
+
+        # Split groups whose queries and candidates exceed the pair budget
+        capacity = (max_pairs // totals.clamp(min=k)).clamp(min=1)
+        pieces = (group_sizes + capacity - 1) // capacity
+        piece_groups = torch.repeat_interleave(torch.arange(len(pieces)), pieces)
+        piece_offsets = (torch.arange(len(piece_groups)) - (torch.cumsum(pieces, dim=0) - pieces)[piece_groups]) * (
+            capacity[piece_groups]
+        )
+        group_starts = group_starts[piece_groups] + piece_offsets
+        group_sizes = torch.minimum(group_sizes[piece_groups] - piece_offsets, capacity[piece_groups])
+        seg_ends, seg_shifts, totals = seg_ends[piece_groups], seg_shifts[piece_groups], totals[piece_groups]
+
+        # Batch groups with similar numbers of queries and candidates, so that padding them wastes little
+        buckets = torch.log2(totals.clamp(min=1).double()).long() * 64 + torch.log2(group_sizes.double()).long()
+        buckets, by_bucket = torch.sort(buckets)
+        _, bucket_sizes = torch.unique_consecutive(buckets, return_counts=True)
+        for bucket in torch.split(by_bucket, bucket_sizes.tolist()):
+            width = max(int(totals[bucket].max()), k)
+            height = int(group_sizes[bucket].max())
+            for groups in torch.split(bucket, max(1, max_pairs // (width * height))):
+                cols = torch.arange(width).expand(len(groups), width).contiguous()
+                segments = torch.searchsorted(seg_ends[groups], cols, right=True).clamp(max=len(_NEIGHBOR_OFFSETS) - 1)
+                candidates = seg_shifts[groups].gather(1, segments) + cols
+                candidates.masked_fill_(cols >= totals[groups, None], padding)
+
+                rows = torch.arange(height)
+                query_slots = group_starts[groups, None] + rows
+                is_query = rows < group_sizes[groups, None]
+                query_slots = torch.where(is_query, query_slots, group_starts[groups, None])
+                query_points = queries[chunk[query_slots]]
+
+                # Squared distances of shape (groups, queries, candidates), one coordinate at a time
+                candidate_planes = sorted_planes[:, candidates][:, :, None, :]
+                query_planes = sorted_planes[:, sorted_pos[query_points]][..., None]
+                d2 = torch.zeros((len(groups), height, width))
+                for axis in range(3):
+                    d2.add_((query_planes[axis] - candidate_planes[axis]).square_())
+                d2.masked_fill_(candidates[:, None, :] == sorted_pos[query_points][:, :, None], float("inf"))
+                batch_d2, batch_cols = torch.topk(d2, k, dim=2, largest=False)
+                batch_candidates = candidates.gather(1, batch_cols.reshape(len(groups), -1)).clamp(max=padding - 1)
+                batch_indices = order[batch_candidates]
+
+                # Distance to the border of the searched block: one voxel plus the distance to the own voxel's faces
+                frac = scaled[query_points] - scaled[query_points].floor()
+                margin = (torch.minimum(frac, 1 - frac).min(dim=-1).values + 1) * cell_size
+                out = chunk_start + query_slots[is_query]
+                sq_distances[out] = batch_d2[is_query]
+                indices[out] = batch_indices.reshape(len(groups), height, k)[is_query]
+                resolved[out] = batch_d2[..., -1][is_query] <= margin[is_query] ** 2
+
+    # Back from sorted query order to the order of the queries
+    result_order = torch.empty_like(query_order)
+    result_order[query_order] = torch.arange(num_queries)
+    return sq_distances[result_order], indices[result_order], resolved[result_order]
+
+
+def _initial_voxel_size(x: Float[Tensor, "n 3"], extent: float, max_occupancy: float) -> float:
+    """Voxel size at which a point shares its voxel with at most max_occupancy points on average."""
+    num_points = x.shape[0]
+    voxel_size = extent / max(num_points ** (1 / 3), 1.0)
+    origin = x.min(dim=0).values
+    for _ in range(8):
+        coords = ((x - origin) / voxel_size).floor().long()
+        dims = coords.max(dim=0).values + 1
+        _, counts = torch.unique_consecutive(torch.sort(_voxel_keys(coords, dims)).values, return_counts=True)
+        occupancy = float((counts.double() ** 2).sum()) / num_points
+        if occupancy <= max_occupancy:
+            break
+        voxel_size *= (max_occupancy / occupancy) ** (1 / 3)
+    return max(voxel_size, extent / (_MAX_GRID_CELLS_PER_AXIS - 4))
+
+
+def k_nearest_grid(
+    x: torch.Tensor, k: int, query_chunk_size: int = 1 << 18, max_pairs: int = 1 << 24
+) -> Tuple[Float[Tensor, "*batch k"], Int[Tensor, "*batch k"]]:
+    """
+    Find exact k-nearest neighbors by bucketing the points into a uniform voxel grid, using torch on CPU.
+
+    Each point is compared with the points of its voxel and the 26 adjacent ones, in chunks of bounded memory. The
+    voxels start small enough for the densest regions. Points whose neighbors may lie outside their 3x3x3 block are
+    searched again on a coarser grid, at least as coarse as the distance to their k-th candidate.
+
+    Args:
+        x: input tensor of shape (N, 3)
+        k: number of neighbors to find
+        query_chunk_size: number of points whose voxel neighborhoods are looked up at once
+        max_pairs: maximum number of (point, candidate) distances computed at once
+
+    Returns:
+        distances: distances to the k-nearest neighbors, excluding the point itself
+        indices: indices of the k-nearest neighbors
+    """
+    x = x.detach().to(device="cpu", dtype=torch.float32)
+    num_points = x.shape[0]
+    assert num_points > k, f"Need more than {k} points to find {k} neighbors, got {num_points}"
+    extent = float((x.max(dim=0).values - x.min(dim=0).values).max())
+    if extent == 0:
+        indices = torch.stack([(torch.arange(num_points) + i) % num_points for i in range(1, k + 1)], dim=1)
+        return torch.zeros((num_points, k)), indices
+
+    base_voxel_size = _initial_voxel_size(x, extent, max_occupancy=2.0 * (k + 1))
+    distances = torch.empty((num_points, k))
+    indices = torch.empty((num_points, k), dtype=torch.int64)
+    unresolved = torch.arange(num_points)
+    # Voxel size needed by each unresolved point, as a power of two times the base size
+    levels = torch.zeros(num_points, dtype=torch.int64)
+    while len(unresolved) > 0:
+        level = int(levels.min())
+        voxel_size = base_voxel_size * 2**level
+        current = levels == level
+        queries = unresolved[current]
+        sq_distances, round_indices, resolved = _grid_knn_round(
+            x, queries, voxel_size, k, query_chunk_size=query_chunk_size, max_pairs=max_pairs
+        )
+        if voxel_size >= extent:
+            # All points are inside the searched block
+            resolved[:] = True
+        done = queries[resolved]
+        distances[done] = sq_distances[resolved].sqrt()
+        indices[done] = round_indices[resolved]
+
+        # A voxel at least as large as the k-th candidate distance resolves a point. Without k candidates, grow 2x
+        kth = sq_distances[~resolved, -1].sqrt().nan_to_num(posinf=0.0).clamp(min=voxel_size)
+        needed = torch.ceil(torch.log2(kth / base_voxel_size)).long()
+        next_levels = levels.clone()
+        next_levels[current.nonzero().squeeze(1)[~resolved]] = torch.maximum(needed, torch.tensor(level + 1))
+        keep = torch.ones(len(unresolved), dtype=torch.bool)
+        keep[current.nonzero().squeeze(1)[resolved]] = False
+        unresolved = unresolved[keep]
+        levels = next_levels[keep]
+    return distances, indices
+
+
+def k_nearest_neighbors(
+    x: torch.Tensor, k: int, backend: Literal["sklearn", "grid"] = "sklearn"
+) -> Tuple[Float[Tensor, "*batch k"], Int[Tensor, "*batch k"]]:
+    """
+    Find k-nearest neighbors of a point cloud, excluding each point itself.
+
+    Args:
+        x: input tensor of shape (N, 3)
+        k: number of neighbors to find
+        backend: "sklearn" for sklearn's NearestNeighbors, "grid" for the voxel grid search of k_nearest_grid
+
+    Returns:
+        distances: distances to the k-nearest neighbors
+        indices: indices of the k-nearest neighbors
+    """
+    if backend == "sklearn":
+        return k_nearest_sklearn(x, k)
+    if backend == "grid":
+        return k_nearest_grid(x, k)
+    raise ValueError(f"Unknown KNN backend: {backend}")
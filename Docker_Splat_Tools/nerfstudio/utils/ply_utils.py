@@ -0,0 +1,194 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Lightweight NumPy PLY reading and writing utils.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+"""Mapping from PLY scalar type names to numpy type codes without byte order."""
+
+NUMPY_TO_PLY_TYPES = {
+    "i1": "char",
+    "u1": "uchar",
+    "i2": "short",
+    "u2": "ushort",
+    "i4": "int",
+    "u4": "uint",
+    "f4": "float",
+    "f8": "double",
+}
+"""Mapping from numpy type codes without byte order to the PLY scalar type names written by write_ply."""
+
+
+def read_ply_header(file) -> Tuple[str, List[Tuple[str, int, List[Tuple[str, str]]]]]:
+    """Parse a PLY header from an open binary file, leaving the file positioned at the start of the data.
+
+    Args:
+        file: File object opened in binary mode.
+
+    Returns:
+        The format string and a list of (element name, count, [(property name, ply type)]) in file order. The type
+        of a list property is "list <count type> <item type>".
+    """
+    if file.readline().strip() != b"ply":
+        raise ValueError("Not a PLY file")
+    fmt = None
+    elements: List[Tuple[str, int, List[Tuple[str, str]]]] = []
+    while True:
+        line = file.readline()
+        if not line:
+            raise ValueError("Unexpected end of file in PLY header")
+        tokens = line.decode("ascii").split()
+        if not tokens or tokens[0] in ("comment", "obj_info"):
+            continue
+        if tokens[0] == "end_header":
+            break
+        if tokens[0] == "format":
+            fmt = tokens[1]
+        elif tokens[0] == "element":
+            elements.append((tokens[1], int(tokens[2]), []))
+        elif tokens[0] == "property":
+            if tokens[1] == "list":
+                elements[-1][2].append((tokens[4], " ".join(tokens[1:4])))
+            else:
+                elements[-1][2].append((tokens[2], tokens[1]))
+    if fmt is None:
+        raise ValueError("PLY header has no format line")
+    return fmt, elements
+
+
+def _parse_ascii_elements(
+    file, elements: List[Tuple[str, int, List[Tuple[str, str]]]]
+) -> "OrderedDict[str, np.ndarray]":
+    """Parse the body of an ASCII PLY file. Elements have one row of whitespace separated values per entry."""
+    values = np.fromstring(file.read().decode("ascii"), dtype=np.float64, sep=" ")
+    data = OrderedDict()
+    position = 0
+    for name, count, properties in elements:
+        size = count * len(properties)
+        if position + size > len(values):
+            raise ValueError(f"PLY element {name} is truncated: expected {count} rows")
+        rows = values[position : position + size].reshape(count, len(properties))
+        position += size
+        data[name] = np.empty(count, dtype=[(prop, "<" + PLY_TYPES[ply_type]) for prop, ply_type in properties])
+        for i, (prop, _) in enumerate(properties):
+            data[name][prop] = rows[:, i]
+    return data
+
+
+def read_ply(
+    filename: Union[str, Path], element_names: Optional[Sequence[str]] = None
+) -> "OrderedDict[str, np.ndarray]":
+    """Read the elements of a binary or ASCII PLY file into structured numpy arrays.
+
+    Elements with list properties, such as the faces of a mesh, are not supported. They may follow the requested
+    elements, as reading stops after the last requested element.
+
+    Args:
+        filename: Path to the PLY file.
+        element_names: Names of the elements to read. All elements if None.
+
+    Returns:
+        An ordered dictionary mapping each element name to a structured array with one field per property.
+    """
+    with open(filename, "rb") as file:
+        fmt, elements = read_ply_header(file)
+        if element_names is not None:
+            last = max((i for i, (name, _, _) in enumerate(elements) if name in element_names), default=-1)
+            elements = elements[: last + 1]
+        for name, _, properties in elements:
+            if any(ply_type.startswith("list") for _, ply_type in properties):
+                raise ValueError(f"PLY element {name} has list properties, which are not supported")
+        if fmt == "ascii":
+            data = _parse_ascii_elements(file, elements)
+        elif fmt in ("binary_little_endian", "binary_big_endian"):
+            byte_order = "<" if fmt == "binary_little_endian" else ">"
+            data = OrderedDict()
+            for name, count, properties in elements:
+                dtype = np.dtype([(prop, byte_order + PLY_TYPES[ply_type]) for prop, ply_type in properties])
+                data[name] = np.fromfile(file, dtype=dtype, count=count)
+                if len(data[name]) != count:
+                    raise ValueError(f"PLY element {name} is truncated: expected {count}, read {len(data[name])}")
+        else:
+            raise ValueError(f"Unsupported PLY format {fmt}")
+    if element_names is not None:
+        data = OrderedDict((name, array) for name, array in data.items() if name in element_names)
+    return data
+
+
+def vertex_colors(vertices: np.ndarray) -> np.ndarray:
+    """RGB colors of PLY vertices as uint8 of shape (N, 3). Float colors are taken to be in [0, 1] and 16 bit colors
+    are rescaled. Vertices without colors are black.
+
+    Args:
+        vertices: Structured array of a vertex element, as returned by read_ply.
+    """
+    channels = ("red", "green", "blue")
+    if not all(channel in vertices.dtype.names for channel in channels):
+        return np.zeros((len(vertices), 3), dtype=np.uint8)
+    colors = np.stack([vertices[channel] for channel in channels], axis=-1)
+    if colors.dtype.kind == "f":
+        return (np.clip(colors, 0.0, 1.0) * 255).round().astype(np.uint8)
+    if colors.dtype.itemsize == 2:
+        return (colors // 257).astype(np.uint8)
+    return colors.astype(np.uint8)
+
+
+def write_ply(filename: Union[str, Path], elements: Dict[str, np.ndarray], comments: Sequence[str] = ()) -> None:
+    """Write structured numpy arrays as the elements of a binary little endian PLY file.
+
+    Args:
+        filename: Path to the PLY file.
+        elements: Mapping from element name to a structured array with one scalar field per property.
+        comments: Comment lines of the header.
+    """
+    header = ["ply", "format binary_little_endian 1.0", *(f"comment {comment}" for comment in comments)]
+    arrays = []
+    for name, array in elements.items():
+        dtype = np.dtype([(prop, array.dtype[prop].newbyteorder("<")) for prop in array.dtype.names])
+        header.append(f"element {name} {len(array)}")
+        for prop in dtype.names:
+            header.append(f"property {NUMPY_TO_PLY_TYPES[dtype[prop].str[1:]]} {prop}")
+        arrays.append(array.astype(dtype, copy=False))
+    header.append("end_header")
+    with open(filename, "wb") as file:
+        file.write(("\n".join(header) + "\n").encode("ascii"))
+        for array in arrays:
+            array.tofile(file)
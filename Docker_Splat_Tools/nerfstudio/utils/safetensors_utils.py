@@ -0,0 +1,114 @@
+# Copyright 2022 the Regents of the University of California, Nerfstudio Team and contributors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reading and writing flat tensor dictionaries in the safetensors format, without the safetensors package.
+
+A file is an 8 byte little endian header size, a JSON header mapping each tensor name to its dtype, shape and byte
+range in the data section, then the raw little endian tensor data. Reading memory-maps the file, so tensors are only
+paged in when they are used.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+DTYPE_NAMES = {
+    torch.float64: "F64",
+    torch.float32: "F32",
+    torch.float16: "F16",
+    torch.bfloat16: "BF16",
+    torch.int64: "I64",
+    torch.int32: "I32",
+    torch.int16: "I16",
+    torch.int8: "I8",
+    torch.uint8: "U8",
+    torch.bool: "BOOL",
+}
+"""Safetensors dtype names of the supported torch dtypes."""
+_NAMES_TO_DTYPES = {name: dtype for dtype, name in DTYPE_NAMES.items()}
+
+_ALIGNMENT = 8
+"""Alignment of the data section, so that every tensor is aligned to its element size."""
+
+
+def save_tensors(
+    tensors: Dict[str, torch.Tensor], path: Union[str, Path], metadata: Optional[Dict[str, str]] = None
+) -> None:
+    """Write tensors to a safetensors file.
+
+    Args:
+        tensors: Tensors by name. They are copied to the CPU if needed.
+        path: Output file.
+        metadata: String key value pairs stored in the header.
+    """
+    # Larger elements first, so that every tensor starts at a multiple of its element size
+    names = sorted(tensors, key=lambda name: -tensors[name].element_size())
+    header: Dict[str, Dict] = {"__metadata__": dict(metadata)} if metadata else {}
+    offset = 0
+    for name in names:
+        tensor = tensors[name]
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {
+            "dtype": DTYPE_NAMES[tensor.dtype],
+            "shape": list(tensor.shape),
+            "data_offsets": [offset, offset + nbytes],
+        }
+        offset += nbytes
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % _ALIGNMENT)
+    with open(path, "wb") as file:
+        file.write(struct.pack("<Q", len(header_bytes)))
+        file.write(header_bytes)
+        for name in names:
+            tensor = tensors[name].detach().cpu().contiguous()
+            if tensor.numel() > 0:
+                file.write(tensor.view(-1).view(torch.uint8).numpy().tobytes())
+
+
+def load_tensors(path: Union[str, Path]) -> Tuple[Dict[str, torch.Tensor], Dict[str, str]]:
+    """Memory-map the tensors of a safetensors file.
+
+    The tensors are copy-on-write views of the file: they can be modified without changing it.
+
+    Args:
+        path: Safetensors file.
+
+    Returns:
+        The tensors by name and the metadata of the header.
+    """
+    with open(path, "rb") as file:
+        (header_size,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_size))
+    metadata = header.pop("__metadata__", {})
+    data_start = 8 + header_size
+    buffer = None
+    if any(info["data_offsets"][1] > info["data_offsets"][0] for info in header.values()):
+        buffer = np.memmap(path, dtype=np.uint8, mode="c", offset=data_start)
+    tensors = {}
+    for name, info in header.items():
+        dtype = _NAMES_TO_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        if end == start:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        assert buffer is not None
+        tensors[name] = torch.from_numpy(buffer[start:end]).view(dtype).reshape(info["shape"])
+    return tensors, metadata
@@ -57,6 +57,10 @@ class EventName(enum.Enum):
     TEST_RAYS_PER_SEC = "Test Rays / Sec"
     VIS_RAYS_PER_SEC = "Vis Rays / Sec"
     CURR_TEST_PSNR = "Test PSNR"
+    TRAIN_DATA_WAIT = "Train Data Wait (time)"
+    TRAIN_DATA_COPY_HIDDEN = "Train Data Copy Hidden (time)"
+    CHECKPOINT_STALL = "Checkpoint Stall (time)"
+    CHECKPOINT_SAVE_LATENCY = "Checkpoint Save Latency (time)"
 
 
 class EventType(enum.Enum):
@@ -35,6 +35,12 @@ import struct
 
 import numpy as np
 
+try:
+    # Columnar numpy reader/writer for the large binary files, see nerfstudio.data.utils.colmap_parsing_utils
+    from nerfstudio.data.utils import colmap_parsing_utils as columnar
+except ImportError:
+    columnar = None
+
 CameraModel = collections.namedtuple(
     "CameraModel", ["model_id", "model_name", "num_params"]
 )
@@ -250,6 +256,8 @@ def read_images_binary(path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
+    if columnar is not None:
+        return columnar.read_images_binary(path_to_model_file)
     images = {}
     with open(path_to_model_file, "rb") as fid:
         num_reg_images = read_next_bytes(fid, 8, "Q")[0]
@@ -340,6 +348,8 @@ def write_images_binary(images, path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
+    if columnar is not None:
+        return columnar.write_images_binary(images, path_to_model_file)
     with open(path_to_model_file, "wb") as fid:
         write_next_bytes(fid, len(images), "Q")
         for _, img in images.items():
@@ -393,6 +403,8 @@ def read_points3D_binary(path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
+    if columnar is not None:
+        return columnar.read_points3D_binary(path_to_model_file)
     points3D = {}
     with open(path_to_model_file, "rb") as fid:
         num_points = read_next_bytes(fid, 8, "Q")[0]
@@ -462,6 +474,8 @@ def write_points3D_binary(points3D, path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
+    if columnar is not None:
+        return columnar.write_points3D_binary(points3D, path_to_model_file)
     with open(path_to_model_file, "wb") as fid:
         write_next_bytes(fid, len(points3D), "Q")
         for _, pt in points3D.items():
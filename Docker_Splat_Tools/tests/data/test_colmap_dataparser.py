@@ -0,0 +1,70 @@
+"""
+Test loading the 3D points of a COLMAP model in the COLMAP dataparser
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from nerfstudio.data.dataparsers.colmap_dataparser import ColmapDataParser, ColmapDataParserConfig
+from nerfstudio.data.utils import colmap_parsing_utils as colmap_utils
+
+
+def _write_model(path: Path, ext: str):
+    rng = np.random.default_rng(0)
+    images = {}
+    for image_id in (4, 2, 9):
+        images[image_id] = colmap_utils.Image(
+            id=image_id,
+            qvec=np.array([1.0, 0.0, 0.0, 0.0]),
+            tvec=np.zeros(3),
+            camera_id=1,
+            name=f"frame_{image_id:05d}.jpg",
+            xys=rng.random((30, 2)) * 100,
+            point3D_ids=np.full(30, -1),
+        )
+    points3D = {}
+    for i, track_length in enumerate([3, 0, 5, 1, 2]):
+        points3D[i + 1] = colmap_utils.Point3D(
+            id=i + 1,
+            xyz=rng.standard_normal(3),
+            rgb=rng.integers(0, 256, 3),
+            error=np.array(rng.random()),
+            image_ids=rng.choice([4, 2, 9], track_length),
+            point2D_idxs=rng.integers(0, 30, track_length),
+        )
+    path.mkdir()
+    if ext == ".txt":
+        colmap_utils.write_images_text(images, path / "images.txt")
+        colmap_utils.write_points3D_text(points3D, path / "points3D.txt")
+    else:
+        colmap_utils.write_images_binary(images, path / "images.bin")
+        colmap_utils.write_points3D_binary(points3D, path / "points3D.bin")
+    return images, points3D
+
+
+@pytest.mark.parametrize("ext", [".bin", ".txt"])
+@pytest.mark.parametrize("max_matches", [-1, 2])
+def test_load_3D_points_pads_observations(tmp_path: Path, ext: str, max_matches: int):
+    """Observations are padded per point and limited to the first max_2D_matches_per_3D_point of each track."""
+    images, points3D = _write_model(tmp_path / "sparse", ext)
+    dataparser = ColmapDataParser(ColmapDataParserConfig(max_2D_matches_per_3D_point=max_matches))
+    dataparser._downscale_factor = 2
+    out = dataparser._load_3D_points(tmp_path / "sparse", torch.eye(4)[:3], 0.5)
+
+    expected_xyz = np.array([pt.xyz for pt in points3D.values()], dtype=np.float32) * 0.5
+    assert torch.allclose(out["points3D_xyz"], torch.from_numpy(expected_xyz))
+    assert out["points3D_num_points2D"].tolist() == [3, 0, 5, 1, 2]
+    width = 5 if max_matches == -1 else 2
+    assert out["points3D_image_ids"].shape == (5, width)
+    assert out["points3D_points2D_xy"].shape == (5, width, 2)
+    for row, pt in enumerate(points3D.values()):
+        kept = len(pt.image_ids) if max_matches == -1 else min(len(pt.image_ids), max_matches)
+        assert out["points3D_image_ids"][row, :kept].tolist() == pt.image_ids[:kept].tolist()
+        assert (out["points3D_image_ids"][row, kept:] == -1).all()
+        for col, (image_id, point2D_idx) in enumerate(zip(pt.image_ids[:kept], pt.point2D_idxs[:kept])):
+            expected = torch.from_numpy(images[image_id].xys[point2D_idx].astype(np.float32)) / 2
+            assert torch.allclose(out["points3D_points2D_xy"][row, col], expected)
+        assert (out["points3D_points2D_xy"][row, kept:] == 0).all()
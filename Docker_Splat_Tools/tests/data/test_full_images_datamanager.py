@@ -0,0 +1,94 @@
+"""
+Test image caching of the full image datamanager
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from nerfstudio.data.datamanagers.full_images_datamanager import FullImageDatamanagerConfig
+from nerfstudio.data.dataparsers.blender_dataparser import BlenderDataParserConfig
+from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.utils import writer
+
+
+def _config(data: Path = Path(__file__).parent / "lego_test", **kwargs) -> FullImageDatamanagerConfig:
+    return FullImageDatamanagerConfig(
+        dataparser=BlenderDataParserConfig(data=data),
+        cache_images_type="uint8",
+        max_thread_workers=1,
+        **kwargs,
+    )
+
+
+def test_gpu_cache_packs_uint8_images(monkeypatch):
+    """Cached images are views into one buffer and are returned by next_train without conversion."""
+    image = np.random.default_rng(0).integers(0, 256, (50, 50, 3), dtype=np.uint8)
+    monkeypatch.setattr(InputDataset, "get_numpy_image", lambda self, idx: image.copy())
+    datamanager = _config(cache_images="gpu").setup(device="cpu")
+    cached = datamanager.cached_train + datamanager.cached_eval
+    assert datamanager.cached_train[0]["image"].untyped_storage().nbytes() == image.nbytes * len(
+        datamanager.cached_train
+    )
+    for data in cached:
+        assert data["image"].dtype == torch.uint8
+        assert torch.equal(data["image"], torch.from_numpy(image))
+    _, data = datamanager.next_train(0)
+    assert data["image"].dtype == torch.uint8
+
+
+def test_gpu_cache_falls_back_to_cpu_over_budget(monkeypatch):
+    """Images that do not fit the GPU memory budget are cached on cpu."""
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda device=None: (10_000, 10**9))
+    datamanager = _config(cache_images="gpu", cache_images_gpu_budget=0.5).setup(device="cuda")
+    # lego_test has one 50x50 train and one 50x50 eval image
+    assert datamanager.estimate_image_cache_bytes() == 2 * 50 * 50 * 3
+    assert datamanager.config.cache_images == "cpu"
+
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda device=None: (10**6, 10**9))
+    assert _config(cache_images="gpu").setup(device="cuda").config.cache_images == "gpu"
+
+
+def _blender_scene(path: Path, num_train_images: int) -> Path:
+    """Copy of lego_test whose train split repeats its image with different poses."""
+    shutil.copytree(Path(__file__).parent / "lego_test", path)
+    transforms = json.loads((path / "transforms_train.json").read_text())
+    frame = transforms["frames"][0]
+    transforms["frames"] = []
+    for i in range(num_train_images):
+        matrix = [row[:] for row in frame["transform_matrix"]]
+        matrix[0][3] += i
+        transforms["frames"].append({**frame, "transform_matrix": matrix})
+    (path / "transforms_train.json").write_text(json.dumps(transforms))
+    return path
+
+
+def test_prefetched_train_views_match_synchronous(tmp_path: Path, monkeypatch):
+    """Prefetching keeps the order of training views and their data."""
+    image = np.random.default_rng(0).integers(0, 256, (50, 50, 3), dtype=np.uint8)
+    monkeypatch.setattr(InputDataset, "get_numpy_image", lambda self, idx: image.copy())
+    data = _blender_scene(tmp_path / "scene", num_train_images=5)
+    monkeypatch.setattr(writer, "GLOBAL_BUFFER", {"max_iter": 12, "max_buffer_size": 20, "events": {}})
+    monkeypatch.setattr(writer, "EVENT_STORAGE", [])
+
+    views = {}
+    for prefetch in (0, 3):
+        datamanager = _config(data, cache_images="cpu", prefetch_train_views=prefetch).setup(device="cpu")
+        views[prefetch] = [datamanager.next_train(step) for step in range(12)]
+    assert (views[3][0][0].metadata or {}).get("cam_idx") is not None
+    for (camera, batch), (prefetched_camera, prefetched_batch) in zip(views[0], views[3]):
+        assert camera.metadata["cam_idx"] == prefetched_camera.metadata["cam_idx"]
+        assert torch.equal(camera.camera_to_worlds, prefetched_camera.camera_to_worlds)
+        assert torch.equal(batch["image"], prefetched_batch["image"])
+    assert len({camera.metadata["cam_idx"] for camera, _ in views[3]}) == 5
+    assert writer.EventName.TRAIN_DATA_COPY_HIDDEN.value in writer.GLOBAL_BUFFER["events"]
+
+    # Closed at the end of training, the prefetch thread stops and no views stay staged
+    prefetcher = datamanager.train_prefetcher
+    assert prefetcher is not None
+    datamanager.close_train_prefetcher()
+    assert datamanager.train_prefetcher is None
+    assert not any(thread.is_alive() for thread in prefetcher.executor._threads)
@@ -0,0 +1,85 @@
+"""
+Test the columnar COLMAP binary reader and writer
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from nerfstudio.data.utils import colmap_parsing_utils as colmap_utils
+
+
+def _random_points3D(num_points: int, rng: np.random.Generator):
+    points3D = {}
+    for i in range(num_points):
+        track_length = int(rng.integers(0, 6))
+        point3D_id = 2 * i + 1
+        points3D[point3D_id] = colmap_utils.Point3D(
+            id=point3D_id,
+            xyz=rng.standard_normal(3),
+            rgb=rng.integers(0, 256, 3),
+            error=np.array(rng.random()),
+            image_ids=rng.integers(1, 20, track_length),
+            point2D_idxs=rng.integers(0, 500, track_length),
+        )
+    return points3D
+
+
+def test_points3D_binary_matches_per_record_format(tmp_path: Path, monkeypatch):
+    """The columnar writer produces the same bytes as packing each record with struct, and reads them back."""
+    # A chunk size below the point count exercises the chunk boundaries
+    monkeypatch.setattr(colmap_utils, "COLUMNAR_CHUNK_SIZE", 7)
+    points3D = _random_points3D(50, np.random.default_rng(0))
+    expected = tmp_path / "expected.bin"
+    with open(expected, "wb") as fid:
+        colmap_utils.write_next_bytes(fid, len(points3D), "Q")
+        for pt in points3D.values():
+            colmap_utils.write_next_bytes(fid, [pt.id, *pt.xyz.tolist(), *pt.rgb.tolist(), float(pt.error)], "QdddBBBd")
+            colmap_utils.write_next_bytes(fid, len(pt.image_ids), "Q")
+            for image_id, point2D_idx in zip(pt.image_ids.tolist(), pt.point2D_idxs.tolist()):
+                colmap_utils.write_next_bytes(fid, [image_id, point2D_idx], "ii")
+
+    colmap_utils.write_points3D_binary(points3D, tmp_path / "points3D.bin")
+    assert (tmp_path / "points3D.bin").read_bytes() == expected.read_bytes()
+
+    loaded = colmap_utils.read_points3D_binary(expected)
+    assert list(loaded) == list(points3D)
+    for point3D_id, pt in points3D.items():
+        other = loaded[point3D_id]
+        assert other.id == pt.id
+        assert other.error == pt.error
+        np.testing.assert_array_equal(other.xyz, pt.xyz)
+        np.testing.assert_array_equal(other.rgb, pt.rgb)
+        np.testing.assert_array_equal(other.image_ids, pt.image_ids)
+        np.testing.assert_array_equal(other.point2D_idxs, pt.point2D_idxs)
+    np.testing.assert_array_equal(loaded.points.track_lengths, [len(pt.image_ids) for pt in points3D.values()])
+
+
+def test_images_binary_roundtrip(tmp_path: Path):
+    """Images written from a dict come back with the same poses, names and keypoints."""
+    rng = np.random.default_rng(0)
+    images = {}
+    for image_id in (3, 1, 7):
+        num_points2D = int(rng.integers(0, 40))
+        images[image_id] = colmap_utils.Image(
+            id=image_id,
+            qvec=rng.standard_normal(4),
+            tvec=rng.standard_normal(3),
+            camera_id=1,
+            name=f"frame_{image_id:05d}.jpg",
+            xys=rng.random((num_points2D, 2)),
+            point3D_ids=rng.integers(-1, 100, num_points2D),
+        )
+
+    colmap_utils.write_images_binary(images, tmp_path / "images.bin")
+    loaded = colmap_utils.read_images_binary(tmp_path / "images.bin")
+
+    assert list(loaded) == list(images)
+    for image_id, image in images.items():
+        other = loaded[image_id]
+        assert (other.id, other.camera_id, other.name) == (image.id, image.camera_id, image.name)
+        np.testing.assert_array_equal(other.qvec, image.qvec)
+        np.testing.assert_array_equal(other.tvec, image.tvec)
+        np.testing.assert_array_equal(other.xys, image.xys)
+        np.testing.assert_array_equal(other.point3D_ids, image.point3D_ids)
+        np.testing.assert_allclose(other.qvec2rotmat(), colmap_utils.qvec2rotmat(image.qvec))
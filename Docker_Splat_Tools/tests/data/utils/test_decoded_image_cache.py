@@ -0,0 +1,73 @@
+"""
+Test the on-disk cache of decoded images of the full image datamanager
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from nerfstudio.data.datamanagers.full_images_datamanager import FullImageDatamanagerConfig
+from nerfstudio.data.dataparsers.blender_dataparser import BlenderDataParserConfig
+from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.data.utils.decoded_image_cache import DecodedImageCache
+
+
+def _setup_datamanager(cache_dir: Path, cache_images_type: str):
+    config = FullImageDatamanagerConfig(
+        dataparser=BlenderDataParserConfig(data=Path(__file__).parents[1] / "lego_test"),
+        cache_images="gpu",
+        cache_images_type=cache_images_type,  # type: ignore
+        decoded_image_cache_dir=cache_dir,
+        max_thread_workers=1,
+    )
+    datamanager = config.setup(device="cpu")
+    # Radial distortion, so images are undistorted and the intrinsics change
+    cameras = datamanager.train_dataset.cameras
+    cameras.distortion_params = torch.tensor([[0.1, 0.0, 0.0, 0.0, 0.0, 0.0]]).expand(len(cameras), 6)
+    return datamanager
+
+
+def test_decoded_images_are_memory_mapped_on_later_runs(tmp_path: Path, monkeypatch):
+    """A second run loads the undistorted images and intrinsics from the cache without decoding."""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (50, 50, 3), dtype=np.uint8)
+    monkeypatch.setattr(InputDataset, "get_numpy_image", lambda self, idx: image.copy())
+    first = _setup_datamanager(tmp_path, "uint8")
+    first_images = first.cached_train
+    first_cameras = first.train_dataset.cameras
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Images should not be decoded again")
+
+    monkeypatch.setattr(InputDataset, "get_data", fail)
+    second = _setup_datamanager(tmp_path, "uint8")
+    second_images = second.cached_train
+    assert len(second_images) == len(first_images)
+    for a, b in zip(first_images, second_images):
+        assert b["image"].dtype == torch.uint8
+        assert torch.equal(a["image"], b["image"])
+    for name in ("fx", "fy", "cx", "cy", "width", "height"):
+        assert torch.equal(getattr(first_cameras, name), getattr(second.train_dataset.cameras, name))
+
+    as_float = _setup_datamanager(tmp_path, "float32").cached_train
+    assert torch.equal(as_float[0]["image"], first_images[0]["image"].float() / 255.0)
+
+
+def test_concurrent_caches_share_one_root(tmp_path: Path):
+    """Jobs with their own cache on one shared root compute keys concurrently without failing on the hash index."""
+    dataparser = BlenderDataParserConfig(data=Path(__file__).parents[1] / "lego_test").setup()
+    dataset = InputDataset(dataparser.get_dataparser_outputs(split="train"))
+    caches = [DecodedImageCache(tmp_path) for _ in range(4)]
+    barrier = threading.Barrier(len(caches))
+
+    def keys(cache: DecodedImageCache):
+        barrier.wait()
+        return {cache.key(dataset) for _ in range(50)}
+
+    with ThreadPoolExecutor(max_workers=len(caches)) as pool:
+        results = list(pool.map(keys, caches))
+    assert all(result == results[0] for result in results) and len(results[0]) == 1
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
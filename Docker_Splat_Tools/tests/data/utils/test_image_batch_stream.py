@@ -0,0 +1,55 @@
+"""
+Test the view cache and read-ahead of the disk mode image stream
+"""
+
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from nerfstudio.cameras.cameras import Cameras
+from nerfstudio.data.dataparsers.base_dataparser import DataparserOutputs
+from nerfstudio.data.datasets.base_dataset import InputDataset
+from nerfstudio.data.utils.dataloaders import ImageBatchStream
+
+
+def _dataset(num_images: int) -> InputDataset:
+    cameras = Cameras(
+        camera_to_worlds=torch.eye(4)[None, :3].repeat(num_images, 1, 1),
+        fx=10.0,
+        fy=10.0,
+        cx=4.0,
+        cy=4.0,
+        width=8,
+        height=8,
+    )
+    return InputDataset(DataparserOutputs([Path(f"image_{i}.png") for i in range(num_images)], cameras))
+
+
+def test_views_are_decoded_once_within_budget(monkeypatch):
+    """Views are reused across epochs while they fit the budget, and the stream order does not change."""
+    decoded = []
+
+    def get_numpy_image(self, idx):
+        decoded.append(idx)
+        return np.full((8, 8, 3), idx, dtype=np.uint8)
+
+    monkeypatch.setattr(InputDataset, "get_numpy_image", get_numpy_image)
+    view_bytes = 8 * 8 * 3
+
+    uncached = list(islice(ImageBatchStream(_dataset(5), cache_images_type="uint8"), 15))
+    assert len(decoded) == 15
+
+    decoded.clear()
+    stream = ImageBatchStream(_dataset(5), cache_images_type="uint8", cache_max_bytes=5 * view_bytes, read_ahead=2)
+    cached = list(islice(stream, 15))
+    assert sorted(decoded) == list(range(5))
+    for (camera, data), (cached_camera, cached_data) in zip(uncached, cached):
+        assert camera.metadata["cam_idx"] == cached_camera.metadata["cam_idx"]
+        assert torch.equal(data["image"], cached_data["image"])
+
+    decoded.clear()
+    stream = ImageBatchStream(_dataset(5), cache_images_type="uint8", cache_max_bytes=2 * view_bytes)
+    list(islice(stream, 15))
+    assert 5 < len(decoded) < 15
@@ -0,0 +1,84 @@
+"""
+Test writing checkpoints in the background and inference checkpoints
+"""
+
+import threading
+from pathlib import Path
+
+import pytest
+import torch
+
+from nerfstudio.engine import checkpointing
+from nerfstudio.engine.checkpointing import AsyncCheckpointWriter
+from nerfstudio.engine.trainer import TrainerConfig
+from nerfstudio.utils.eval_utils import get_checkpoint_path, load_pipeline_state
+
+
+def test_async_checkpoint_snapshots_state(tmp_path: Path):
+    """The written checkpoint holds the state at submission, even if training modifies it afterwards."""
+    weights = torch.arange(10.0)
+    state = {"step": 5, "pipeline": {"weights": weights}, "optimizers": {"adam": {"param_groups": [{"lr": 0.1}]}}}
+    (tmp_path / "step-000000001.ckpt").write_bytes(b"old")
+
+    checkpoint_writer = AsyncCheckpointWriter(max_in_flight=1)
+    checkpoint_writer.submit(5, state, tmp_path / "step-000000005.ckpt", delete_others=True)
+    weights.zero_()
+    checkpoint_writer.wait()
+
+    [(step, latency)] = checkpoint_writer.pop_finished()
+    assert step == 5 and latency >= 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["step-000000005.ckpt"]
+    loaded = torch.load(tmp_path / "step-000000005.ckpt")
+    assert torch.equal(loaded["pipeline"]["weights"], torch.arange(10.0))
+    assert loaded["optimizers"]["adam"]["param_groups"] == [{"lr": 0.1}]
+    checkpoint_writer.close()
+
+
+def test_async_checkpoint_bounds_in_flight_writes(tmp_path: Path, monkeypatch):
+    """Submitting blocks while max_in_flight writes are pending, and failed writes are raised."""
+    release = threading.Event()
+    original = checkpointing.write_checkpoint
+
+    def slow_write(*args, **kwargs):
+        release.wait(timeout=10)
+        original(*args, **kwargs)
+
+    monkeypatch.setattr(checkpointing, "write_checkpoint", slow_write)
+    checkpoint_writer = AsyncCheckpointWriter(max_in_flight=2)
+    for step in (1, 2):
+        checkpoint_writer.submit(step, {"x": torch.ones(3) * step}, tmp_path / f"step-{step:09d}.ckpt")
+    assert len(checkpoint_writer.in_flight) == 2
+    threading.Timer(0.2, release.set).start()
+    checkpoint_writer.submit(3, {"x": torch.ones(3)}, tmp_path / f"step-{3:09d}.ckpt")
+    assert [step for step, _ in checkpoint_writer.pop_finished()][:1] == [1]
+    checkpoint_writer.wait()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"step-{step:09d}.ckpt" for step in (1, 2, 3)]
+
+    monkeypatch.setattr(checkpointing, "write_checkpoint", original)
+    checkpoint_writer.submit(4, {"x": torch.ones(3)}, tmp_path / "missing" / "step-000000004.ckpt")
+    with pytest.raises(RuntimeError):
+        checkpoint_writer.wait()
+
+
+def test_inference_checkpoint(tmp_path: Path):
+    """The pipeline weights are written next to the checkpoint and preferred by the evaluation loaders."""
+    pipeline_state = {"_model.gauss_params.means": torch.randn(10, 3), "_model.step": torch.tensor(7)}
+    state = {"step": 7, "pipeline": pipeline_state, "optimizers": {"means": {"state": {0: torch.randn(10, 3)}}}}
+    (tmp_path / "step-000000001.safetensors").write_bytes(b"old")
+    checkpointing.write_checkpoint(
+        state, tmp_path / "step-000000007.ckpt", delete_others=True, inference_dtype=torch.float16, save_inference=True
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["step-000000007.ckpt", "step-000000007.safetensors"]
+
+    loaded = load_pipeline_state(tmp_path / "step-000000007.ckpt")
+    assert loaded["_model.gauss_params.means"].dtype == torch.float16
+    torch.testing.assert_close(
+        loaded["_model.gauss_params.means"].float(), pipeline_state["_model.gauss_params.means"], atol=1e-2, rtol=1e-3
+    )
+    assert loaded["_model.step"].item() == 7
+
+    # only the inference checkpoint was downloaded
+    (tmp_path / "step-000000007.ckpt").unlink()
+    config = TrainerConfig(load_dir=tmp_path)
+    assert get_checkpoint_path(config) == (tmp_path / "step-000000007.safetensors", 7)
+    assert torch.equal(load_pipeline_state(tmp_path / "step-000000007.safetensors")["_model.step"], torch.tensor(7))
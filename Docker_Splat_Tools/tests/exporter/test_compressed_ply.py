@@ -0,0 +1,95 @@
+"""
+Test the quantized, chunked splat PLY format
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from nerfstudio.exporter.compressed_ply import morton_order, read_compressed_ply, write_compressed_ply
+from nerfstudio.utils.spherical_harmonics import components_from_spherical_harmonics
+
+
+def _synthetic_splat(count: int, sh_degree: int = 3) -> "OrderedDict[str, np.ndarray]":
+    rng = np.random.default_rng(0)
+    map_to_tensors: OrderedDict[str, np.ndarray] = OrderedDict()
+    positions = rng.uniform(-2, 2, size=(count, 3)).astype(np.float32)
+    for i, axis in enumerate("xyz"):
+        map_to_tensors[axis] = positions[:, i]
+    for i in range(3):
+        map_to_tensors[f"f_dc_{i}"] = rng.normal(0, 1, size=(count, 1)).astype(np.float32)
+    for i in range(3 * ((sh_degree + 1) ** 2 - 1)):
+        map_to_tensors[f"f_rest_{i}"] = rng.normal(0, 0.2, size=(count, 1)).astype(np.float32)
+    map_to_tensors["opacity"] = rng.normal(0, 2, size=(count, 1)).astype(np.float32)
+    for i in range(3):
+        map_to_tensors[f"scale_{i}"] = rng.uniform(-6, -2, size=(count, 1)).astype(np.float32)
+    for i in range(4):
+        map_to_tensors[f"rot_{i}"] = rng.normal(0, 1, size=(count, 1)).astype(np.float32)
+    return map_to_tensors
+
+
+def _view_dependent_colors(map_to_tensors, directions: torch.Tensor) -> torch.Tensor:
+    """Evaluate each Gaussian's color along the given view directions, as the rasterizer would."""
+    count = map_to_tensors["x"].shape[0]
+    dc = np.stack([map_to_tensors[f"f_dc_{i}"].reshape(-1) for i in range(3)], axis=-1)[:, None]
+    rest = np.stack([map_to_tensors[f"f_rest_{i}"].reshape(-1) for i in range(45)], axis=-1)
+    # PLY stores the higher-order coefficients channel-major
+    rest = rest.reshape(count, 3, 15).transpose(0, 2, 1)
+    sh = torch.from_numpy(np.concatenate([dc, rest], axis=1))
+    components = components_from_spherical_harmonics(3, directions)
+    return torch.clamp(torch.einsum("nk,nkc->nc", components, sh) + 0.5, 0.0, 1.0)
+
+
+def test_compressed_ply_round_trip(tmp_path: Path):
+    count = 20000
+    original = _synthetic_splat(count)
+    filename = tmp_path / "splat.compressed.ply"
+    write_compressed_ply(filename, original)
+    decoded = read_compressed_ply(filename)
+
+    # the file is written in Morton order
+    order = morton_order(np.stack([original[axis] for axis in "xyz"], axis=-1))
+    expected = OrderedDict((key, value.reshape(-1)[order]) for key, value in original.items())
+    assert list(decoded.keys()) == list(expected.keys())
+
+    # positions are quantized to at least 10 bits of the chunk extent
+    positions = np.stack([decoded[axis] for axis in "xyz"], axis=-1)
+    expected_positions = np.stack([expected[axis] for axis in "xyz"], axis=-1)
+    assert np.abs(positions - expected_positions).max() < 4.0 / 1023
+
+    scales = np.stack([decoded[f"scale_{i}"] for i in range(3)], axis=-1)
+    expected_scales = np.stack([expected[f"scale_{i}"] for i in range(3)], axis=-1)
+    assert np.abs(scales - expected_scales).max() < 4.0 / 1023
+
+    # quaternions match up to sign
+    quats = np.stack([decoded[f"rot_{i}"] for i in range(4)], axis=-1)
+    expected_quats = np.stack([expected[f"rot_{i}"] for i in range(4)], axis=-1)
+    expected_quats /= np.linalg.norm(expected_quats, axis=-1, keepdims=True)
+    assert np.abs(np.sum(quats * expected_quats, axis=-1)).min() > 0.999
+
+    alpha = 1 / (1 + np.exp(-decoded["opacity"]))
+    expected_alpha = 1 / (1 + np.exp(-expected["opacity"]))
+    assert np.abs(alpha - expected_alpha).max() <= 0.5 / 255 + 1e-6
+
+    directions = torch.nn.functional.normalize(
+        torch.randn(count, 3, generator=torch.Generator().manual_seed(0)), dim=-1
+    )
+    mse = torch.mean((_view_dependent_colors(decoded, directions) - _view_dependent_colors(expected, directions)) ** 2)
+    psnr = -10 * torch.log10(mse).item()
+    # uncompressed export stores 62 float32 properties (including zero normals) per Gaussian
+    size_ratio = filename.stat().st_size / (count * 62 * 4)
+    print(f"compressed splat: color PSNR vs. float32 {psnr:.2f} dB, size ratio {size_ratio:.3f}")
+    assert psnr > 35
+    assert size_ratio < 0.3
+
+
+def test_compressed_ply_without_higher_order_sh(tmp_path: Path):
+    original = _synthetic_splat(1000, sh_degree=0)
+    filename = tmp_path / "splat.compressed.ply"
+    write_compressed_ply(filename, original)
+    decoded = read_compressed_ply(filename)
+
+    assert not any(key.startswith("f_rest_") for key in decoded)
+    assert decoded["x"].shape == (1000,)
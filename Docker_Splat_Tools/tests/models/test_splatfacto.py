@@ -0,0 +1,27 @@
+"""
+Test the batched evaluation metrics of Splatfacto
+"""
+
+from types import SimpleNamespace
+
+import torch
+from pytorch_msssim import SSIM
+from torchmetrics.image import PeakSignalNoiseRatio
+
+from nerfstudio.models.splatfacto import SplatfactoModel
+
+
+def test_batched_image_metrics_match_single_image_metrics():
+    """PSNR and SSIM computed on a batch are those of each image computed on its own."""
+    gt_rgb = torch.rand(3, 3, 32, 40)
+    predicted_rgb = (gt_rgb + 0.1 * torch.randn_like(gt_rgb)).clamp(0, 1)
+    lpips = SimpleNamespace(net=lambda img1, img2, normalize: (img1 - img2).abs().mean(dim=(1, 2, 3), keepdim=True))
+    model = SimpleNamespace(lpips=lpips)
+
+    metrics_dict = SplatfactoModel._get_batched_image_metrics(model, gt_rgb, predicted_rgb)  # type: ignore
+    psnr = PeakSignalNoiseRatio(data_range=1.0)
+    ssim = SSIM(data_range=1.0, size_average=True, channel=3)
+    for i in range(3):
+        torch.testing.assert_close(metrics_dict["psnr"][i], psnr(gt_rgb[i : i + 1], predicted_rgb[i : i + 1]))
+        torch.testing.assert_close(metrics_dict["ssim"][i], ssim(gt_rgb[i : i + 1], predicted_rgb[i : i + 1]))
+    assert metrics_dict["lpips"].shape == (3,)
@@ -88,3 +88,70 @@ def test_load_state_dict():
     pipeline.load_pipeline(ddp_state_dict, 0)
     assert was_called
     assert getattr(pipeline.model, "param")[0].item() == 4
+
+
+def test_get_average_image_metrics_batched(tmp_path: Path):
+    """Batched evaluation gives the per-image metric statistics, writes every image and reports the throughput."""
+
+    class MockedModel(Model):
+        """Mocked model scoring each image by the x translation of its camera"""
+
+        def get_outputs_for_camera(self, camera, obb_box=None):
+            return {"rgb": camera.camera_to_worlds[0, 0, 3].expand(2, 2, 3)}
+
+        def get_image_metrics_and_images(self, outputs, batch):
+            return {"psnr": float(outputs["rgb"][0, 0, 0])}, {"img": outputs["rgb"]}
+
+    config = VanillaPipelineConfig(
+        datamanager=VanillaDataManagerConfig(_target=MockedDataManager),
+        model=ModelConfig(_target=MockedModel),
+        eval_batch_size=3,
+    )
+    pipeline = VanillaPipeline(config, "cpu")
+    camera_to_worlds = torch.zeros(7, 3, 4)
+    camera_to_worlds[:, 0, 3] = torch.linspace(0, 1, 7)
+    cameras = Cameras(camera_to_worlds=camera_to_worlds, fx=1.0, fy=1.0, cx=1.0, cy=1.0, width=2, height=2)
+    data_loader = [(cameras[i : i + 1], {"image_idx": i}) for i in range(7)]
+
+    metrics_dict = pipeline.get_average_image_metrics(data_loader, "eval", output_path=tmp_path, get_std=True)
+    expected_std, expected_mean = torch.std_mean(torch.linspace(0, 1, 7))
+    assert metrics_dict["psnr"] == float(expected_mean)
+    assert metrics_dict["psnr_std"] == float(expected_std)
+    assert metrics_dict["images_per_sec"] > 0 and metrics_dict["fps"] > 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"eval_img_{i:04d}.png" for i in range(7)]
+
+
+def test_get_average_image_metrics_mixed_resolutions():
+    """Chunks scored in a batch on the device and chunks of mixed resolutions scored per image are averaged together."""
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    class MockedModel(Model):
+        """Mocked model scoring images of one resolution in a batch on the device, like Splatfacto"""
+
+        def get_outputs_for_camera(self, camera, obb_box=None):
+            return {"rgb": camera.camera_to_worlds[0, 0, 3].expand(int(camera.height), int(camera.width), 3)}
+
+        def get_image_metrics_and_images(self, outputs, batch):
+            return {"psnr": float(outputs["rgb"][0, 0, 0])}, {"img": outputs["rgb"]}
+
+        def get_batched_image_metrics_and_images(self, outputs, batches):
+            if len({output["rgb"].shape for output in outputs}) > 1:
+                return super().get_batched_image_metrics_and_images(outputs, batches)
+            psnr = torch.stack([output["rgb"][0, 0, 0] for output in outputs]).to(self.device)
+            return {"psnr": psnr}, [{"img": output["rgb"]} for output in outputs]
+
+    config = VanillaPipelineConfig(
+        datamanager=VanillaDataManagerConfig(_target=MockedDataManager),
+        model=ModelConfig(_target=MockedModel),
+        eval_batch_size=2,
+    )
+    pipeline = VanillaPipeline(config, device)
+    camera_to_worlds = torch.zeros(4, 3, 4)
+    camera_to_worlds[:, 0, 3] = torch.linspace(0, 1, 4)
+    # Landscape and portrait images, the first chunk has one resolution and the second mixes both
+    width, height = torch.tensor([[3], [3], [3], [2]]), torch.tensor([[2], [2], [2], [3]])
+    cameras = Cameras(camera_to_worlds=camera_to_worlds, fx=1.0, fy=1.0, cx=1.0, cy=1.0, width=width, height=height)
+    data_loader = [(cameras[i : i + 1], {"image_idx": i}) for i in range(4)]
+
+    metrics_dict = pipeline.get_average_image_metrics(data_loader, "eval")
+    assert metrics_dict["psnr"] == float(torch.linspace(0, 1, 4).mean())
@@ -0,0 +1,49 @@
+"""
+Test COLMAP matcher selection helpers
+"""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from nerfstudio.process_data import colmap_utils
+
+
+def test_get_matcher_args(tmp_path: Path, monkeypatch):
+    vocab_tree = tmp_path / "vocab_tree.bin"
+    vocab_tree.write_bytes(b"tree")
+    monkeypatch.setenv(colmap_utils.VOCAB_TREE_ENV, str(vocab_tree))
+
+    assert colmap_utils.get_vocab_tree() == vocab_tree
+    assert colmap_utils.get_matcher_args("exhaustive") == ["exhaustive_matcher"]
+    assert colmap_utils.get_matcher_args("sequential") == ["sequential_matcher"]
+    assert colmap_utils.get_matcher_args("sequential", loop_detection=True) == [
+        "sequential_matcher",
+        "--SequentialMatching.loop_detection",
+        "1",
+        "--SequentialMatching.vocab_tree_path",
+        str(vocab_tree),
+    ]
+    assert colmap_utils.get_matcher_args("vocab_tree") == [
+        "vocab_tree_matcher",
+        "--VocabTreeMatching.vocab_tree_path",
+        str(vocab_tree),
+    ]
+
+    monkeypatch.setenv(colmap_utils.VOCAB_TREE_ENV, str(tmp_path / "missing.bin"))
+    with pytest.raises(FileNotFoundError):
+        colmap_utils.get_vocab_tree()
+
+
+def test_count_matched_image_pairs(tmp_path: Path):
+    database_path = tmp_path / "database.db"
+    database = sqlite3.connect(database_path)
+    database.execute("CREATE TABLE matches (pair_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER, data BLOB)")
+    database.execute("CREATE TABLE two_view_geometries (pair_id INTEGER PRIMARY KEY, rows INTEGER, cols INTEGER)")
+    database.executemany("INSERT INTO matches VALUES (?, ?, 2, NULL)", [(1, 120), (2, 40), (3, 0)])
+    database.executemany("INSERT INTO two_view_geometries VALUES (?, ?, 2)", [(1, 90), (2, 0), (3, 0)])
+    database.commit()
+    database.close()
+
+    assert colmap_utils.count_matched_image_pairs(database_path) == (2, 1)
@@ -0,0 +1,44 @@
+"""
+Test the in-process image engines of copy_images_list
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nerfstudio.process_data import process_data_utils
+
+
+@pytest.mark.parametrize("engine", ["opencv", "pillow"])
+def test_copy_images_list_parallel_engine(tmp_path: Path, engine):
+    """Downscales are written by a process pool and uncropped full resolution images are hard-linked."""
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(3):
+        Image.fromarray(np.full((40, 60, 3), 50 * i, dtype=np.uint8)).save(data / f"image_{i}.png")
+    image_paths = sorted(data.iterdir())
+
+    copied = process_data_utils.copy_images_list(
+        image_paths, tmp_path / "images", num_downscales=2, engine=engine, num_workers=2, link_mode="hardlink"
+    )
+    assert [p.name for p in copied] == [f"frame_{i:05d}.png" for i in range(1, 4)]
+    for source, path in zip(image_paths, copied):
+        assert path.stat().st_ino == source.stat().st_ino
+        for factor in (2, 4):
+            downscaled = np.array(Image.open(tmp_path / f"images_{factor}" / path.name))
+            assert downscaled.shape == (40 // factor, 60 // factor, 3)
+            assert (downscaled == np.array(Image.open(source))[0, 0]).all()
+
+    cropped = process_data_utils.copy_images_list(
+        image_paths,
+        tmp_path / "cropped",
+        num_downscales=1,
+        crop_factor=(0.25, 0.25, 0.0, 0.5),
+        engine=engine,
+        link_mode="hardlink",
+    )
+    assert Image.open(cropped[0]).size == (30, 20)
+    assert Image.open(tmp_path / "cropped_2" / cropped[0].name).size == (15, 10)
+    assert cropped[0].stat().st_ino != image_paths[0].stat().st_ino
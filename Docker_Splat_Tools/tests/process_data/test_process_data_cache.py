@@ -0,0 +1,125 @@
+"""
+Test the content-addressed ns-process-data cache
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nerfstudio.data.utils.colmap_parsing_utils import (
+    Camera,
+    Image as ColmapImage,
+    write_cameras_binary,
+    write_images_binary,
+)
+from nerfstudio.process_data import colmap_utils, process_data_utils
+from nerfstudio.process_data.process_data_cache import FileHashIndex, sha256_file
+
+
+def test_copy_images_reuses_cached_images(tmp_path: Path, monkeypatch):
+    """Unchanged images are hard-linked from the cache, only changed images are processed again."""
+    # ffmpeg is not available in the dev env, downscales are therefore not produced
+    monkeypatch.setenv("PATH", str(tmp_path / "mocked_bin"))
+    (tmp_path / "mocked_bin").mkdir()
+    (tmp_path / "mocked_bin" / "ffmpeg").touch(mode=0o777)
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(4):
+        Image.fromarray(np.full((8, 8, 3), i, dtype=np.uint8)).save(data / f"image_{i}.png")
+    cache_dir = tmp_path / "cache"
+
+    processed = []
+    copy_images_list = process_data_utils.copy_images_list
+
+    def spy(image_paths, **kwargs):
+        # The uncached inner call is the one that actually processes images
+        if kwargs.get("cache_dir") is None:
+            processed.extend(image_paths)
+        return copy_images_list(image_paths=image_paths, **kwargs)
+
+    monkeypatch.setattr(process_data_utils, "copy_images_list", spy)
+
+    first = process_data_utils.copy_images(data, tmp_path / "out1" / "images", cache_dir=cache_dir)
+    assert len(processed) == 4
+    assert [p.name for p in first.values()] == [f"frame_{i:05d}.png" for i in range(1, 5)]
+
+    processed.clear()
+    Image.fromarray(np.full((8, 8, 3), 255, dtype=np.uint8)).save(data / "image_2.png")
+    second = process_data_utils.copy_images(data, tmp_path / "out2" / "images", cache_dir=cache_dir)
+    assert [p.name for p in processed] == ["image_2.png"]
+
+    for original, copied in second.items():
+        assert copied.read_bytes() == original.read_bytes()
+    assert first[data / "image_0.png"].stat().st_ino == second[data / "image_0.png"].stat().st_ino
+    assert first[data / "image_2.png"].stat().st_ino != second[data / "image_2.png"].stat().st_ino
+
+
+def test_colmap_to_json_reuses_cached_conversion(tmp_path: Path, monkeypatch):
+    """A second conversion of the same model is copied from the cache without reading the model again."""
+    recon_dir = tmp_path / "sparse"
+    recon_dir.mkdir()
+    write_cameras_binary({1: Camera(1, "PINHOLE", 100, 100, [100, 100, 50, 50])}, recon_dir / "cameras.bin")
+    write_images_binary(
+        {
+            i: ColmapImage(i, np.array([1.0, 0, 0, 0]), np.array([0, 0, float(i)]), 1, f"image_{i}.png", [], [])
+            for i in (1, 2, 3)
+        },
+        recon_dir / "images.bin",
+    )
+    (recon_dir / "points3D.txt").write_text("1 0 0 0 255 0 0 0.5 1 0\n")
+    cache_dir = tmp_path / "cache"
+
+    (tmp_path / "out1").mkdir()
+    assert colmap_utils.colmap_to_json(recon_dir, tmp_path / "out1", cache_dir=cache_dir) == 3
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The model should not be read again")
+
+    monkeypatch.setattr(colmap_utils, "read_images_binary", fail)
+    monkeypatch.setattr(colmap_utils, "create_ply_from_colmap", fail)
+    (tmp_path / "out2").mkdir()
+    assert colmap_utils.colmap_to_json(recon_dir, tmp_path / "out2", cache_dir=cache_dir) == 3
+    for name in ("transforms.json", "sparse_pc.ply"):
+        assert (tmp_path / "out2" / name).read_bytes() == (tmp_path / "out1" / name).read_bytes()
+    assert len(json.loads((tmp_path / "out2" / "transforms.json").read_text())["frames"]) == 3
+
+    # Different conversion arguments are a cache miss
+    (tmp_path / "out3").mkdir()
+    with pytest.raises(AssertionError):
+        colmap_utils.colmap_to_json(
+            recon_dir, tmp_path / "out3", cache_dir=cache_dir, keep_original_world_coordinate=True
+        )
+
+
+def test_file_hash_index_concurrent_saves(tmp_path: Path):
+    """Indexes of concurrent jobs sharing one hashes.json save without colliding on a temp file."""
+    files = []
+    for i in range(4):
+        files.append(tmp_path / f"file_{i}.bin")
+        files[-1].write_bytes(bytes([i]) * 64)
+    indexes = [FileHashIndex(tmp_path / "hashes.json") for _ in range(4)]
+    barrier = threading.Barrier(len(indexes))
+
+    def save(i: int) -> List[str]:
+        barrier.wait()
+        return [indexes[i].hash_files([files[i]])[0] for _ in range(20)]
+
+    with ThreadPoolExecutor(max_workers=len(indexes)) as pool:
+        results = list(pool.map(save, range(len(indexes))))
+    assert all(len(set(hashes)) == 1 for hashes in results)
+    # The last save wins, the index is complete JSON and no temp files are left behind
+    assert json.loads((tmp_path / "hashes.json").read_text())
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_file_hash_index_save_is_best_effort(tmp_path: Path):
+    """An index that cannot be saved still returns the hashes."""
+    (tmp_path / "file.bin").write_bytes(b"data")
+    index = FileHashIndex(tmp_path / "missing_dir" / "hashes.json")
+    assert index.hash_files([tmp_path / "file.bin"]) == [sha256_file(tmp_path / "file.bin")]
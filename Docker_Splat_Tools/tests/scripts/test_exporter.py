@@ -12,13 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
 import open3d as o3d
 import pytest
+import torch
 
+from nerfstudio.configs.method_configs import method_configs
 from nerfstudio.scripts.exporter import ExportGaussianSplat
 
 
@@ -76,7 +79,61 @@ def test_export_gaussian_splat_write_ply_mismatched_count(tmp_path: Path):
         ExportGaussianSplat.write_ply(filename, count, map_to_tensors)
 
 
+def test_export_gaussian_splat_write_ply_chunked(tmp_path: Path):
+    filename = tmp_path / "test_export_gaussian_splat_write_ply_chunked.ply"
+    count = 1000
+    map_to_tensors: OrderedDict[str, np.ndarray] = OrderedDict(
+        [
+            ("x", np.random.rand(count).astype(np.float64)),
+            ("opacity", np.random.rand(count, 1).astype(np.float32)),
+            ("red", np.random.randint(0, 255, size=(count,), dtype=np.uint8)),
+        ]
+    )
+
+    # A chunk size that does not divide count exercises the partial last block.
+    ExportGaussianSplat.write_ply(str(filename), count, map_to_tensors, chunk_size=333)
+
+    data = filename.read_bytes()
+    header_end = data.index(b"end_header\n") + len(b"end_header\n")
+    vertices = np.frombuffer(data[header_end:], dtype=np.dtype([("x", "<f4"), ("opacity", "<f4"), ("red", "u1")]))
+
+    assert len(vertices) == count
+    np.testing.assert_array_equal(vertices["x"], map_to_tensors["x"].astype(np.float32))
+    np.testing.assert_array_equal(vertices["opacity"], map_to_tensors["opacity"][:, 0])
+    np.testing.assert_array_equal(vertices["red"], map_to_tensors["red"])
+
+
+def test_export_gaussian_splat_load_gaussians_from_checkpoint(tmp_path: Path):
+    config = copy.deepcopy(method_configs["splatfacto"])
+    config.output_dir = tmp_path
+    config.timestamp = "test"
+    config.save_config()
+    count = 20
+    gauss_params = {
+        "means": torch.rand(count, 3),
+        "scales": torch.rand(count, 3),
+        "quats": torch.rand(count, 4),
+        "features_dc": torch.rand(count, 3),
+        "features_rest": torch.rand(count, 15, 3),
+        "opacities": torch.rand(count, 1),
+    }
+    checkpoint_dir = config.get_checkpoint_dir()
+    checkpoint_dir.mkdir(parents=True)
+    pipeline_state = {f"_model.gauss_params.{name}": value for name, value in gauss_params.items()}
+    pipeline_state["_model.camera_optimizer.pose_adjustment"] = torch.zeros(1, 6)
+    torch.save({"step": 10, "pipeline": pipeline_state}, checkpoint_dir / "step-000000010.ckpt")
+
+    sh_degree, loaded = ExportGaussianSplat.load_gaussians_from_checkpoint(config.get_base_dir() / "config.yml")
+
+    assert sh_degree == config.pipeline.model.sh_degree
+    assert loaded.keys() == gauss_params.keys()
+    for name, value in gauss_params.items():
+        torch.testing.assert_close(loaded[name], value)
+
+
 if __name__ == "__main__":
     # Run the test
     test_export_gaussian_splat_write_ply(Path("."))
     test_export_gaussian_splat_write_ply_mismatched_count(Path("."))
+    test_export_gaussian_splat_write_ply_chunked(Path("."))
+    test_export_gaussian_splat_load_gaussians_from_checkpoint(Path("."))
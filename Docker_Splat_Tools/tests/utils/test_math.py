@@ -0,0 +1,46 @@
+"""
+Test the KNN backends
+"""
+
+import pytest
+import torch
+
+from nerfstudio.utils.math import k_nearest_grid, k_nearest_sklearn
+
+
+def _point_clouds():
+    generator = torch.Generator().manual_seed(0)
+    uniform = torch.rand((5000, 3), generator=generator)
+    # Dense cluster, a sparse one and far outliers, so that several grid resolutions are needed
+    clustered = torch.cat(
+        [
+            0.01 * torch.randn((3000, 3), generator=generator),
+            torch.randn((1500, 3), generator=generator) + 5.0,
+            torch.rand((500, 3), generator=generator) * 1000.0 - 500.0,
+        ]
+    )
+    planar = torch.rand((3000, 3), generator=generator)
+    planar[:, 2] = 0.0
+    return {"uniform": uniform, "clustered": clustered, "planar": planar, "tiny": uniform[:6]}
+
+
+@pytest.mark.parametrize("name", ["uniform", "clustered", "planar", "tiny"])
+def test_k_nearest_grid_matches_sklearn(name):
+    """The grid search finds the exact neighbor distances, never the point itself, also with small chunks."""
+    points = _point_clouds()[name]
+    expected, _ = k_nearest_sklearn(points, 3)
+    for kwargs in ({}, {"query_chunk_size": 777, "max_pairs": 1000}):
+        distances, indices = k_nearest_grid(points, 3, **kwargs)
+        assert torch.allclose(distances, expected, atol=1e-5)
+        assert not (indices == torch.arange(len(points))[:, None]).any()
+        assert torch.allclose((points[indices] - points[:, None]).norm(dim=-1), distances, atol=1e-5)
+
+
+def test_k_nearest_grid_duplicates():
+    """Duplicated points are each other's nearest neighbor at distance zero."""
+    points = torch.rand((1000, 3)).repeat(2, 1)
+    distances, indices = k_nearest_grid(points, 3)
+    assert (distances[:, 0] == 0).all()
+    assert torch.equal(indices[:, 0] % 1000, torch.arange(2000) % 1000)
+    distances, _ = k_nearest_grid(torch.zeros((5, 3)), 3)
+    assert (distances == 0).all()
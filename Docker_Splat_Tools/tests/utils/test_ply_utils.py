@@ -0,0 +1,104 @@
+"""
+Test the NumPy PLY reader and writer and the sparse point clouds written from COLMAP
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from nerfstudio.data.dataparsers.nerfstudio_dataparser import Nerfstudio, NerfstudioDataParserConfig
+from nerfstudio.data.utils import colmap_parsing_utils as colmap_utils
+from nerfstudio.process_data.colmap_utils import create_ply_from_colmap
+from nerfstudio.utils.ply_utils import read_ply, vertex_colors, write_ply
+
+
+def test_write_ply_roundtrip(tmp_path: Path):
+    """Elements written as binary little endian PLY are read back unchanged."""
+    rng = np.random.default_rng(0)
+    vertices = np.empty(100, dtype=[("x", ">f4"), ("y", "<f8"), ("label", "<i4"), ("red", "u1")])
+    for name in vertices.dtype.names:
+        vertices[name] = rng.integers(0, 200, 100)
+    faces = np.zeros(5, dtype=[("index", "<u2")])
+    faces["index"] = np.arange(5)
+    write_ply(tmp_path / "test.ply", {"vertex": vertices, "face": faces}, comments=["test"])
+
+    data = read_ply(tmp_path / "test.ply")
+    assert list(data) == ["vertex", "face"]
+    for name in vertices.dtype.names:
+        np.testing.assert_array_equal(data["vertex"][name], vertices[name])
+    assert data["vertex"].dtype["x"] == np.dtype("<f4")
+    np.testing.assert_array_equal(data["face"]["index"], faces["index"])
+
+
+def test_read_ascii_ply(tmp_path: Path):
+    """ASCII PLY files as written by earlier versions of create_ply_from_colmap are readable."""
+    header = "ply\nformat ascii 1.0\nelement vertex 2\nproperty float x\nproperty float y\nproperty float z\n"
+    header += "property uint8 red\nproperty uint8 green\nproperty uint8 blue\nend_header\n"
+    (tmp_path / "ascii.ply").write_text(header + "0.500000 -1.000000 2.000000 255 0 7\n1.0 2.0 3.0 1 2 3\n")
+    vertices = read_ply(tmp_path / "ascii.ply")["vertex"]
+    np.testing.assert_array_equal(vertices["x"], [0.5, 1.0])
+    np.testing.assert_array_equal(vertex_colors(vertices), [[255, 0, 7], [1, 2, 3]])
+
+    (tmp_path / "truncated.ply").write_text(header + "0.5 -1.0 2.0 255 0 7\n")
+    with pytest.raises(ValueError):
+        read_ply(tmp_path / "truncated.ply")
+
+
+def test_sparse_point_cloud_from_colmap(tmp_path: Path):
+    """Points written by create_ply_from_colmap are loaded as seed points by the nerfstudio dataparser."""
+    rng = np.random.default_rng(0)
+    points3D = {
+        i: colmap_utils.Point3D(
+            id=i,
+            xyz=rng.standard_normal(3),
+            rgb=rng.integers(0, 256, 3),
+            error=np.array(0.5),
+            image_ids=np.array([1]),
+            point2D_idxs=np.array([0]),
+        )
+        for i in range(1, 51)
+    }
+    colmap_utils.write_points3D_binary(points3D, tmp_path / "points3D.bin")
+    create_ply_from_colmap("sparse_pc.ply", tmp_path, tmp_path, applied_transform=torch.eye(4)[:3])
+    assert (tmp_path / "sparse_pc.ply").read_bytes().startswith(b"ply\nformat binary_little_endian 1.0\n")
+
+    transform_matrix = torch.eye(4)[:3]
+    transform_matrix[:, 3] = 1.0
+    out = Nerfstudio(NerfstudioDataParserConfig())._load_3D_points(tmp_path / "sparse_pc.ply", transform_matrix, 2.0)
+    expected_xyz = (np.array([pt.xyz for pt in points3D.values()], dtype=np.float32) + 1.0) * 2.0
+    assert torch.allclose(out["points3D_xyz"], torch.from_numpy(expected_xyz))
+    assert out["points3D_rgb"].dtype == torch.uint8
+    np.testing.assert_array_equal(out["points3D_rgb"].numpy(), [pt.rgb for pt in points3D.values()])
+
+
+def test_seed_points_from_mesh_ply(tmp_path: Path):
+    """Vertices of a PLY with faces, such as a RealityCapture point cloud, are loaded as seed points."""
+    vertex_header = "element vertex 3\nproperty float x\nproperty float y\nproperty float z\n"
+    vertex_header += "property uchar red\nproperty uchar green\nproperty uchar blue\n"
+    face_header = "element face 1\nproperty list uchar int vertex_indices\n"
+    vertices = np.array(
+        [(0.0, 1.0, 2.0, 10, 20, 30), (1.0, 2.0, 3.0, 40, 50, 60), (2.0, 3.0, 4.0, 70, 80, 90)],
+        dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("red", "u1"), ("green", "u1"), ("blue", "u1")],
+    )
+    face = np.array([3], dtype="u1").tobytes() + np.array([0, 1, 2], dtype="<i4").tobytes()
+    header = "ply\nformat binary_little_endian 1.0\n" + vertex_header + face_header + "end_header\n"
+    (tmp_path / "mesh.ply").write_bytes(header.encode("ascii") + vertices.tobytes() + face)
+
+    out = Nerfstudio(NerfstudioDataParserConfig())._load_3D_points(tmp_path / "mesh.ply", torch.eye(4)[:3], 1.0)
+    np.testing.assert_array_equal(out["points3D_xyz"].numpy(), [[0, 1, 2], [1, 2, 3], [2, 3, 4]])
+    np.testing.assert_array_equal(out["points3D_rgb"].numpy(), [[10, 20, 30], [40, 50, 60], [70, 80, 90]])
+    with pytest.raises(ValueError):
+        read_ply(tmp_path / "mesh.ply")
+
+    ascii_body = "0 1 2 10 20 30\n1 2 3 40 50 60\n2 3 4 70 80 90\n3 0 1 2\n"
+    (tmp_path / "ascii_mesh.ply").write_text(
+        "ply\nformat ascii 1.0\n" + vertex_header + face_header + "end_header\n" + ascii_body
+    )
+    assert list(read_ply(tmp_path / "ascii_mesh.ply", ["vertex"])) == ["vertex"]
+
+    # Faces before the vertices cannot be skipped
+    (tmp_path / "faces_first.ply").write_text("ply\nformat ascii 1.0\n" + face_header + vertex_header + "end_header\n")
+    with pytest.raises(ValueError):
+        read_ply(tmp_path / "faces_first.ply", ["vertex"])
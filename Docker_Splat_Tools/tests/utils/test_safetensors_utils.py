@@ -0,0 +1,44 @@
+"""
+Test reading and writing tensors in the safetensors format
+"""
+
+import json
+import struct
+from pathlib import Path
+
+import torch
+
+from nerfstudio.utils.safetensors_utils import load_tensors, save_tensors
+
+
+def test_save_load_tensors_roundtrip(tmp_path: Path):
+    """Tensors of every dtype and shape are read back unchanged, aligned to their element size."""
+    tensors = {
+        "means": torch.randn(10, 3),
+        "features_rest": torch.randn(10, 15, 3).half(),
+        "scales": torch.randn(7).bfloat16(),
+        "step": torch.tensor(3, dtype=torch.int64),
+        "mask": torch.rand(5) > 0.5,
+        "empty": torch.zeros(0, 3),
+        "strided": torch.arange(12, dtype=torch.int16).reshape(3, 4).T,
+    }
+    save_tensors(tensors, tmp_path / "test.safetensors", metadata={"step": "3"})
+
+    loaded, metadata = load_tensors(tmp_path / "test.safetensors")
+    assert metadata == {"step": "3"}
+    assert loaded.keys() == tensors.keys()
+    for name, value in tensors.items():
+        assert loaded[name].dtype == value.dtype
+        assert torch.equal(loaded[name], value)
+
+    with open(tmp_path / "test.safetensors", "rb") as file:
+        (header_size,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_size))
+    assert header_size % 8 == 0
+    for name, info in header.items():
+        if name != "__metadata__":
+            assert info["data_offsets"][0] % tensors[name].element_size() == 0
+
+    # loaded tensors are copy-on-write, the file is left unchanged
+    loaded["means"].zero_()
+    assert torch.equal(load_tensors(tmp_path / "test.safetensors")[0]["means"], tensors["means"])
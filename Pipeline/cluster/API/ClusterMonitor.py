@@ -0,0 +1,238 @@
+import re
+import shlex
+import threading
+
+# Pipeline stages, recognized from the messages pipeline.py prints to the job's LOG.out
+STAGE_PATTERNS = [
+    (re.compile(r"Starting pipeline"), "starting"),
+    (re.compile(r"Removing the worst|Filtering to retain|Starting image selection"), "extraction"),
+    (re.compile(r"COLMAP"), "colmap"),
+    (re.compile(r"Preparing training data|Filtering images for training"), "preparing"),
+    (re.compile(r"Starting SplatFacto training"), "training"),
+    (re.compile(r"SplatFacto training completed"), "trained"),
+    (re.compile(r"Exporting \.ply"), "export"),
+    (re.compile(r"Export completed"), "exported"),
+    (re.compile(r"Pipeline failed"), "failed"),
+    (re.compile(r"Pipeline completed"), "completed"),
+]
+# Rows of the nerfstudio training table start with "<step> (<percent>%)"
+TRAIN_STEP = re.compile(r"^(\d+) \((\d+(?:\.\d+)?)%\)")
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]|\x1b")
+
+# SLURM states of jobs that have not finished yet
+ACTIVE_STATES = {"PENDING", "CONFIGURING", "RUNNING", "COMPLETING", "REQUEUED", "RESIZING", "SUSPENDED"}
+
+
+def parse_log_line(line, progress):
+    """Update a job's progress dict with one line of its LOG.out."""
+    line = ANSI_ESCAPE.sub("", line).strip().lstrip("✔").strip()
+    if not line:
+        return
+    match = TRAIN_STEP.match(line)
+    if match:
+        progress["stage"] = "training"
+        progress["step"] = int(match.group(1))
+        progress["percent"] = float(match.group(2))
+        return
+    for pattern, stage in STAGE_PATTERNS:
+        if pattern.search(line):
+            progress["stage"] = stage
+            progress["message"] = line
+            return
+
+
+class SSHConnection:
+    """
+    One SSH connection to the cluster shared by all jobs, reopened when it drops.
+    Commands and file transfers each open their own channel on it.
+    """
+
+    def __init__(self, host, username, password):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.lock = threading.Lock()
+        self.client = None
+        self.sftp = None
+
+    def _connect(self):
+        # Imported here so that the monitor can be used and tested with other connections
+        import paramiko
+
+        if self.client is None or not self.client.get_transport() or not self.client.get_transport().is_active():
+            self.close()
+            self.client = paramiko.SSHClient()
+            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            self.client.connect(self.host, username=self.username, password=self.password)
+        return self.client
+
+    def exec(self, command):
+        """Run a command, returning its exit status, stdout and stderr."""
+        with self.lock:
+            client = self._connect()
+        stdin, stdout, stderr = client.exec_command(command)
+        out = stdout.read().decode(errors="ignore")
+        err = stderr.read().decode(errors="ignore")
+        return stdout.channel.recv_exit_status(), out, err
+
+    def read_from(self, path, offset):
+        """Bytes of a remote file from offset on, empty if the file does not exist yet."""
+        with self.lock:
+            client = self._connect()
+            if self.sftp is None:
+                self.sftp = client.open_sftp()
+            try:
+                if self.sftp.stat(path).st_size <= offset:
+                    return b""
+                with self.sftp.open(path, "rb") as f:
+                    f.seek(offset)
+                    return f.read()
+            except FileNotFoundError:
+                return b""
+
+    def open_sftp(self):
+        """SFTP session of its own, for transfers that should not block log reads."""
+        with self.lock:
+            return self._connect().open_sftp()
+
+    def close(self):
+        if self.sftp is not None:
+            self.sftp.close()
+            self.sftp = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+class TrackedJob:
+    """A SLURM job followed by the JobMonitor."""
+
+    def __init__(self, slurm_job_id, log_path, max_steps=None):
+        self.slurm_job_id = slurm_job_id
+        self.log_path = log_path
+        self.log_offset = 0
+        self.partial_line = ""
+        self.progress = {"stage": "queued", "slurm_job_id": slurm_job_id}
+        if max_steps is not None:
+            self.progress["max_steps"] = max_steps
+        self.state = None
+        self.exit_code = None
+        self.finished = threading.Event()
+
+
+class JobMonitor:
+    """
+    Follows all submitted SLURM jobs from a single background thread over one shared connection.
+    Each round runs one squeue for all jobs and reads only the new part of every job's LOG.out.
+    Jobs that left the queue get their final state and exit code from sacct, and waiting threads
+    are woken up right away.
+    """
+
+    def __init__(self, connection, interval=2.0):
+        self.connection = connection
+        self.interval = interval
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def watch(self, slurm_job_id, log_path, max_steps=None):
+        """Start following a submitted job."""
+        with self.lock:
+            job = self.jobs.get(slurm_job_id)
+            if job is None:
+                job = self.jobs[slurm_job_id] = TrackedJob(slurm_job_id, log_path, max_steps)
+        self.wakeup.set()
+        return job
+
+    def progress(self, slurm_job_id):
+        """Latest progress of a followed job, or None."""
+        with self.lock:
+            job = self.jobs.get(slurm_job_id)
+            return dict(job.progress) if job is not None else None
+
+    def wait(self, slurm_job_id, timeout=None):
+        """Block until a followed job finished. Returns its SLURM state and exit code."""
+        job = self.jobs[slurm_job_id]
+        if not job.finished.wait(timeout):
+            raise TimeoutError(f"SLURM job {slurm_job_id} did not finish")
+        with self.lock:
+            del self.jobs[slurm_job_id]
+        return job.state, job.exit_code
+
+    def _loop(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Job monitor: {e}")
+
+    def _read_log(self, job):
+        data = self.connection.read_from(job.log_path, job.log_offset)
+        if not data:
+            return
+        job.log_offset += len(data)
+        # Progress bars rewrite their line with carriage returns
+        lines = re.split(r"[\r\n]", job.partial_line + data.decode(errors="ignore"))
+        job.partial_line = lines.pop()
+        with self.lock:
+            for line in lines:
+                parse_log_line(line, job.progress)
+
+    def _queued_job_ids(self, job_ids):
+        """IDs of the given jobs squeue still lists, or None if squeue could not be asked."""
+        command = f"squeue -h -o %i -j {shlex.quote(','.join(job_ids))}"
+        exit_status, out, err = self.connection.exec(command)
+        if exit_status != 0:
+            # squeue rejects job IDs that already left the queue
+            if "Invalid job id" in err:
+                return set()
+            return None
+        return set(out.split())
+
+    def _final_state(self, slurm_job_id):
+        """SLURM state and exit code of a job from sacct, or None if it has not finished yet."""
+        command = f"sacct -n -X -P -o State,ExitCode -j {shlex.quote(slurm_job_id)}"
+        exit_status, out, err = self.connection.exec(command)
+        lines = out.strip().splitlines()
+        if exit_status != 0 or not lines:
+            # No accounting data, e.g. accounting is disabled
+            return "UNKNOWN", None
+        state, _, exit_code = lines[0].partition("|")
+        state = state.split()[0] if state else "UNKNOWN"
+        if state in ACTIVE_STATES:
+            return None
+        return state, int(exit_code.split(":")[0]) if exit_code else None
+
+    def poll(self):
+        """One monitoring round over all followed jobs."""
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if not job.finished.is_set()]
+        if not jobs:
+            return
+        queued = self._queued_job_ids([job.slurm_job_id for job in jobs])
+        for job in jobs:
+            self._read_log(job)
+            if queued is None or job.slurm_job_id in queued:
+                if queued is not None and job.progress["stage"] == "queued" and job.log_offset:
+                    job.progress["stage"] = "starting"
+                continue
+            final_state = self._final_state(job.slurm_job_id)
+            if final_state is None:
+                continue
+            # Read what was written between the last round and the end of the job
+            self._read_log(job)
+            if job.partial_line:
+                with self.lock:
+                    parse_log_line(job.partial_line, job.progress)
+                job.partial_line = ""
+            job.state, job.exit_code = final_state
+            with self.lock:
+                job.progress["slurm_state"] = job.state
+            job.finished.set()
@@ -4,13 +4,16 @@ import sys
 import getpass
 import shutil
 import time
+import uuid
+import shlex
 from flask import Flask, request, send_file, abort
-import paramiko
 import argparse
-from threading import Thread, Lock
 import re
 import posixpath
 import CallViewer
+import ClusterMonitor
+import JobQueue
+import Transfer
 import time
 
 app = Flask(__name__)
@@ -28,11 +31,14 @@ os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 parser = argparse.ArgumentParser(description="Flask upload server with cluster integration")
 parser.add_argument("--cluster-path", default=CLUSTER_PATH, help="Destination path on the cluster for uploaded video")
 parser.add_argument("--url-name", default=URL_NAME, help="Name of your reserved zrok URL")
+parser.add_argument("--max-jobs", type=int, default=2, help="Maximum number of SLURM jobs submitted at the same time")
+parser.add_argument("--db-path", default="jobs.sqlite3", help="SQLite file holding the job queue")
+parser.add_argument("--transfer-streams", type=int, default=Transfer.STREAMS, help="Parallel SFTP sessions per upload or download")
+parser.add_argument("--monitor-interval", type=float, default=2.0, help="Seconds between job monitoring rounds")
 args = parser.parse_args()
 
 cluster_path = args.cluster_path
-vid_path = posixpath.join(cluster_path,"splat_workspace/input_data/Source_Video.mp4")
-out_path = posixpath.join(cluster_path,"splat_workspace/result_data")
+jobs_path = posixpath.join(cluster_path,"splat_workspace/jobs")
 job_path = posixpath.join(cluster_path,"splat_workspace/gpu_job.sbatch")
 
 # SSH login
@@ -40,11 +46,15 @@ REMOTE_HOST = "login.ai.lrz.de"
 username = input("Enter your cluster username: ")
 password = getpass.getpass("Enter your cluster password: ")
 
-# Job control variables
-job_running = False
-job_lock = Lock()
+# One SSH connection for all jobs, and one monitor following all submitted SLURM jobs over it
+connection = ClusterMonitor.SSHConnection(REMOTE_HOST, username, password)
+monitor = ClusterMonitor.JobMonitor(connection, interval=args.monitor_interval)
+
+# Job queue with one local and one remote workspace per job
+job_queue = JobQueue.JobQueue(args.db_path, "jobs")
+# Videos uploaded in chunks by the client
+uploads = JobQueue.ChunkedUploads(UPLOAD_FOLDER)
 
-is_splat_gen = False
 viewer_process = None
 
 def print_progress(transferred, total):
@@ -65,7 +75,7 @@ def clear_directory(directory_path):
             except Exception as e:
                 print(f"Error deleting {file_path}: {e}")
 
-def start_viewer():
+def start_viewer(result_path):
     global viewer_process
 
     # Vorherigen Prozess beenden, falls er noch läuft
@@ -75,7 +85,9 @@ def start_viewer():
         print("Killed old viewer process.")
 
     # Prüfen ob es etwas zum Anzeigen gibt
-    if os.listdir(DOWNLOAD_FOLDER):
+    if os.path.exists(result_path):
+        clear_directory(DOWNLOAD_FOLDER)
+        shutil.copy2(result_path, os.path.join(DOWNLOAD_FOLDER, "splat.ply"))
         viewer_process = subprocess.Popen(
             [sys.executable, "CallViewer.py"],
             stdout=subprocess.PIPE,
@@ -85,19 +97,10 @@ def start_viewer():
     else:
         print("No Splat.ply in downloads.")
 
-def is_job_running(ssh, job_id):
-    """Check if a SLURM job with job_id is still running."""
-    stdin, stdout, stderr = ssh.exec_command(f"squeue -j {job_id}")
-    output = stdout.read().decode()
-    return job_id in output
-
-def download_file_from_cluster(ssh, remote_path, local_path):
-    """Download a file from the cluster via SFTP with progress indication."""
-    sftp = ssh.open_sftp()
-    file_size = sftp.stat(remote_path).st_size
+def download_file_from_cluster(connection, remote_path, local_path):
+    """Download a file from the cluster in parallel, checksummed chunks with progress indication."""
     print(f"Starting download of {remote_path} to {local_path}...")
-    sftp.get(remote_path, local_path, callback=print_progress)
-    sftp.close()
+    Transfer.download(connection, remote_path, local_path, streams=args.transfer_streams, callback=print_progress)
     print("\nDownload finished.")
 
 
@@ -106,76 +109,71 @@ def print_progress(transferred, total):
     print(f"Upload progress: {percent:.2f}% ({transferred}/{total} bytes)", end='\r')
 
 
-def upload_and_monitor_job(save_path, keep_pre, keep_post, keep_train_img, iterations):
-    """Handles upload, job submission, monitoring, and downloading result file."""
-
-    global job_running
-    ssh = None
+def run_cluster_job(job, slot):
+    """
+    Handles upload to the job's remote workspace, job submission, monitoring, and downloading the result file.
+    A job interrupted by a server restart after submission resumes monitoring its SLURM job.
+    Returns the local path of the downloaded splat.ply.
+    """
+    remote_job_path = posixpath.join(jobs_path, job.id)
+    remote_input_path = posixpath.join(remote_job_path, "input_data")
+    remote_result_path = posixpath.join(remote_job_path, "result_data")
+    log_path = posixpath.join(remote_job_path, "LOG.out")
+    params = job.params
+
+    slurm_job_id = job.external_id
+    if slurm_job_id is None:
+        # Create the remote job workspace
+        exit_status, output, error = connection.exec(
+            f"mkdir -p {shlex.quote(remote_input_path)} {shlex.quote(remote_result_path)}"
+        )
+        if exit_status != 0:
+            raise RuntimeError(f"Creating {remote_job_path} failed: {error}")
 
-    try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(REMOTE_HOST, username=username, password=password)
-
-        # Upload video to cluster
-        sftp = ssh.open_sftp()
-        print(f"Starting upload of {save_path} to {vid_path} ...")
-        sftp.put(save_path, vid_path, callback=print_progress)
+        # Upload video to cluster, resuming a partial upload of this job
+        vid_path = posixpath.join(remote_input_path, "Source_Video.mp4")
+        print(f"[{job.id}] Starting upload of {job.video_path} to {vid_path} ...")
+        Transfer.upload(connection, job.video_path, vid_path, streams=args.transfer_streams, callback=print_progress)
         print("\nUpload finished.")
-        sftp.close()
-        print(f"Uploaded video to cluster at {vid_path}")
 
-        # Submit SLURM job and get job ID
-        stdin, stdout, stderr = ssh.exec_command(f"sbatch {job_path} {keep_pre} {keep_post} {keep_train_img} {iterations}")
-        output = stdout.read().decode()
-        error = stderr.read().decode()
+        # Submit SLURM job with the job workspace and get job ID
+        command = " ".join(shlex.quote(str(arg)) for arg in [
+            "sbatch", "-o", log_path, job_path,
+            params["keep_pre"], params["keep_post"], params["keep_train_images"], params["iterations"],
+            remote_input_path, remote_result_path,
+        ])
+        exit_status, output, error = connection.exec(command)
 
         if error:
-            print(f"Error submitting job: {error}")
-            job_running = False
-            return
+            raise RuntimeError(f"Error submitting job: {error}")
 
-        print(f"Job submission output: {output}")
+        print(f"[{job.id}] Job submission output: {output}")
 
         # Extract job ID from sbatch output
         match = re.search(r"Submitted batch job (\d+)", output)
         if not match:
-            print("Failed to get job ID from sbatch output.")
-            job_running = False
-            return
-
-        job_id = match.group(1)
-        print(f"Monitoring job ID: {job_id}")
-
-        # Poll job status until finished
-        while True:
-            time.sleep(10)  # Wait 10 seconds between checks
-            if not is_job_running(ssh, job_id):
-                print(f"Job {job_id} finished.")
-                break
-            else:
-                print(f"Job {job_id} still running...")
-
-        # Download .ply result file from cluster
-        remote_ply_path = posixpath.join(out_path, "splat.ply")
-        local_ply_path = os.path.join(DOWNLOAD_FOLDER, "splat.ply")
+            raise RuntimeError("Failed to get job ID from sbatch output.")
 
-        try:
-            global is_splat_gen
-            download_file_from_cluster(ssh, remote_ply_path, local_ply_path)
-            print(f"Downloaded output file to {local_ply_path}")
-            is_splat_gen = True
-        except Exception as e:
-            print(f"Failed to download output file: {e} searched remote in {remote_ply_path} {local_ply_path}")
-            is_splat_gen = False
-
-    except Exception as e:
-        print(f"Exception in upload_and_monitor_job: {e}")
-    finally:
-        if ssh:
-            ssh.close()
-        with job_lock:
-            job_running = False
+        slurm_job_id = match.group(1)
+        job_queue.set_external_id(job.id, slurm_job_id)
+    print(f"[{job.id}] Monitoring SLURM job ID: {slurm_job_id}")
+
+    # Wait for the monitor to see the job finish
+    monitor.watch(slurm_job_id, log_path, max_steps=params["iterations"])
+    state, exit_code = monitor.wait(slurm_job_id)
+    print(f"[{job.id}] SLURM job {slurm_job_id} finished with state {state}, exit code {exit_code}.")
+    if state not in ("COMPLETED", "UNKNOWN"):
+        raise RuntimeError(f"SLURM job {slurm_job_id} ended with state {state}, exit code {exit_code}")
+
+    # Download .ply result file from cluster
+    remote_ply_path = posixpath.join(remote_result_path, "splat.ply")
+    local_ply_path = os.path.join(job.result_dir, "splat.ply")
+    download_file_from_cluster(connection, remote_ply_path, local_ply_path)
+    print(f"[{job.id}] Downloaded output file to {local_ply_path}")
+    return local_ply_path
+
+
+scheduler = JobQueue.Scheduler(job_queue, [f"slurm-{i}" for i in range(max(1, args.max_jobs))], run_cluster_job)
 
 
 def safe_int(value, default):
@@ -191,45 +189,47 @@ def safe_int(value, default):
 
 @app.route('/status', methods=['GET'])
 def job_status():
-    """Returns whether a job is currently running."""
-    with job_lock:
-        if job_running:
-            return {"status": "running"}, 200
-        else:
-            if is_splat_gen:
-                start_viewer()
-                return {"status": "idle_succes"}, 200
-            else:
-                return {"status": "idle_fail"}, 200
+    """
+    Returns the status of the job given by the job_id parameter.
+    Without a job ID, reports whether any job is queued or running, as before the job queue.
+    """
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = job_queue.get(job_id)
+        if job is None:
+            return {"job_id": job_id, "status": "unknown"}, 404
+        if job.state == JobQueue.DONE:
+            start_viewer(job.result_path)
+        progress = None
+        if job.state == JobQueue.RUNNING:
+            # Jobs without a SLURM job ID are still being uploaded
+            progress = monitor.progress(job.external_id) if job.external_id else {"stage": "uploading"}
+        return JobQueue.job_response(job_queue, job, progress=progress), 200
+
+    active_jobs = job_queue.count_active()
+    if active_jobs:
+        return {"status": "running", "active_jobs": active_jobs}, 200
+    job = job_queue.latest()
+    if job is not None and job.state == JobQueue.DONE:
+        start_viewer(job.result_path)
+        return {"status": "idle_succes", "job_id": job.id}, 200
+    return {"status": "idle_fail"}, 200
 
 @app.route('/upload', methods=['POST'])
 def upload_video():
-    """Upload endpoint: accepts a video and starts a cluster job if idle."""
-    
-    global job_running
-
-    with job_lock:
-        if job_running:
-            return "A job is already running. Please wait until it finishes.", 429
-        job_running = True
+    """
+    Upload endpoint: accepts a video and queues a cluster job for it.
+    Identical re-uploads with identical parameters return the existing job.
+    Videos can also be sent in chunks, each request with the form fields upload_id, offset,
+    total_size and optionally chunk_sha256. The job is queued with the last missing chunk.
+    """
 
     if 'video' not in request.files:
-        with job_lock:
-            job_running = False
         return "No video file part in the request.", 400
 
     video = request.files['video']
     if video.filename == '':
-        with job_lock:
-            job_running = False
         return "No selected file.", 400
-    
-    clear_directory(UPLOAD_FOLDER)
-    if os.listdir(DOWNLOAD_FOLDER):
-        clear_directory(DOWNLOAD_FOLDER)
-    save_path = os.path.join(UPLOAD_FOLDER, video.filename)
-    video.save(save_path)
-    print(f"Video saved to: {save_path}")
 
     # Parameter aus dem Formular auslesen (Default-Werte falls nicht gesetzt)
     iterations = request.form.get('iterations', '').strip() or '10000'
@@ -247,10 +247,58 @@ def upload_video():
     keep_train_images = max(1, min(keep_train_images, 100))
 
     print(f"Received parameters: keep_pre={keep_pre}, keep_post={keep_post}, images={keep_train_images} iterations={iterations}")
+    params = {
+        "keep_pre": keep_pre,
+        "keep_post": keep_post,
+        "keep_train_images": keep_train_images,
+        "iterations": iterations,
+    }
+
+    filename = video.filename
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        # Chunk eines Videos speichern, das in mehreren Requests hochgeladen wird
+        try:
+            upload = uploads.receive(
+                upload_id, filename, int(request.form.get('offset', '')), int(request.form.get('total_size', '')),
+                video, request.form.get('chunk_sha256')
+            )
+        except ValueError as e:
+            return str(e), 400
+        if upload is None:
+            return {"upload_id": upload_id, "received": uploads.received(upload_id)}, 200
+        save_path, filename, video_sha256 = upload
+    else:
+        # Video speichern und dabei hashen
+        save_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{os.path.basename(filename)}")
+        video_sha256 = JobQueue.save_upload(video, save_path)
+    print(f"Video saved to: {save_path}")
+
+    job, cached = job_queue.submit(save_path, filename, video_sha256, params)
+    if cached:
+        print(f"Upload matches job {job.id} ({job.state}).")
+    else:
+        print(f"Queued job {job.id}.")
+        scheduler.notify()
 
-    Thread(target=upload_and_monitor_job, args=(save_path,keep_pre,keep_post,keep_train_images,iterations)).start()
+    return JobQueue.job_response(job_queue, job, cached=cached), 200
+
+@app.route('/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Number of bytes of a chunked upload received so far, to resume it from."""
+    try:
+        return {"upload_id": upload_id, "received": uploads.received(upload_id)}, 200
+    except ValueError as e:
+        return str(e), 400
+
+@app.route('/download/<job_id>/<filename>', methods=['GET'])
+def download_job_ply(job_id, filename):
+    """Download endpoint: serves the .ply result of a finished job."""
+    job = job_queue.get(job_id)
+    if filename != "splat.ply" or job is None or job.state != JobQueue.DONE:
+        return abort(404, description="Requested file not found. It may not be generated yet.")
 
-    return "Video uploaded and job started successfully.", 200
+    return send_file(job.result_path, as_attachment=True)
 
 @app.route('/download/<filename>', methods=['GET'])
 def download_ply(filename):
@@ -271,6 +319,8 @@ def start_zrok_tunnel():
     return proc
 
 if __name__ == '__main__':
+    monitor.start()
+    scheduler.start()
     zrok_process = start_zrok_tunnel()
     try:
         app.run(host='0.0.0.0', port=8080)
@@ -0,0 +1,193 @@
+import concurrent.futures
+import hashlib
+import os
+import shlex
+import threading
+
+# Files are transferred in chunks of this size, several chunks at once on their own SFTP sessions.
+# One SFTP session is limited by its SSH channel window, so parallel sessions make better use of slow links.
+CHUNK_SIZE = 8 << 20
+STREAMS = 4
+# Rounds of sending the chunks that are missing or whose checksum does not match. A round that fails, e.g. because
+# the connection dropped, is followed by the next one, which only sends what did not arrive.
+ROUNDS = 4
+
+
+def chunk_ranges(size, chunk_size=CHUNK_SIZE):
+    """Offset and length of every chunk of a file."""
+    return [(offset, min(chunk_size, size - offset)) for offset in range(0, size, chunk_size)]
+
+
+def local_chunk_hashes(path, ranges, indices):
+    """SHA-256 of the given chunks of a local file."""
+    hashes = {}
+    with open(path, "rb") as f:
+        for i in indices:
+            offset, length = ranges[i]
+            f.seek(offset)
+            hashes[i] = hashlib.sha256(f.read(length)).hexdigest()
+    return hashes
+
+
+def remote_chunk_hashes(connection, path, chunk_size, indices):
+    """
+    SHA-256 of the given chunks of a remote file, computed on the cluster in a single command.
+    Chunks of a missing or short file hash like empty or short data.
+    """
+    if not indices:
+        return {}
+    command = (
+        f"for i in {' '.join(str(i) for i in indices)}; do "
+        f"dd if={shlex.quote(path)} bs={chunk_size} skip=$i count=1 2>/dev/null | sha256sum | cut -d' ' -f1; "
+        "done"
+    )
+    exit_status, out, err = connection.exec(command)
+    hashes = out.split()
+    if exit_status != 0 or len(hashes) != len(indices):
+        raise RuntimeError(f"Hashing {path} on the cluster failed: {err}")
+    return dict(zip(indices, hashes))
+
+
+def _transfer_chunks(connection, ranges, indices, copy_chunk, streams, callback, transferred, total):
+    """
+    Run copy_chunk(sftp, offset, length) for the given chunks, on up to `streams` SFTP sessions at once.
+    Returns the indices of the chunks for which copy_chunk returned True, i.e. that it verified itself.
+    """
+    local = threading.local()
+    sessions = []
+    lock = threading.Lock()
+    progress = [transferred]
+
+    def run(i):
+        sftp = getattr(local, "sftp", None)
+        if sftp is None:
+            sftp = local.sftp = connection.open_sftp()
+            with lock:
+                sessions.append(sftp)
+        offset, length = ranges[i]
+        verified = copy_chunk(sftp, offset, length)
+        with lock:
+            progress[0] += length
+            if callback is not None:
+                callback(progress[0], total)
+        return verified
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, streams)) as executor:
+            futures = {i: executor.submit(run, i) for i in indices}
+            return {i for i, future in futures.items() if future.result()}
+    finally:
+        for sftp in sessions:
+            sftp.close()
+
+
+def upload(connection, local_path, remote_path, streams=STREAMS, chunk_size=CHUNK_SIZE, callback=None):
+    """
+    Upload a file in chunks over several SFTP sessions at once. The chunks are written to remote_path + ".part",
+    which is renamed to remote_path once the checksums of all chunks match. An interrupted upload resumes with the
+    chunks that are still missing or broken.
+    callback(transferred, total) is called after every chunk, like the callback of paramiko's put.
+    """
+    size = os.path.getsize(local_path)
+    ranges = chunk_ranges(size, chunk_size)
+    hashes = local_chunk_hashes(local_path, ranges, range(len(ranges)))
+    part_path = remote_path + ".part"
+
+    resuming = True
+    sftp = connection.open_sftp()
+    try:
+        try:
+            sftp.stat(part_path)
+        except FileNotFoundError:
+            sftp.open(part_path, "wb").close()
+            resuming = False
+        sftp.truncate(part_path, size)
+    finally:
+        sftp.close()
+
+    def send(sftp, offset, length):
+        with open(local_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        with sftp.open(part_path, "r+b") as remote:
+            remote.set_pipelined(True)
+            remote.seek(offset)
+            remote.write(data)
+        # Verified on the cluster after the round
+        return False
+
+    def missing(indices):
+        remote_hashes = remote_chunk_hashes(connection, part_path, chunk_size, indices)
+        return [i for i in indices if remote_hashes[i] != hashes[i]]
+
+    indices = list(range(len(ranges)))
+    if resuming:
+        indices = missing(indices)
+    error = None
+    for _ in range(ROUNDS):
+        if not indices:
+            break
+        transferred = size - sum(ranges[i][1] for i in indices)
+        try:
+            _transfer_chunks(connection, ranges, indices, send, streams, callback, transferred, size)
+        except Exception as e:
+            print(f"\nUpload of {local_path} interrupted, resuming: {e}")
+            error = e
+        indices = missing(indices)
+    if indices:
+        raise RuntimeError(f"Upload of {local_path}: {len(indices)} chunk(s) missing after {ROUNDS} rounds") from error
+
+    sftp = connection.open_sftp()
+    try:
+        sftp.posix_rename(part_path, remote_path)
+    finally:
+        sftp.close()
+
+
+def download(connection, remote_path, local_path, streams=STREAMS, chunk_size=CHUNK_SIZE, callback=None):
+    """
+    Download a file in chunks over several SFTP sessions at once. Every chunk is checked against its checksum
+    computed on the cluster before it is written to local_path + ".part", which is renamed to local_path once
+    all chunks arrived. An interrupted download resumes with the chunks that are still missing.
+    callback(transferred, total) is called after every chunk, like the callback of paramiko's get.
+    """
+    sftp = connection.open_sftp()
+    try:
+        size = sftp.stat(remote_path).st_size
+    finally:
+        sftp.close()
+    ranges = chunk_ranges(size, chunk_size)
+    hashes = remote_chunk_hashes(connection, remote_path, chunk_size, list(range(len(ranges))))
+    part_path = local_path + ".part"
+    with open(part_path, "ab") as f:
+        f.truncate(size)
+
+    def fetch(sftp, offset, length):
+        with sftp.open(remote_path, "rb") as remote:
+            data = b"".join(remote.readv([(offset, length)]))
+        if hashlib.sha256(data).hexdigest() != hashes[offset // chunk_size]:
+            return False
+        with open(part_path, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+        return True
+
+    local_hashes = local_chunk_hashes(part_path, ranges, range(len(ranges)))
+    indices = [i for i in range(len(ranges)) if local_hashes[i] != hashes[i]]
+    error = None
+    for _ in range(ROUNDS):
+        if not indices:
+            break
+        transferred = size - sum(ranges[i][1] for i in indices)
+        try:
+            verified = _transfer_chunks(connection, ranges, indices, fetch, streams, callback, transferred, size)
+        except Exception as e:
+            print(f"\nDownload of {remote_path} interrupted, resuming: {e}")
+            error = e
+            # Chunks written before the interruption are complete, as they are only written once verified
+            local_hashes = local_chunk_hashes(part_path, ranges, indices)
+            verified = {i for i in indices if local_hashes[i] == hashes[i]}
+        indices = [i for i in indices if i not in verified]
+    if indices:
+        raise RuntimeError(f"Download of {remote_path}: {len(indices)} chunk(s) missing after {ROUNDS} rounds") from error
+    os.replace(part_path, local_path)
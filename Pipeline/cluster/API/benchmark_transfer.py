@@ -0,0 +1,191 @@
+"""
+Benchmark of the chunked parallel transfers in Transfer.py against single-stream sftp.put/get,
+with a local stand-in for the cluster's SFTP server.
+
+Every SFTP session of the stand-in is limited to --stream-bandwidth, like one SSH channel over
+a VPN is limited by its window size divided by the round-trip time.
+
+    python benchmark_transfer.py --size-mb 256 --stream-bandwidth-mb 16 --streams 1,4,8
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import Transfer
+
+# Request size of paramiko's put and get
+SFTP_BLOCK_SIZE = 32768
+
+
+class LocalFile:
+    """Stand-in for a paramiko SFTPFile on a local file."""
+
+    def __init__(self, session, path, mode):
+        self.session = session
+        self.file = open(path, mode)
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def seek(self, offset):
+        self.file.seek(offset)
+
+    def write(self, data):
+        self.session.throttle(len(data))
+        self.file.write(data)
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.session.throttle(len(data))
+        return data
+
+    def readv(self, chunks):
+        for offset, length in chunks:
+            self.file.seek(offset)
+            yield self.read(length)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalSFTP:
+    """Stand-in for one paramiko SFTP session on the local file system, limited to `bandwidth` bytes per second."""
+
+    def __init__(self, connection, bandwidth=None):
+        self.connection = connection
+        self.bandwidth = bandwidth
+
+    def throttle(self, nbytes):
+        self.connection.on_transfer(nbytes)
+        if self.bandwidth:
+            time.sleep(nbytes / self.bandwidth)
+
+    def open(self, path, mode="r"):
+        return LocalFile(self, path, mode)
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def truncate(self, path, size):
+        os.truncate(path, size)
+
+    def posix_rename(self, oldpath, newpath):
+        os.replace(oldpath, newpath)
+
+    def put(self, localpath, remotepath, callback=None):
+        """Single-stream upload like paramiko's put."""
+        total = os.path.getsize(localpath)
+        transferred = 0
+        with open(localpath, "rb") as src, self.open(remotepath, "wb") as dst:
+            for block in iter(lambda: src.read(SFTP_BLOCK_SIZE), b""):
+                dst.write(block)
+                transferred += len(block)
+                if callback is not None:
+                    callback(transferred, total)
+
+    def get(self, remotepath, localpath, callback=None):
+        """Single-stream download like paramiko's get."""
+        total = os.path.getsize(remotepath)
+        transferred = 0
+        with self.open(remotepath, "rb") as src, open(localpath, "wb") as dst:
+            for block in iter(lambda: src.read(SFTP_BLOCK_SIZE), b""):
+                dst.write(block)
+                transferred += len(block)
+                if callback is not None:
+                    callback(transferred, total)
+
+    def close(self):
+        pass
+
+
+class LocalConnection:
+    """
+    Stand-in for ClusterMonitor.SSHConnection: commands run in a local shell and SFTP sessions work on local files.
+    If fail_after is set, transfers raise ConnectionError once that many bytes were transferred, like a dropped VPN.
+    """
+
+    def __init__(self, bandwidth=None, fail_after=None):
+        self.bandwidth = bandwidth
+        self.fail_after = fail_after
+        self.transferred = 0
+        self.lock = threading.Lock()
+
+    def on_transfer(self, nbytes):
+        with self.lock:
+            if self.fail_after is not None and self.transferred + nbytes > self.fail_after:
+                raise ConnectionError("Connection dropped")
+            self.transferred += nbytes
+
+    def exec(self, command):
+        process = subprocess.run(["bash", "-c", command], capture_output=True, text=True)
+        return process.returncode, process.stdout, process.stderr
+
+    def open_sftp(self):
+        return LocalSFTP(self, self.bandwidth)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked parallel SFTP transfers against sftp.put/get")
+    parser.add_argument("--size-mb", type=int, default=128, help="Size of the transferred file")
+    parser.add_argument("--stream-bandwidth-mb", type=float, default=16, help="Bandwidth of one SFTP session in MB/s")
+    parser.add_argument("--streams", default="1,4,8", help="Comma separated numbers of parallel SFTP sessions")
+    parser.add_argument("--chunk-mb", type=int, default=Transfer.CHUNK_SIZE >> 20, help="Chunk size in MB")
+    args = parser.parse_args()
+
+    size = args.size_mb << 20
+    bandwidth = args.stream_bandwidth_mb * (1 << 20)
+    chunk_size = args.chunk_mb << 20
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, "Source_Video.mp4")
+        remote_path = os.path.join(tmp, "remote.mp4")
+        with open(local_path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1 << 20))
+
+        def report(name, seconds):
+            print(f"{name:<32} {seconds:7.2f} s {size / seconds / (1 << 20):8.1f} MB/s")
+
+        connection = LocalConnection(bandwidth)
+        sftp = connection.open_sftp()
+        report("sftp.put", timed(sftp.put, local_path, remote_path))
+        report("sftp.get", timed(sftp.get, remote_path, local_path + ".copy"))
+        for streams in [int(n) for n in args.streams.split(",")]:
+            os.remove(remote_path)
+            seconds = timed(Transfer.upload, connection, local_path, remote_path, streams, chunk_size)
+            report(f"upload, {streams} stream(s)", seconds)
+            os.remove(local_path + ".copy")
+            seconds = timed(Transfer.download, connection, remote_path, local_path + ".copy", streams, chunk_size)
+            report(f"download, {streams} stream(s)", seconds)
+
+        # Upload that drops halfway, then resumes with the missing chunks only
+        streams = max(int(n) for n in args.streams.split(","))
+        os.remove(remote_path)
+        dropping = LocalConnection(bandwidth, fail_after=size // 2)
+        try:
+            Transfer.upload(dropping, local_path, remote_path, streams, chunk_size)
+        except RuntimeError as e:
+            print(e)
+        resumed = LocalConnection(bandwidth)
+        seconds = timed(Transfer.upload, resumed, local_path, remote_path, streams, chunk_size)
+        report(f"resumed upload, {streams} stream(s)", seconds)
+        print(f"Resumed upload sent {resumed.transferred / size:.0%} of the file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Test the SLURM job monitor against a local stand-in for squeue, sacct and SFTP
+"""
+
+import shlex
+import threading
+
+import ClusterMonitor
+
+
+class FakeCluster:
+    """Stand-in for the SSH connection: squeue and sacct answer from a dict, logs are local files."""
+
+    def __init__(self):
+        self.queue = set()
+        self.accounting = {}
+        self.commands = []
+
+    def exec(self, command):
+        self.commands.append(command)
+        args = shlex.split(command)
+        if args[0] == "squeue":
+            listed = [job_id for job_id in args[args.index("-j") + 1].split(",") if job_id in self.queue]
+            if not listed:
+                return 1, "", "slurm_load_jobs error: Invalid job id specified\n"
+            return 0, "\n".join(listed) + "\n", ""
+        if args[0] == "sacct":
+            return 0, self.accounting.get(args[-1], ""), ""
+        return 127, "", f"unknown command {args[0]}"
+
+    def read_from(self, path, offset):
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+
+def test_monitor_reports_stages_and_completion(tmp_path):
+    cluster = FakeCluster()
+    monitor = ClusterMonitor.JobMonitor(cluster)
+    log_path = tmp_path / "LOG.out"
+    cluster.queue = {"101", "102"}
+    monitor.watch("101", str(log_path), max_steps=3000)
+    monitor.watch("102", str(tmp_path / "missing.out"))
+
+    monitor.poll()
+    assert monitor.progress("101")["stage"] == "queued"
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("\033[92mStarting pipeline: mp4_to_splat\033[0m\n\033[92m✔ COLMAP: Feature extraction completed.\033[0m\n")
+    monitor.poll()
+    progress = monitor.progress("101")
+    assert progress["stage"] == "colmap"
+    assert progress["message"] == "COLMAP: Feature extraction completed."
+
+    # A training row is only counted once its line is complete
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("\033[92m✔ Starting SplatFacto training...\033[0m\n1200 (40.00%)       25.1 ms")
+    monitor.poll()
+    progress = monitor.progress("101")
+    assert progress["stage"] == "training" and "step" not in progress
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("   1 m, 30 s\n")
+    monitor.poll()
+    progress = monitor.progress("101")
+    assert (progress["step"], progress["max_steps"], progress["percent"]) == (1200, 3000, 40.0)
+    # one squeue per round for all jobs, no sacct while the jobs are queued
+    assert [command.split()[0] for command in cluster.commands] == ["squeue"] * 4
+
+    # The job leaves the queue after writing its last lines, sacct reports how it ended
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("\033[92m✔ Export completed.\033[0m\n\n\033[94mPipeline completed.\033[0m")
+    cluster.queue = {"102"}
+    cluster.accounting["101"] = "COMPLETED|0:0\n"
+    monitor.poll()
+    assert monitor.wait("101", timeout=0) == ("COMPLETED", 0)
+    assert monitor.progress("101") is None
+
+    cluster.queue = set()
+    cluster.accounting["102"] = "FAILED|1:0\n"
+    monitor.poll()
+    assert monitor.wait("102", timeout=0) == ("FAILED", 1)
+
+
+def test_monitor_waits_for_sacct_and_wakes_waiters(tmp_path):
+    cluster = FakeCluster()
+    monitor = ClusterMonitor.JobMonitor(cluster, interval=0.01)
+    (tmp_path / "LOG.out").write_text("Pipeline failed: exit status 1\n")
+    monitor.watch("7", str(tmp_path / "LOG.out"))
+
+    # Gone from squeue, but sacct has not caught up yet
+    cluster.accounting["7"] = "RUNNING|0:0\n"
+    monitor.poll()
+    assert not monitor.jobs["7"].finished.is_set()
+
+    monitor.start()
+    result = {}
+    waiter = threading.Thread(target=lambda: result.update(state=monitor.wait("7", timeout=5)))
+    waiter.start()
+    cluster.accounting["7"] = "CANCELLED by 123|0:15\n"
+    waiter.join(timeout=5)
+    assert result["state"] == ("CANCELLED", 0)
+
+
+def test_parse_log_line_ignores_unrelated_output():
+    progress = {"stage": "training", "step": 10}
+    ClusterMonitor.parse_log_line("Step (% Done)       Train Iter (time)", progress)
+    ClusterMonitor.parse_log_line("", progress)
+    assert progress == {"stage": "training", "step": 10}
@@ -0,0 +1,65 @@
+"""
+Test the chunked transfers with the local SFTP stand-in of the benchmark
+"""
+
+import os
+
+import pytest
+
+import Transfer
+from benchmark_transfer import LocalConnection
+
+CHUNK_SIZE = 1000
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "Source_Video.mp4"
+    path.write_bytes(os.urandom(10 * CHUNK_SIZE + 123))
+    return path
+
+
+def test_upload_and_download(tmp_path, source):
+    remote_path = str(tmp_path / "remote.mp4")
+    progress = []
+    Transfer.upload(LocalConnection(), str(source), remote_path, streams=3, chunk_size=CHUNK_SIZE,
+                    callback=lambda transferred, total: progress.append((transferred, total)))
+    assert open(remote_path, "rb").read() == source.read_bytes()
+    assert not os.path.exists(remote_path + ".part")
+    assert max(progress) == (source.stat().st_size, source.stat().st_size)
+
+    local_path = str(tmp_path / "splat.ply")
+    Transfer.download(LocalConnection(), remote_path, local_path, streams=3, chunk_size=CHUNK_SIZE)
+    assert open(local_path, "rb").read() == source.read_bytes()
+    assert not os.path.exists(local_path + ".part")
+
+    empty = tmp_path / "empty.ply"
+    empty.write_bytes(b"")
+    Transfer.download(LocalConnection(), str(empty), local_path, chunk_size=CHUNK_SIZE)
+    assert open(local_path, "rb").read() == b""
+
+
+def test_upload_resumes_after_drop(tmp_path, source):
+    remote_path = str(tmp_path / "remote.mp4")
+    size = source.stat().st_size
+    with pytest.raises(RuntimeError):
+        Transfer.upload(LocalConnection(fail_after=size // 2), str(source), remote_path, chunk_size=CHUNK_SIZE)
+    assert not os.path.exists(remote_path)
+
+    resumed = LocalConnection()
+    Transfer.upload(resumed, str(source), remote_path, chunk_size=CHUNK_SIZE)
+    assert open(remote_path, "rb").read() == source.read_bytes()
+    assert resumed.transferred <= size - size // 2 + CHUNK_SIZE
+
+
+def test_download_refetches_broken_chunks(tmp_path, source):
+    local_path = tmp_path / "splat.ply"
+    part = bytearray(source.read_bytes())
+    part[3 * CHUNK_SIZE + 5] ^= 0xFF
+    (tmp_path / "splat.ply.part").write_bytes(bytes(part[: 8 * CHUNK_SIZE]))
+
+    connection = LocalConnection()
+    Transfer.download(connection, str(source), str(local_path), chunk_size=CHUNK_SIZE)
+    assert local_path.read_bytes() == source.read_bytes()
+    # the broken chunk, the two missing chunks and the short last one
+    assert connection.transferred == 3 * CHUNK_SIZE + 123
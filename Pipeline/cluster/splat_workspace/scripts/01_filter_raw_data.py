@@ -2,7 +2,10 @@ import os
 import argparse
 import shutil
 import subprocess
-from ImageSelector import ImageSelector
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from ImageSelector import ImageSelector, SharpnessCache
 
 def extract_frames(input_vid, output_path):
     if not args.yes:
@@ -19,11 +22,106 @@ def extract_frames(input_vid, output_path):
         '-v', 'quiet',
         '-stats',
         '-q:v', '1',  # Use highest quality for JPEG
-        os.path.join(output_path, 'frame%05d.jpg')
+        os.path.join(output_path, 'frame%06d.jpg')
     ]
     subprocess.run(cmd)
 
+def frame_name(frame_idx):
+    # Same numbering as the ffmpeg extraction (frame%06d.jpg, starting at 1)
+    return f"frame{frame_idx + 1:06d}.jpg"
+
+def stream_sharpness(input_vid, reduce=1):
+    """Decode the video once and score every frame on the decoded buffer, without writing anything to disk."""
+    cap = cv2.VideoCapture(input_vid)
+    if not cap.isOpened():
+        print(f"Error: Could not open video '{input_vid}'.")
+        return []
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    scores = []
+    with tqdm(total=total_frames if total_frames > 0 else None, unit="frame") as progress_bar:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if reduce > 1:
+                gray = cv2.resize(gray, None, fx=1 / reduce, fy=1 / reduce, interpolation=cv2.INTER_AREA)
+            scores.append(ImageSelector.variance_of_laplacian(gray))
+            progress_bar.update(1)
+    cap.release()
+    return scores
+
+def write_selected_frames(input_vid, output_path, selected_indices, writers=4):
+    """Decode the video again and encode only the selected frames. Skipped frames are grabbed but never converted."""
+    os.makedirs(output_path, exist_ok=True)
+    remaining = set(selected_indices)
+    cap = cv2.VideoCapture(input_vid)
+    pending = []
+    frame_idx = 0
+    with ThreadPoolExecutor(max_workers=writers) as pool, tqdm(total=len(remaining), unit="frame") as progress_bar:
+        while remaining and cap.grab():
+            if frame_idx in remaining:
+                ret, frame = cap.retrieve()
+                if ret:
+                    path = os.path.join(output_path, frame_name(frame_idx))
+                    pending.append(pool.submit(cv2.imwrite, path, frame, [cv2.IMWRITE_JPEG_QUALITY, 100]))
+                    # Bound the number of decoded frames waiting for the encoder
+                    if len(pending) >= 2 * writers:
+                        pending.pop(0).result()
+                        progress_bar.update(1)
+                remaining.discard(frame_idx)
+            frame_idx += 1
+        for future in pending:
+            future.result()
+            progress_bar.update(1)
+    cap.release()
+
+def stream_main(input_path, output_path, target_count, groups=None, scalar=None):
+    print(f"Decoding '{input_path}' and scoring frames in memory (--stream).")
+    scores = stream_sharpness(input_path, args.reduce)
+    images = [os.path.join(output_path, frame_name(i)) for i in range(len(scores))]
+
+    total_images = len(images)
+    print(f"Found a total of {total_images} frames to work on.")
+    if total_images == 0:
+        print("Error: No frames could be decoded from the video.")
+        print("Aborting.")
+        return
+
+    if target_count is None:
+        target_count = int(total_images * (args.target_percentage / 100))
+
+    selector = ImageSelector(images, reduce=args.reduce, scores=scores)
+    selected_images = selector.filter_sharpest_images(target_count, groups, scalar)
+
+    if args.pretend:
+        print(f"Would have written {len(selected_images)} sharpest frames. (--pretend)")
+        return
+
+    if not args.yes:
+        answer = input(f"About to write the {len(selected_images)} sharpest frames to '{output_path}'. Continue? [y/N]: ").lower()
+        if answer not in ["y", "yes"]:
+            print("Aborting.")
+            return
+
+    index_of = {img: i for i, img in enumerate(images)}
+    write_selected_frames(input_path, output_path, [index_of[img] for img in selected_images])
+
+    if args.cache_path:
+        # Later filter passes over the written frames reuse the scores measured on the decoded buffers
+        cache = SharpnessCache(args.cache_path)
+        for img in selected_images:
+            if os.path.exists(img):
+                cache.put(img, args.reduce, scores[index_of[img]])
+        cache.save()
+
+    print(f"Retained {len(selected_images)} sharpest frames.")
+
 def main(input_path, output_path, img_exts, target_count, groups=None, scalar=None):
+    if args.stream and not os.path.isdir(input_path):
+        stream_main(input_path, output_path, target_count, groups, scalar)
+        return
+
     # Check if input_path is a folder or video
     if os.path.isdir(input_path):
         images = [os.path.join(input_path, img) for img in os.listdir(input_path) if img.lower().endswith(img_exts)]
@@ -44,7 +142,7 @@ def main(input_path, output_path, img_exts, target_count, groups=None, scalar=No
     if target_count is None:
         target_count = int(total_images * (args.target_percentage / 100))
 
-    selector = ImageSelector(images)
+    selector = ImageSelector(images, workers=args.workers, reduce=args.reduce, cache_path=args.cache_path)
     selected_images = selector.filter_sharpest_images(target_count, groups, scalar)
 
     if args.pretend:
@@ -90,6 +188,10 @@ if __name__ == '__main__':
     group_division.add_argument('--scalar', type=int, help="Specify the scalar value to determine group division if groups is not provided.")
     parser.add_argument('--pretend', action='store_true', help="Pretend mode. Do not delete anything, just show what would have been deleted. Warning: Will still create and populate the output dir if input_path is a video!")
     parser.add_argument('--yes', '-y', action='store_true', help="Automatically answer 'yes' to all prompts and execute actions.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of processes used to score sharpness. Default is the number of CPU cores, 1 scores serially.")
+    parser.add_argument('--reduce', type=int, choices=[1, 2, 4, 8], default=1, help="Decode images at 1/N resolution for sharpness scoring (JPEG DCT scaling). Default is 1 (full resolution).")
+    parser.add_argument('--cache_path', help="JSON file to persist sharpness scores in, keyed by file path, mtime and size. Later runs over the same files skip scoring.")
+    parser.add_argument('--stream', action='store_true', help="For video input, decode frames in memory and score them there instead of extracting every frame with ffmpeg. Only the selected frames are encoded and written.")
 
     args = parser.parse_args()
 
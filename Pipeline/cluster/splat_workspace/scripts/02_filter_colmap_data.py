@@ -23,7 +23,7 @@ def main(transforms_path, target_count, output_file, groups=None, scalar=None, p
         total_images = len(images)
         target_count = int(total_images * (args.target_percentage / 100))
 
-    selector = ImageSelector(images)
+    selector = ImageSelector(images, workers=args.workers, cache_path=args.cache_path)
     selected_images = selector.filter_sharpest_images(target_count, groups, scalar)
 
     new_frames = [frame for frame in transforms_data["frames"] if os.path.join(main_directory, frame["file_path"]) in selected_images]
@@ -57,6 +57,8 @@ if __name__ == '__main__':
 
     parser.add_argument('--pretend', action='store_true', help="Pretend mode. Do not write or delete anything, just show what would have been done.")
     parser.add_argument('--yes', '-y', action='store_true', help="Automatically answer 'yes' to all prompts and execute actions.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of processes used to score sharpness. Default is the number of CPU cores, 1 scores serially.")
+    parser.add_argument('--cache_path', help="JSON file to persist sharpness scores in, keyed by file path, mtime and size.")
 
     args = parser.parse_args()
 
@@ -0,0 +1,83 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import cv2
+import torch
+from tqdm import tqdm
+from raft_extractor import MotionEstimator, load_raft, select_frames, select_frames_pipelined
+
+# ---------------------------------------------------------------------------------------------------------------------------
+# Benchmark raft_extractor motion gating modes on synthetic frames with a known camera pan
+# ---------------------------------------------------------------------------------------------------------------------------
+def create_synthetic_frames(count, width, height, shift):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(height, width + count * shift, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (0, 0), 1.5)
+    return [np.ascontiguousarray(base[:, i * shift:i * shift + width]) for i in range(count)]
+
+
+def time_mode(name, frames, out_dir, target_device, motion_threshold, batch_size=1, pipelined=False, **kwargs):
+    estimator = MotionEstimator(target_device=target_device, **kwargs)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    progress_bar = tqdm(total=len(frames), disable=True)
+    start = time.perf_counter()
+    select = select_frames_pipelined if pipelined else select_frames
+    kept = select(enumerate(frames), out_dir, estimator, motion_threshold, 0.0, 256.0, batch_size, progress_bar)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<45} {elapsed:8.2f} s  {len(frames) / elapsed:8.2f} frames/s  {kept:4d} kept")
+    return elapsed, sorted(os.listdir(out_dir))
+
+
+def main(args):
+    target_device = torch.device(args.device)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    for model_name in ("large", "small"):
+        load_raft(model_name, target_device, pretrained=not args.random_weights)
+
+    frames = create_synthetic_frames(args.count, args.width, args.height, args.shift)
+    work_dir = tempfile.mkdtemp(prefix="raft_bench_")
+    out_dir = os.path.join(work_dir, "out")
+    print(f"{args.count} frames {args.width}x{args.height}, pan {args.shift} px/frame, device {target_device}, {torch.get_num_threads()} threads\n")
+
+    modes = [
+        ("raft_large, 960x520, batch 1", dict(model="large")),
+        ("raft_small, 960x520, batch 1", dict(model="small")),
+        ("raft_small, 480x264, batch 1", dict(model="small", flow_scale=0.5)),
+        (f"raft_small, 480x264, batch {args.batch_size}", dict(model="small", flow_scale=0.5, batch_size=args.batch_size)),
+        (f"raft_small, 480x264, batch {args.batch_size}, phase pre-gate", dict(model="small", flow_scale=0.5, batch_size=args.batch_size, pregate="phase")),
+        (f"raft_small, 480x264, batch {args.batch_size}, pipelined", dict(model="small", flow_scale=0.5, batch_size=args.batch_size, pipelined=True)),
+    ]
+    results = []
+    for name, kwargs in modes:
+        if args.skip_large and kwargs["model"] == "large":
+            continue
+        elapsed, kept = time_mode(name, frames, out_dir, target_device, args.motion_threshold, **kwargs)
+        results.append((name, elapsed, kept))
+
+    baseline_name, baseline, baseline_kept = results[0]
+    print(f"\nSpeedup over {baseline_name}:")
+    for name, elapsed, kept in results[1:]:
+        same = "same frames" if kept == baseline_kept else f"{len(set(kept) ^ set(baseline_kept))} frames differ"
+        print(f"  {name:<43} {baseline / elapsed:6.1f}x  ({same})")
+
+    shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark RAFT motion gating of raft_extractor on synthetic frames.")
+    parser.add_argument('--count', type=int, default=24, help="Number of synthetic frames.")
+    parser.add_argument('--width', type=int, default=1280, help="Frame width.")
+    parser.add_argument('--height', type=int, default=720, help="Frame height.")
+    parser.add_argument('--shift', type=int, default=6, help="Horizontal pan between consecutive frames in pixels.")
+    parser.add_argument('--motion_threshold', type=float, default=10.0, help="Motion threshold passed to the frame selection.")
+    parser.add_argument('--batch_size', type=int, default=4, help="Candidates per RAFT forward pass for the batched modes.")
+    parser.add_argument('--device', default="cpu", help="Torch device to benchmark on.")
+    parser.add_argument('--threads', type=int, default=None, help="Torch CPU threads. Default is the torch default.")
+    parser.add_argument('--skip_large', action='store_true', help="Skip raft_large and use the first raft_small mode as baseline.")
+    parser.add_argument('--random_weights', action='store_true', help="Use untrained models, e.g. without internet access. Timings are unaffected, kept frames are not meaningful.")
+    main(parser.parse_args())
@@ -0,0 +1,370 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+# Job states stored in the queue
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Status strings the SplatScan app polls for
+APP_STATUS = {QUEUED: "running", RUNNING: "running", DONE: "idle_succes", FAILED: "idle_fail"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    content_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    workspace TEXT NOT NULL,
+    video_path TEXT NOT NULL,
+    slot TEXT,
+    external_id TEXT,
+    result_path TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_content_key ON jobs (content_key);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created);
+"""
+
+
+@dataclass
+class Job:
+    """One row of the job queue."""
+    id: str
+    content_key: str
+    params: dict
+    state: str
+    workspace: str
+    video_path: str
+    slot: Optional[str]
+    external_id: Optional[str]
+    result_path: Optional[str]
+    error: Optional[str]
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
+    @property
+    def input_dir(self):
+        return os.path.join(self.workspace, "input_data")
+
+    @property
+    def result_dir(self):
+        return os.path.join(self.workspace, "result_data")
+
+
+def save_upload(file_storage, dest_path, chunk_size=1 << 20):
+    """Stream an uploaded file to dest_path and return the SHA-256 of its content."""
+    digest = hashlib.sha256()
+    with open(dest_path, "wb") as f:
+        while True:
+            chunk = file_storage.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+# Upload IDs chosen by the client name files in the upload folder
+UPLOAD_ID = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+
+
+class ChunkedUploads:
+    """
+    Uploads that arrive as chunks in separate requests, so that a dropped connection only loses the
+    chunk in flight. Each chunk names its offset, the total size and optionally its SHA-256. The
+    received byte ranges are kept next to the partial file, so uploads also resume after a restart.
+    """
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        self.lock = threading.Lock()
+        # Running SHA-256 of uploads whose chunks arrived in order: upload_id -> (hashed bytes, digest)
+        self.digests = {}
+
+    def _paths(self, upload_id):
+        if not UPLOAD_ID.match(upload_id):
+            raise ValueError(f"Invalid upload ID {upload_id!r}")
+        base = os.path.join(self.upload_folder, upload_id)
+        return base + ".part", base + ".json"
+
+    @staticmethod
+    def _load(state_path):
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _contiguous(ranges):
+        """Number of bytes received without gaps from the start."""
+        received = 0
+        for start, end in ranges:
+            if start > received:
+                break
+            received = max(received, end)
+        return received
+
+    def received(self, upload_id):
+        """Number of bytes of an upload received without gaps from the start, to resume it from."""
+        _, state_path = self._paths(upload_id)
+        with self.lock:
+            state = self._load(state_path)
+        return self._contiguous(state["ranges"]) if state else 0
+
+    def receive(self, upload_id, filename, offset, total_size, file_storage, chunk_sha256=None):
+        """
+        Write one chunk of an upload. Once every byte arrived, returns the path of the complete file,
+        its original filename and its SHA-256, else None.
+        Raises ValueError for chunks outside the file, with another total size or a wrong checksum.
+        """
+        part_path, state_path = self._paths(upload_id)
+        data = file_storage.stream.read()
+        if offset < 0 or offset + len(data) > total_size:
+            raise ValueError(f"Chunk at {offset} with {len(data)} bytes is outside of {total_size} bytes")
+        if chunk_sha256 and hashlib.sha256(data).hexdigest() != chunk_sha256.lower():
+            raise ValueError(f"Checksum mismatch for chunk at {offset}")
+
+        with self.lock:
+            state = self._load(state_path)
+            if state is None:
+                state = {"filename": os.path.basename(filename), "total_size": total_size, "ranges": []}
+                with open(part_path, "wb") as f:
+                    f.truncate(total_size)
+            elif state["total_size"] != total_size:
+                raise ValueError(f"Upload {upload_id} has {state['total_size']} bytes, not {total_size}")
+
+            with open(part_path, "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+            hashed, digest = self.digests.get(upload_id, (0, hashlib.sha256()))
+            if offset == hashed:
+                digest.update(data)
+                self.digests[upload_id] = (hashed + len(data), digest)
+
+            # Merge the chunk into the sorted received ranges
+            ranges = []
+            for start, end in sorted(state["ranges"] + [[offset, offset + len(data)]]):
+                if ranges and start <= ranges[-1][1]:
+                    ranges[-1][1] = max(ranges[-1][1], end)
+                else:
+                    ranges.append([start, end])
+            state["ranges"] = ranges
+            if self._contiguous(ranges) < total_size:
+                with open(state_path + ".tmp", "w") as f:
+                    json.dump(state, f)
+                os.replace(state_path + ".tmp", state_path)
+                return None
+
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            hashed, digest = self.digests.pop(upload_id, (0, None))
+        if hashed != total_size:
+            # Chunks arrived out of order or before a restart, hash the complete file
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        return part_path, state["filename"], digest.hexdigest()
+
+
+def content_key(video_sha256, params):
+    """Key of a job: identical videos processed with identical parameters give identical splats."""
+    return hashlib.sha256(f"{video_sha256}:{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+
+
+class JobQueue:
+    """
+    Persistent job queue in a SQLite file. Every job gets its own workspace directory
+    <workspace_root>/<job_id> with input_data/ and result_data/ subdirectories.
+    """
+
+    def __init__(self, db_path, workspace_root):
+        self.db_path = db_path
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.lock = threading.Lock()
+        os.makedirs(self.workspace_root, exist_ok=True)
+        with self.lock, self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connection that commits on success and is closed afterwards."""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        values = dict(row)
+        values["params"] = json.loads(values["params"])
+        return Job(**values)
+
+    def submit(self, upload_path, filename, video_sha256, params) -> Tuple[Job, bool]:
+        """
+        Queue a job for an uploaded video, moving the upload into the job workspace.
+        If the same video was already submitted with the same parameters and that job is
+        queued, running or has its result on disk, the upload is dropped and that job is
+        returned instead. Returns the job and whether it is such an existing job.
+        """
+        key = content_key(video_sha256, params)
+        with self.lock, self._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE content_key = ? AND state != ? ORDER BY created DESC", (key, FAILED)
+            ).fetchall()
+            for job in map(self._to_job, rows):
+                if job.state != DONE or (job.result_path and os.path.exists(job.result_path)):
+                    os.remove(upload_path)
+                    return job, True
+
+            job_id = uuid.uuid4().hex[:12]
+            workspace = os.path.join(self.workspace_root, job_id)
+            os.makedirs(os.path.join(workspace, "input_data"))
+            os.makedirs(os.path.join(workspace, "result_data"))
+            video_path = os.path.join(workspace, "input_data", os.path.basename(filename))
+            shutil.move(upload_path, video_path)
+            db.execute(
+                "INSERT INTO jobs (id, content_key, params, state, workspace, video_path, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, json.dumps(params), QUEUED, workspace, video_path, time.time()),
+            )
+            return self._to_job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()), False
+
+    def get(self, job_id) -> Optional[Job]:
+        with self.lock, self._connect() as db:
+            return self._to_job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest(self) -> Optional[Job]:
+        """The most recently submitted job."""
+        with self.lock, self._connect() as db:
+            return self._to_job(db.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT 1").fetchone())
+
+    def count_active(self):
+        """Number of queued and running jobs."""
+        with self.lock, self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)).fetchone()[0]
+
+    def position(self, job):
+        """Number of queued jobs ahead of a queued job."""
+        with self.lock, self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ? AND created < ?", (QUEUED, job.created)
+            ).fetchone()[0]
+
+    def claim_next(self, slot) -> Optional[Job]:
+        """Mark the oldest queued job as running on the given slot and return it."""
+        with self.lock, self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created LIMIT 1", (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET state = ?, slot = ?, started = ? WHERE id = ?", (RUNNING, slot, time.time(), row["id"])
+            )
+            return self._to_job(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def set_external_id(self, job_id, external_id):
+        """Remember the ID a job has outside of this queue, e.g. its SLURM job ID."""
+        with self.lock, self._connect() as db:
+            db.execute("UPDATE jobs SET external_id = ? WHERE id = ?", (external_id, job_id))
+
+    def finish(self, job_id, result_path=None, error=None):
+        """Mark a job as done with its result file, or as failed if there is no result."""
+        state = DONE if result_path is not None and error is None else FAILED
+        with self.lock, self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, result_path = ?, error = ?, finished = ? WHERE id = ?",
+                (state, result_path, error, time.time(), job_id),
+            )
+
+    def requeue_interrupted(self):
+        """Put jobs that were running when the server stopped back into the queue. Returns their number."""
+        with self.lock, self._connect() as db:
+            return db.execute("UPDATE jobs SET state = ?, slot = NULL WHERE state = ?", (QUEUED, RUNNING)).rowcount
+
+
+class Scheduler:
+    """
+    Runs queued jobs in background threads, at most one job per slot at a time.
+    A slot is e.g. a GPU ID locally or a SLURM submission on the cluster.
+    run_job(job, slot) returns the path of the job's splat.ply and raises if the job failed.
+    """
+
+    def __init__(self, queue: JobQueue, slots: List[str], run_job: Callable[[Job, str], str]):
+        self.queue = queue
+        self.free_slots = list(slots)
+        self.run_job = run_job
+        self.wakeup = threading.Condition()
+
+    def start(self):
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s).")
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def notify(self):
+        """Wake the scheduler after a job was queued."""
+        with self.wakeup:
+            self.wakeup.notify()
+
+    def _loop(self):
+        while True:
+            with self.wakeup:
+                job = None
+                if self.free_slots:
+                    job = self.queue.claim_next(self.free_slots[0])
+                if job is None:
+                    self.wakeup.wait(timeout=5)
+                    continue
+                slot = self.free_slots.pop(0)
+            print(f"Starting job {job.id} on slot {slot}.")
+            threading.Thread(target=self._run, args=(job, slot), daemon=True).start()
+
+    def _run(self, job, slot):
+        try:
+            result_path = self.run_job(job, slot)
+            if not os.path.exists(result_path):
+                raise FileNotFoundError(f"No result at {result_path}")
+            self.queue.finish(job.id, result_path=result_path)
+            print(f"Job {job.id} finished.")
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            self.queue.finish(job.id, error=str(e))
+        finally:
+            with self.wakeup:
+                self.free_slots.append(slot)
+                self.wakeup.notify()
+
+
+def job_response(queue: JobQueue, job: Job, cached=False, progress=None):
+    """JSON response describing a job, with the status string the SplatScan app expects."""
+    response = {"job_id": job.id, "status": APP_STATUS[job.state], "state": job.state}
+    if job.state == QUEUED:
+        response["position"] = queue.position(job)
+    if progress:
+        response["progress"] = progress
+    if cached:
+        response["cached"] = True
+    if job.error:
+        response["error"] = job.error
+    return response
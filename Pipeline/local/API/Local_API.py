@@ -2,10 +2,11 @@ import os
 import subprocess
 import shutil
 import time
+import uuid
 from flask import Flask, request, send_file, abort
-from threading import Thread, Lock
 import argparse
 import CallViewer
+import JobQueue
 from multiprocessing import Process
 import time
 import sys
@@ -27,13 +28,26 @@ parser.add_argument(
     default='splatscan777scapp777',
     help="Name of your reserved zrok URL"
 )
+parser.add_argument(
+    "--gpus",
+    default="all",
+    help="Comma separated GPU IDs to run jobs on, one job per GPU at a time ('all' runs one job on all GPUs)"
+)
+parser.add_argument(
+    "--db-path",
+    default="jobs.sqlite3",
+    help="SQLite file holding the job queue"
+)
 args = parser.parse_args()
 
-# Job control variables to prevent concurrent execution
-job_running = False
-job_lock = Lock()
+# Job queue with one workspace per job, and the GPUs jobs are dispatched to
+GPU_SLOTS = [gpu.strip() for gpu in args.gpus.split(",") if gpu.strip()]
+# Each concurrent job publishes the nerfstudio viewer on its own port
+VIEWER_PORTS = {gpu: 7007 + i for i, gpu in enumerate(GPU_SLOTS)}
+job_queue = JobQueue.JobQueue(args.db_path, "../splat_workspace/jobs")
+# Videos uploaded in chunks by the client
+uploads = JobQueue.ChunkedUploads(UPLOAD_FOLDER)
 
-is_splat_gen = False
 viewer_process = None
 
 
@@ -53,7 +67,7 @@ def clear_directory(directory_path):
             except Exception as e:
                 print(f"Error deleting {file_path}: {e}")
 
-def start_viewer():
+def start_viewer(result_path):
     global viewer_process
 
     # Vorherigen Prozess beenden, falls er noch läuft
@@ -63,7 +77,9 @@ def start_viewer():
         print("Killed old viewer process.")
 
     # Prüfen ob es etwas zum Anzeigen gibt
-    if os.listdir(DOWNLOAD_FOLDER):
+    if os.path.exists(result_path):
+        clear_directory(DOWNLOAD_FOLDER)
+        shutil.copy2(result_path, os.path.join(DOWNLOAD_FOLDER, "splat.ply"))
         viewer_process = subprocess.Popen(
             [sys.executable, "CallViewer.py"],
             stdout=subprocess.PIPE,
@@ -74,134 +90,91 @@ def start_viewer():
         print("No Splat.ply in downloads.")
 
 
-
-
-def upload_and_monitor_job_dummy(save_path, keep_pre, keep_post, keep_train_img, iterations):
+def run_local_job(job, gpu):
     """
-    Simulate a job that processes uploaded data.
-    Copies the first uploaded file to a workspace input directory,
-    then runs a bash script with given parameters, streaming output.
+    Runs local_job.sh for a job on the given GPU, with the job workspace
+    mounted as input and result data, streaming output.
+    Returns the path of the resulting splat.ply.
     """
-    
-
-    global job_running
-    with job_lock:
-        job_running = True
-
-    # Copy first file from upload directory to the workspace input directory
-    entries = sorted(os.listdir(UPLOAD_FOLDER))
-    for entry in entries:
-        source_path = os.path.join(UPLOAD_FOLDER, entry)
-        if os.path.isfile(source_path):
-            dest_path = "../splat_workspace/input_data"
-            os.makedirs(dest_path, exist_ok=True)
-            shutil.copy2(source_path, dest_path)
-            print(f"File '{entry}' copied to {dest_path}.")
-            break
-    else:
-        print("No files found in upload directory.")
-
-    print(f"[Dummy] Starting local_job.sh with parameters: {keep_pre} {keep_post} {keep_train_img} {iterations}")
+    params = job.params
+    print(f"[{job.id}] Starting local_job.sh on GPU {gpu} with parameters: {params}")
 
     cmd = [
         "bash",
         "../splat_workspace/local_job.sh",
-        str(keep_pre),
-        str(keep_post),
-        str(keep_train_img),
-        str(iterations)
+        str(params["keep_pre"]),
+        str(params["keep_post"]),
+        str(params["keep_train_images"]),
+        str(params["iterations"]),
+        job.input_dir,
+        job.result_dir,
+        gpu,
+        str(VIEWER_PORTS[gpu])
     ]
 
-    try:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="ignore"
-        )
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="ignore"
+    )
+
+    # Stream live output
+    for output in process.stdout:
+        print(f"[{job.id}] {output.rstrip()}")
+    process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"local_job.sh exited with error code {process.returncode}")
+    return os.path.join(job.result_dir, "splat.ply")
+
+
+scheduler = JobQueue.Scheduler(job_queue, GPU_SLOTS, run_local_job)
+
 
-        # Stream live stdout
-        while True:
-            output = process.stdout.readline()
-            if output == "" and process.poll() is not None:
-                break
-            if output:
-                print(f"[stdout] {output.strip()}")
-
-        # Read remaining stderr output
-        stderr_output = process.stderr.read()
-        if stderr_output:
-            print(f"[stderr] {stderr_output.strip()}")
-
-        if process.returncode != 0:
-            print(f"[Dummy] local_job.sh exited with error code {process.returncode}")
-
-    except Exception as e:
-        print(f"[Dummy] Exception while running local_job.sh: {e}")
-
-    # Job finished, reset the job_running flag
-    with job_lock:
-        global is_splat_gen
-        try: 
-            shutil.copy2("../splat_workspace/result_data/splat.ply", DOWNLOAD_FOLDER)
-            is_splat_gen = True
-            job_running = False
-        except:
-            is_splat_gen = False
-            job_running = False
-            
-        
-    
 @app.route('/status', methods=['GET'])
 def job_status():
-    """Returns whether a job is currently running."""
-    with job_lock:
-        if job_running:
-            return {"status": "running"}, 200
-        else:
-            if is_splat_gen:
-                start_viewer()
-                return {"status": "idle_succes"}, 200
-            else:
-                return {"status": "idle_fail"}, 200
+    """
+    Returns the status of the job given by the job_id parameter.
+    Without a job ID, reports whether any job is queued or running, as before the job queue.
+    """
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = job_queue.get(job_id)
+        if job is None:
+            return {"job_id": job_id, "status": "unknown"}, 404
+        if job.state == JobQueue.DONE:
+            start_viewer(job.result_path)
+        return JobQueue.job_response(job_queue, job), 200
+
+    active_jobs = job_queue.count_active()
+    if active_jobs:
+        return {"status": "running", "active_jobs": active_jobs}, 200
+    job = job_queue.latest()
+    if job is not None and job.state == JobQueue.DONE:
+        start_viewer(job.result_path)
+        return {"status": "idle_succes", "job_id": job.id}, 200
+    return {"status": "idle_fail"}, 200
 
 @app.route('/upload', methods=['POST'])
 def upload_video():
     """
-    Endpoint to upload a video file and start a job to process it.
-    Rejects new jobs if one is already running.
+    Endpoint to upload a video file and queue a job to process it.
+    Identical re-uploads with identical parameters return the existing job.
+    Videos can also be sent in chunks, each request with the form fields upload_id, offset,
+    total_size and optionally chunk_sha256. The job is queued with the last missing chunk.
     """
 
-    global job_running
-
-    with job_lock:
-        if job_running:
-            return "A job is already running. Please wait.", 429
-        job_running = True
-
     # Validate file presence
     if 'video' not in request.files:
-        with job_lock:
-            job_running = False
         return "No video file found in request.", 400
 
     video = request.files['video']
     if video.filename == '':
-        with job_lock:
-            job_running = False
         return "No file selected.", 400
 
-    clear_directory(UPLOAD_FOLDER)
-    clear_directory("../splat_workspace/input_data")
-    if os.listdir(DOWNLOAD_FOLDER):
-        clear_directory(DOWNLOAD_FOLDER)
-    # Save the uploaded file
-    save_path = os.path.join(UPLOAD_FOLDER, video.filename)
-    video.save(save_path)
-    print(f"Video saved: {save_path}")
-
     # Parse form parameters with defaults and bounds
     iterations = request.form.get('iterations', '').strip() or '10000'
     iterations = int(iterations)
@@ -220,14 +193,53 @@ def upload_video():
 
     print(f"Received parameters: keep_pre={keep_pre}, keep_post={keep_post}, "
           f"keep_train_images={keep_train_images}, iterations={iterations}")
+    params = {
+        "keep_pre": keep_pre,
+        "keep_post": keep_post,
+        "keep_train_images": keep_train_images,
+        "iterations": iterations,
+    }
+
+    filename = video.filename
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        # Save one chunk of a video uploaded in several requests
+        try:
+            upload = uploads.receive(
+                upload_id, filename, int(request.form.get('offset', '')), int(request.form.get('total_size', '')),
+                video, request.form.get('chunk_sha256')
+            )
+        except ValueError as e:
+            return str(e), 400
+        if upload is None:
+            return {"upload_id": upload_id, "received": uploads.received(upload_id)}, 200
+        save_path, filename, video_sha256 = upload
+    else:
+        # Save the uploaded file, hashing it on the way
+        save_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{os.path.basename(filename)}")
+        video_sha256 = JobQueue.save_upload(video, save_path)
+    print(f"Video saved: {save_path}")
+
+    job, cached = job_queue.submit(save_path, filename, video_sha256, params)
+    if cached:
+        print(f"Upload matches job {job.id} ({job.state}).")
+    else:
+        print(f"Queued job {job.id}.")
+        scheduler.notify()
 
-    # Run the job asynchronously to avoid blocking the request
-    Thread(
-        target=upload_and_monitor_job_dummy,
-        args=(save_path, keep_pre, keep_post, keep_train_images, iterations)
-    ).start()
+    return JobQueue.job_response(job_queue, job, cached=cached), 200
 
-    return "Video uploaded and job started.", 200
+
+@app.route('/upload/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """
+    Returns the number of bytes of a chunked upload received so far,
+    so that the client can resume it from there.
+    """
+    try:
+        return {"upload_id": upload_id, "received": uploads.received(upload_id)}, 200
+    except ValueError as e:
+        return str(e), 400
 
 
 def start_zrok_tunnel():
@@ -241,6 +253,8 @@ def start_zrok_tunnel():
 
 
 if __name__ == '__main__':
+    # Start dispatching queued jobs, including jobs interrupted by a restart
+    scheduler.start()
     # Start the zrok tunnel first
     zrok_process = start_zrok_tunnel()
     try:
@@ -9,11 +9,28 @@ TRAIN_ITERS=${4:-10000}
 USER_PATH= Path to your project save path
 #------------CHANE TO YOUR PATH---------------
 
-docker run --rm -it --gpus all \
-  -v $USER_PATH/Pipeline/local/splat_workspace/input_data:/mnt/input_data \
-  -v $USER_PATH/Pipeline/local/splat_workspace/result_data:/mnt/result_data \
+# === Job-Workspace, GPU und Viewer-Port (vom Job-Scheduler gesetzt) ===
+INPUT_DIR=${5:-$USER_PATH/Pipeline/local/splat_workspace/input_data}
+RESULT_DIR=${6:-$USER_PATH/Pipeline/local/splat_workspace/result_data}
+GPU=${7:-all}
+VIEWER_PORT=${8:-7007}
+
+# Ergebnisse der Pipeline-Stufen, von allen Jobs geteilt
+STAGE_CACHE=$USER_PATH/Pipeline/local/splat_workspace/stage_cache
+mkdir -p "$STAGE_CACHE"
+
+if [ "$GPU" = "all" ]; then
+  GPU_FLAG="all"
+else
+  GPU_FLAG="device=$GPU"
+fi
+
+docker run --rm -it --gpus "$GPU_FLAG" \
+  -v "$INPUT_DIR":/mnt/input_data \
+  -v "$RESULT_DIR":/mnt/result_data \
   -v $USER_PATH/Pipeline/local/splat_workspace/scripts:/mnt/pipeline_scripts \
-  -p 7007:7007  \
+  -v "$STAGE_CACHE":/mnt/stage_cache \
+  -p $VIEWER_PORT:7007  \
   kiwil23/splat_tools_slim \
      python3 /mnt/pipeline_scripts/pipeline.py \
     --pipeline_type="mp4_to_splat" \
@@ -21,6 +38,7 @@ docker run --rm -it --gpus all \
     --post_filter_img="$POST_FILTER" \
     --train_img_percentage="$TRAIN_IMG_PERCENTAGE" \
     --train_iters="$TRAIN_ITERS" \
+    --cache_dir=/mnt/stage_cache \
     && echo "pipeline.py done"
 
 
@@ -1,16 +1,110 @@
+import os
+import json
 import cv2
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from tqdm import tqdm
 from graphlib import draw_graph
 
+# Decode flags that let libjpeg downscale during DCT decoding instead of decoding at full resolution
+REDUCED_GRAYSCALE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def _init_worker():
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def compute_sharpness(img, reduce=1):
+    """Variance of the Laplacian of one image, optionally decoded at 1/reduce resolution."""
+    if reduce == 1:
+        image = cv2.cvtColor(cv2.imread(img), cv2.COLOR_BGR2GRAY)
+    else:
+        image = cv2.imread(img, REDUCED_GRAYSCALE_FLAGS[reduce])
+    return ImageSelector.variance_of_laplacian(image)
+
+
+class SharpnessCache:
+    """Persistent sharpness scores keyed by file path, mtime, size and decode mode."""
+
+    def __init__(self, path):
+        self.path = path
+        self.scores = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.scores = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable sharpness cache {path}: {e}")
+
+    @staticmethod
+    def key(img, reduce):
+        stat = os.stat(img)
+        return f"{os.path.abspath(img)}|{stat.st_mtime_ns}|{stat.st_size}|{reduce}"
+
+    def get(self, img, reduce):
+        return self.scores.get(self.key(img, reduce))
+
+    def put(self, img, reduce, score):
+        self.scores[self.key(img, reduce)] = score
+
+    def save(self):
+        # Drop entries of files that were deleted in the meantime (e.g. frames removed by a previous filter pass)
+        self.scores = {k: v for k, v in self.scores.items() if os.path.exists(k.rsplit("|", 3)[0])}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.scores, f)
+        os.replace(tmp_path, self.path)
+
 
 class ImageSelector:
-    def __init__(self, images):
+    def __init__(self, images, workers=None, reduce=1, cache_path=None, scores=None):
         self.images = images
-        self.image_fm = self._compute_sharpness_values()
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.reduce = reduce
+        self.cache_path = cache_path
+        if scores is not None:
+            # Sharpness was already measured elsewhere, e.g. on decoded video frames
+            self.image_fm = list(zip(scores, images))
+        else:
+            self.image_fm = self._compute_sharpness_values()
 
     def _compute_sharpness_values(self):
         print("Calculating image sharpness...")
-        return [(self.variance_of_laplacian(cv2.cvtColor(cv2.imread(img), cv2.COLOR_BGR2GRAY)), img) for img in tqdm(self.images)]
+        cache = SharpnessCache(self.cache_path) if self.cache_path else None
+
+        scores = {}
+        missing = []
+        for img in self.images:
+            score = cache.get(img, self.reduce) if cache else None
+            if score is None:
+                missing.append(img)
+            else:
+                scores[img] = score
+        if cache:
+            print(f"Loaded {len(scores)} of {len(self.images)} sharpness values from cache.")
+
+        if missing:
+            score_fn = partial(compute_sharpness, reduce=self.reduce)
+            if self.workers > 1 and len(missing) > 1:
+                chunksize = max(1, len(missing) // (self.workers * 8))
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                    results = list(tqdm(pool.map(score_fn, missing, chunksize=chunksize), total=len(missing)))
+            else:
+                results = [score_fn(img) for img in tqdm(missing)]
+            for img, score in zip(missing, results):
+                scores[img] = score
+                if cache:
+                    cache.put(img, self.reduce, score)
+
+        if cache:
+            cache.save()
+        return [(scores[img], img) for img in self.images]
 
     @staticmethod
     def variance_of_laplacian(image):
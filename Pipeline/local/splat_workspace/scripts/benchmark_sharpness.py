@@ -0,0 +1,77 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import cv2
+from ImageSelector import ImageSelector
+
+# ---------------------------------------------------------------------------------------------------------------------------
+# Benchmark ImageSelector sharpness scoring modes on a synthetic folder of frames
+# ---------------------------------------------------------------------------------------------------------------------------
+def create_synthetic_frames(out_dir, count, width, height):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (0, 0), 3)
+    for i in range(count):
+        # Shift and blur the base image by varying amounts so frames differ in content and sharpness
+        frame = np.roll(base, i % width, axis=1)
+        sigma = 0.5 + (i % 7)
+        frame = cv2.GaussianBlur(frame, (0, 0), sigma)
+        cv2.imwrite(os.path.join(out_dir, f"frame{i + 1:06d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+
+def time_mode(name, images, **kwargs):
+    start = time.perf_counter()
+    ImageSelector(images, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {elapsed:8.2f} s  {len(images) / elapsed:8.1f} frames/s")
+    return elapsed
+
+
+def main(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="sharpness_bench_")
+    frames_dir = os.path.join(work_dir, "frames")
+    os.makedirs(frames_dir, exist_ok=True)
+
+    images = sorted(os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith(".jpg"))
+    if len(images) != args.count:
+        print(f"Writing {args.count} synthetic {args.width}x{args.height} frames to {frames_dir} ...")
+        shutil.rmtree(frames_dir)
+        os.makedirs(frames_dir)
+        create_synthetic_frames(frames_dir, args.count, args.width, args.height)
+        images = sorted(os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith(".jpg"))
+
+    workers = args.workers or os.cpu_count() or 1
+    cache_path = os.path.join(work_dir, "sharpness_cache.json")
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    results = []
+    results.append(("serial, full resolution", time_mode("serial, full resolution", images, workers=1)))
+    results.append((f"{workers} workers, full resolution", time_mode(f"{workers} workers, full resolution", images, workers=workers)))
+    for reduce in (2, 4):
+        name = f"{workers} workers, 1/{reduce} resolution"
+        results.append((name, time_mode(name, images, workers=workers, reduce=reduce)))
+    time_mode(f"{workers} workers, cache cold", images, workers=workers, cache_path=cache_path)
+    results.append(("cache warm (second pass)", time_mode("cache warm (second pass)", images, workers=workers, cache_path=cache_path)))
+
+    baseline = results[0][1]
+    print("\nSpeedup over serial full resolution:")
+    for name, elapsed in results[1:]:
+        print(f"  {name:<38} {baseline / elapsed:6.1f}x")
+
+    if not args.keep and not args.work_dir:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark sharpness scoring of ImageSelector on a synthetic frame folder.")
+    parser.add_argument('--count', type=int, default=3000, help="Number of synthetic frames.")
+    parser.add_argument('--width', type=int, default=1920, help="Frame width.")
+    parser.add_argument('--height', type=int, default=1080, help="Frame height.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for the parallel modes. Default is the number of CPU cores.")
+    parser.add_argument('--work_dir', help="Directory for the synthetic frames. Reused between runs if the frame count matches.")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary frame folder.")
+    main(parser.parse_args())
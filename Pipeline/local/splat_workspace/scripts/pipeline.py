@@ -1,9 +1,13 @@
 import os
 import subprocess
 import shutil
+import sys
 import argparse
 import json
+import time
 from pathlib import Path
+from nerfstudio.process_data.colmap_utils import count_matched_image_pairs, get_matcher_args
+from stage_runner import Stage, StageRunner
 
 # ---------------------------------------------------------------------------------------------------------------------------
 # Prepare ArgumentParser to determine the pipeline type and filter options from command-line arguments
@@ -14,6 +18,12 @@ parser.add_argument("--pre_filter_img", type=float, nargs='?', const=True, defau
 parser.add_argument("--post_filter_img", type=float, nargs='?', const=True, default=False)
 parser.add_argument("--train_img_percentage", type=float, nargs='?', const=True, default=False)
 parser.add_argument("--train_iters", default="10000")
+# Outputs of every stage are cached here by the content of their inputs; mount a persistent directory to share it between jobs
+parser.add_argument("--cache_dir", default="/pipeline_workspace/stage_cache")
+parser.add_argument("--no_cache", action="store_true")
+# COLMAP feature matching; auto matches small image sets exhaustively, video frames sequentially and other images with a vocab tree
+parser.add_argument("--matcher", default="auto", choices=["auto", "exhaustive", "sequential", "vocab_tree"])
+parser.add_argument("--exhaustive_max_images", type=int, default=100)
 
 args = parser.parse_args()
 
@@ -58,7 +68,21 @@ train_data_dir = os.path.join(pipeline_workspace_dir, "train_data")
 extracted_images_dir = os.path.join(train_data_dir, "extracted_images")
 colmap_data_dir = os.path.join(train_data_dir, "colmap")
 db_path = os.path.join(colmap_data_dir, "database.db")
+# Sharpness scores are cached here so consecutive filter passes over the same frames do not decode them again
+sharpness_cache_path = os.path.join(pipeline_workspace_dir, "sharpness_cache.json")
+# Processed images and transforms.json of ns-process-data are cached here, keyed by image and COLMAP model content.
+# Lives next to the stage cache, so it persists between jobs when --cache_dir is a mounted directory
+process_data_cache_dir = os.path.join(args.cache_dir, "process_data")
+# Decoded and undistorted training images, memory-mapped by ns-train on later runs over the same data.
+# Also next to the stage cache, so later jobs find it
+decoded_image_cache_dir = os.path.join(args.cache_dir, "decoded_images")
 sparse_dir = os.path.join(colmap_data_dir, "sparse")
+# Output of ns-process-data, the training data of SplatFacto
+processed_data_dir = os.path.join(train_data_dir, "processed")
+nerfstudio_output_dir = os.path.join(result_data_dir, "nerfstudio_output_data")
+splat_path = os.path.join(result_data_dir, "splat.ply")
+# Status, wall time and peak memory of every stage
+report_path = os.path.join(result_data_dir, "pipeline_report.json")
 
 os.makedirs(train_data_dir, exist_ok=True)
 os.makedirs(extracted_images_dir, exist_ok=True)
@@ -73,6 +97,7 @@ def echo(msg):
 # ---------------------------------------------------------------------------------------------------------------------------
 def extract_useful_images(in_dir, out_dir):
     temp_input_dir = ""
+    os.makedirs(out_dir, exist_ok=True)
     
     # Pre-cleanup of blurry images and reduces count of images (
     if args.pre_filter_img != 100:       
@@ -89,7 +114,9 @@ def extract_useful_images(in_dir, out_dir):
             "--output_path", out_dir,
             "--target_percentage", "95",
             "--groups", "1",
-            "--yes"
+            "--yes",
+            "--cache_path", sharpness_cache_path,
+            "--stream"  # Video input: score decoded frames in memory, only write the retained ones
         ], check=True)
         print(f"\033[92mFiltered to {len(os.listdir(out_dir))} images.\033[0m")
 
@@ -100,7 +127,8 @@ def extract_useful_images(in_dir, out_dir):
             "--output_path", out_dir,
             "--target_count", str(int(len(os.listdir(out_dir)) * pre_filter_img)),
             "--scalar", "3",
-            "--yes"
+            "--yes",
+            "--cache_path", sharpness_cache_path
         ], check=True)
         print(f"\033[92mFiltered to {len(os.listdir(out_dir))} images.\033[0m")
         temp_input_dir = "/temp_input"
@@ -117,7 +145,8 @@ def extract_useful_images(in_dir, out_dir):
         "--out", out_dir,
         "--motion_threshold", "50",
         "--sharpness_threshold", "10",
-        "--exposure_threshold", "240"
+        "--exposure_threshold", "240",
+        "--batch_size", "4"
     ], check=True)    
     if args.pre_filter_img != 100:  
         shutil.rmtree(temp_input_dir)          
@@ -131,14 +160,28 @@ def extract_useful_images(in_dir, out_dir):
             "--input_path", out_dir,
             "--target_count", str(int(len(os.listdir(out_dir)) * post_filter_img)),
             "--scalar", "1",
-            "--yes"
+            "--yes",
+            "--cache_path", sharpness_cache_path
         ], check=True)
         print(f"\033[92mFiltered to {len(os.listdir(out_dir))} images.\033[0m")
 
 # ---------------------------------------------------------------------------------------------------------------------------
 # Run COLMAP to reconstruct sparse 3D structure from images
 # ---------------------------------------------------------------------------------------------------------------------------
-def run_colmap_pipeline(in_dir, database):
+def choose_matcher(num_images, ordered):
+    if args.matcher != "auto":
+        return args.matcher
+    # Exhaustive matching compares all N² image pairs: cheap and most robust for small image sets
+    if num_images <= args.exhaustive_max_images:
+        return "exhaustive"
+    # Video frames are ordered in time, so neighbouring frames overlap; loop detection finds revisited places
+    return "sequential" if ordered else "vocab_tree"
+
+def run_colmap_pipeline(in_dir, database, ordered):
+    os.makedirs(sparse_dir, exist_ok=True)
+    num_images = len([f for f in os.listdir(in_dir) if os.path.isfile(os.path.join(in_dir, f))])
+    matcher = choose_matcher(num_images, ordered)
+
     # Step 1: Create database
     subprocess.run(["colmap", "database_creator", "--database_path", database], check=True)
     echo("COLMAP: Database created.")
@@ -160,8 +203,9 @@ def run_colmap_pipeline(in_dir, database):
     echo("COLMAP: Feature extraction completed.")
 
     # Step 3: Feature matching
+    start = time.perf_counter()
     subprocess.run([
-        "colmap", "exhaustive_matcher",
+        "colmap", *get_matcher_args(matcher, loop_detection=True),
         "--database_path", database,
         "--SiftMatching.use_gpu", "1",
         "--SiftMatching.gpu_index", "0",
@@ -169,7 +213,10 @@ def run_colmap_pipeline(in_dir, database):
         "--SiftMatching.cross_check", "1",
         "--SiftMatching.guided_matching", "1"
     ], check=True)
-    echo("COLMAP: Feature matching completed.")
+    matching_time = time.perf_counter() - start
+    matched_pairs, verified_pairs = count_matched_image_pairs(Path(database))
+    echo(f"COLMAP: Feature matching completed with the {matcher} matcher on {num_images} images in {matching_time:.1f} s: "
+         f"{matched_pairs} matched pairs, {verified_pairs} verified.")
 
     # Step 4: Mapping
     subprocess.run([
@@ -222,13 +269,15 @@ def prepare_colmap_data_for_splatfacto(in_dir, out_dir, colmap_dir):
         "--skip-colmap",
         "--colmap-model-path", os.path.join(colmap_dir, biggest_folder_name),
         "--data", in_dir,
-        "--output_dir", out_dir
+        "--output_dir", out_dir,
+        "--cache-dir", process_data_cache_dir,
+        "--image-engine", "opencv"
     ], check=True)
 
     # Choose a smaller image amount for training but can fail on small datasets
     if args.train_img_percentage != 100:
         echo("Filtering images for training...")
-        transforms_path = os.path.join(train_data_dir, "transforms.json")
+        transforms_path = os.path.join(out_dir, "transforms.json")
         
         with open(transforms_path, "r") as f:
             data = json.load(f)
@@ -240,12 +289,13 @@ def prepare_colmap_data_for_splatfacto(in_dir, out_dir, colmap_dir):
             "python", os.path.join(pipeline_scripts_dir, "02_filter_colmap_data.py"),
             "--transforms_path", transforms_path,
             "--target_count", str(int(len(frames) * train_img_percentage)),
-            "--yes"
+            "--yes",
+            "--cache_path", sharpness_cache_path
         ], check=True)
 
         # Replace transforms.json with the filtered one
         original = transforms_path
-        filtered = os.path.join(train_data_dir, "transforms_filtered.json")
+        filtered = os.path.join(out_dir, "transforms_filtered.json")
 
         if os.path.exists(original):
             os.remove(original)
@@ -271,8 +321,10 @@ def run_splatfacto(in_dir):
         "--pipeline.model.cull_scale_thresh", "0.05",
         "--pipeline.model.reset_alpha_every", "60",
         "--pipeline.model.use_scale_regularization", "True",
+        "--pipeline.datamanager.decoded-image-cache-dir", decoded_image_cache_dir,
         "--viewer.quit-on-train-completion", "True",
         "--output-dir", result_data_dir,
+        "--experiment-name", os.path.basename(nerfstudio_output_dir),
         "nerfstudio-data",
         "--data", in_dir,
         "--downscale-factor", "1"
@@ -283,7 +335,7 @@ def run_splatfacto(in_dir):
 # Export Gaussian Splat as .ply
 # ---------------------------------------------------------------------------------------------------------------------------
 def export_ply():
-    config_parent_dir = os.path.join(result_data_dir, "unnamed/splatfacto")
+    config_parent_dir = os.path.join(nerfstudio_output_dir, "splatfacto")
     folders = [f for f in os.listdir(config_parent_dir) if os.path.isdir(os.path.join(config_parent_dir, f))]
 
     if folders:
@@ -298,78 +350,95 @@ def export_ply():
     subprocess.run([
         "ns-export", "gaussian-splat",
         "--load-config", config_file_path,
-        "--output-dir", result_data_dir
+        "--output-dir", result_data_dir,
+        "--checkpoint-only", "True"  # Read the Gaussians from the checkpoint without rebuilding the pipeline
     ], check=True)
     echo("Export completed.")
 
-    os.rename(os.path.join(result_data_dir, "unnamed"), os.path.join(result_data_dir, "nerfstudio_output_data"))
+# ---------------------------------------------------------------------------------------------------------------------------
+# Declare the stages, each with its inputs, outputs and parameters
+# ---------------------------------------------------------------------------------------------------------------------------
+def script_paths(*names):
+    return [os.path.join(pipeline_scripts_dir, name) for name in names]
+
+def build_stages(first, last):
+    # Where the first stage finds its data depends on the input of the pipeline
+    if first == "extract":
+        images_dir, colmap_model_dir, transforms_dir = extracted_images_dir, sparse_dir, processed_data_dir
+    elif first == "colmap":
+        images_dir, colmap_model_dir, transforms_dir = input_data_dir, sparse_dir, processed_data_dir
+    elif first == "prepare":
+        images_dir, colmap_model_dir, transforms_dir = os.path.join(input_data_dir, "images"), os.path.join(input_data_dir, "sparse"), processed_data_dir
+    else:
+        images_dir, colmap_model_dir, transforms_dir = None, None, input_data_dir
+
+    stages = {
+        "extract": Stage(
+            "extract", extract_useful_images, (input_data_dir, extracted_images_dir),
+            inputs=[input_data_dir] + script_paths("01_filter_raw_data.py", "raft_extractor.py", "ImageSelector.py"),
+            outputs=[extracted_images_dir],
+            params={"pre_filter_img": args.pre_filter_img, "post_filter_img": args.post_filter_img}
+        ),
+        "colmap": Stage(
+            "colmap", run_colmap_pipeline, (images_dir, db_path, first == "extract"),
+            inputs=[images_dir],
+            outputs=[colmap_data_dir],
+            params={"matcher": args.matcher, "exhaustive_max_images": args.exhaustive_max_images}
+        ),
+        "prepare": Stage(
+            "prepare", prepare_colmap_data_for_splatfacto, (images_dir, processed_data_dir, colmap_model_dir),
+            inputs=[images_dir, colmap_model_dir] + script_paths("02_filter_colmap_data.py", "ImageSelector.py"),
+            outputs=[processed_data_dir],
+            params={"train_img_percentage": args.train_img_percentage}
+        ),
+        "train": Stage(
+            "train", run_splatfacto, (transforms_dir,),
+            inputs=[transforms_dir],
+            outputs=[nerfstudio_output_dir],
+            params={"train_iters": train_iters}
+        ),
+        "export": Stage(
+            "export", export_ply, (),
+            inputs=[nerfstudio_output_dir],
+            outputs=[splat_path]
+        ),
+    }
+    names = list(stages)
+    return [stages[name] for name in names[names.index(first):names.index(last) + 1]]
+
+# First and last stage of every pipeline type
+PIPELINE_STAGES = {
+    "preprocces_images": ("extract", "extract"),
+    "mp4_to_images": ("extract", "extract"),
+    "mp4_to_colmap": ("extract", "colmap"),
+    "mp4_to_transforms": ("extract", "prepare"),
+    "mp4_to_splat": ("extract", "export"),
+    "images_to_colmap": ("colmap", "colmap"),
+    "images_to_transforms": ("colmap", "prepare"),
+    "images_to_splat": ("colmap", "export"),
+    "colmap_to_transforms": ("prepare", "prepare"),
+    "colmap_to_splat": ("prepare", "export"),
+    "transforms_to_splat": ("train", "export"),
+}
 
 # ---------------------------------------------------------------------------------------------------------------------------
-# Execute pipeline based on desired input and result
+# Execute pipeline based on desired input and result, skipping stages whose inputs and parameters did not change
 # ---------------------------------------------------------------------------------------------------------------------------
 print(f"\033[92mStarting pipeline: {pipeline_type} with pre_filter_img set to: {pre_filter_img * 100} and post_filter_img set to: {post_filter_img * 100} and train_img_percentage set to: {train_img_percentage * 100} and Iterations: {train_iters}\033[0m")
 
+first_stage, last_stage = PIPELINE_STAGES[pipeline_type]
+runner = StageRunner(args.cache_dir, report_path, use_cache=not args.no_cache)
 try:
-    if pipeline_type == "preprocces_images":
-        extract_useful_images(input_data_dir, extracted_images_dir)
-        write_result_data()
-
-    elif pipeline_type == "mp4_to_images":
-        extract_useful_images(input_data_dir, extracted_images_dir)
-        write_result_data()
-
-    elif pipeline_type == "mp4_to_colmap":
-        extract_useful_images(input_data_dir, extracted_images_dir)
-        run_colmap_pipeline(extracted_images_dir, db_path)
-        write_result_data()
-
-    elif pipeline_type == "mp4_to_transforms":
-        extract_useful_images(input_data_dir, extracted_images_dir)
-        run_colmap_pipeline(extracted_images_dir, db_path)
-        prepare_colmap_data_for_splatfacto(extracted_images_dir, train_data_dir, sparse_dir)
-        write_result_data()
-
-    elif pipeline_type == "mp4_to_splat":
-        extract_useful_images(input_data_dir, extracted_images_dir)
-        run_colmap_pipeline(extracted_images_dir, db_path)
-        prepare_colmap_data_for_splatfacto(extracted_images_dir, train_data_dir, sparse_dir)
-        write_result_data()
-        run_splatfacto(train_data_dir)
-        export_ply()
-
-    elif pipeline_type == "images_to_colmap":
-        run_colmap_pipeline(input_data_dir, db_path)
-        write_result_data()
-
-    elif pipeline_type == "images_to_transforms":
-        run_colmap_pipeline(input_data_dir, db_path)
-        prepare_colmap_data_for_splatfacto(input_data_dir, train_data_dir, sparse_dir)
-        write_result_data()
-
-    elif pipeline_type == "images_to_splat":
-        run_colmap_pipeline(input_data_dir, db_path)
-        prepare_colmap_data_for_splatfacto(input_data_dir, train_data_dir, sparse_dir)
-        write_result_data()
-        run_splatfacto(train_data_dir)
-        export_ply()
-
-    elif pipeline_type == "colmap_to_transforms":
-        prepare_colmap_data_for_splatfacto(os.path.join(input_data_dir, "images"), train_data_dir, os.path.join(input_data_dir, "sparse"))
-        write_result_data()
-
-    elif pipeline_type == "colmap_to_splat":
-        prepare_colmap_data_for_splatfacto(os.path.join(input_data_dir, "images"), train_data_dir, os.path.join(input_data_dir, "sparse"))
-        write_result_data()
-        run_splatfacto(train_data_dir)
-        export_ply()
-
-    elif pipeline_type == "transforms_to_splat":
-        run_splatfacto(input_data_dir)
-        export_ply()
-
-except subprocess.CalledProcessError as e:
+    runner.run(build_stages(first_stage, last_stage))
+except Exception as e:
     print(f"\n\033[91mPipeline failed: {e}\033[0m")
-    write_result_data()
+    # Non-zero exit status, so the job is recorded as failed
+    sys.exit(1)
+finally:
+    # Copy train data to the host for debugging
+    if first_stage != "train":
+        write_result_data()
+    echo(f"Stage report written to {report_path}")
 
 # ---------------------------------------------------------------------------------------------------------------------------
 # Done
@@ -2,18 +2,35 @@ import argparse
 import cv2
 import numpy as np
 import os
+import queue
+import threading
+import time
 import torch
-from torchvision.models.optical_flow import raft_large, Raft_Large_Weights
+from torchvision.models.optical_flow import raft_large, raft_small, Raft_Large_Weights, Raft_Small_Weights
 import torchvision.transforms.functional as TF
 from tqdm import tqdm  # Fortschrittsbalken
 
 # Prüfe Gerät (ROCm-kompatibel)
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# RAFT laden
-weights = Raft_Large_Weights.DEFAULT
-raft_model = raft_large(weights=weights).to(device)
-raft_model.eval()
+# Auflösung, auf der die Bewegungsschwelle definiert ist
+FLOW_SIZE = (960, 520)
+
+_raft_models = {}
+
+# RAFT laden (einmal pro Modell und Gerät). pretrained=False nur für Laufzeitmessungen ohne Gewichts-Download
+def load_raft(model_name="large", target_device=None, pretrained=True):
+    target_device = target_device or device
+    key = (model_name, str(target_device))
+    if key not in _raft_models:
+        if model_name == "large":
+            model = raft_large(weights=Raft_Large_Weights.DEFAULT if pretrained else None)
+        elif model_name == "small":
+            model = raft_small(weights=Raft_Small_Weights.DEFAULT if pretrained else None)
+        else:
+            raise ValueError(f"Unbekanntes RAFT-Modell: {model_name}")
+        _raft_models[key] = model.to(target_device).eval()
+    return _raft_models[key]
 
 # Funktion zum Prüfen auf Unschärfe
 def is_blurry(image, threshold=100.0):
@@ -27,27 +44,343 @@ def is_overexposed(image, threshold=240.0):
     mean_brightness = np.mean(gray)
     return mean_brightness > threshold, mean_brightness
 
-# Bild-Vorverarbeitung für RAFT
-def preprocess_raft(frame1, frame2):
-    frame1 = cv2.resize(frame1, (960, 520))
-    frame2 = cv2.resize(frame2, (960, 520))
-    frame1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2RGB)
-    frame2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2RGB)
-    tensor1 = TF.to_tensor(frame1).unsqueeze(0).to(device)
-    tensor2 = TF.to_tensor(frame2).unsqueeze(0).to(device)
-    return tensor1, tensor2
-
-# Berechne Bewegungsintensität via RAFT
-def calculate_optical_flow(prev_frame, next_frame):
-    img1, img2 = preprocess_raft(prev_frame, next_frame)
-    with torch.no_grad():
-        list_of_flows = raft_model(img1, img2)
-    flow = list_of_flows[-1]
-    magnitude = torch.norm(flow, dim=1)
-    return magnitude.mean().item()
+class MotionEstimator:
+    """
+    Misst die Bewegung zwischen dem zuletzt gespeicherten Frame (Referenz) und Kandidaten-Frames.
+
+    Der Referenz-Tensor wird nur einmal vorverarbeitet und bleibt gecacht. Mehrere Kandidaten werden in einem
+    einzigen RAFT-Forward-Pass gegen die Referenz ausgewertet. Optional schätzt eine Phasenkorrelation auf
+    kleinen Graustufenbildern die Verschiebung vorab und überspringt RAFT, wenn die Bewegung eindeutig unter
+    oder über der Schwelle liegt. Alle Bewegungswerte sind in Pixeln bei FLOW_SIZE angegeben.
+    """
+
+    GATE_WIDTH = 240
+
+    def __init__(self, model="large", flow_scale=1.0, pregate="none", pregate_low=0.25, pregate_high=4.0, target_device=None):
+        self.device = target_device or device
+        self.model = load_raft(model, self.device)
+        # RAFT braucht durch 8 teilbare Bildgrößen
+        width = max(64, int(round(FLOW_SIZE[0] * flow_scale / 8)) * 8)
+        height = max(64, int(round(FLOW_SIZE[1] * flow_scale / 8)) * 8)
+        self.flow_size = (width, height)
+        self.magnitude_scale = FLOW_SIZE[0] / width
+        self.pregate = pregate
+        self.pregate_low = pregate_low
+        self.pregate_high = pregate_high
+        self.gate_size = (self.GATE_WIDTH, int(round(self.GATE_WIDTH * FLOW_SIZE[1] / FLOW_SIZE[0])))
+        self.gate_window = cv2.createHanningWindow(self.gate_size, cv2.CV_32F)
+        self.reference = None
+        self.reference_gray = None
+
+    def _preprocess(self, frame):
+        frame = cv2.resize(frame, self.flow_size)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return TF.to_tensor(frame)
+
+    def _gate_gray(self, frame):
+        gray = cv2.cvtColor(cv2.resize(frame, self.gate_size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return gray.astype(np.float32)
+
+    def set_reference(self, frame):
+        self.reference = self._preprocess(frame).unsqueeze(0).to(self.device)
+        if self.pregate == "phase":
+            self.reference_gray = self._gate_gray(frame)
+
+    def estimate_shift(self, frame):
+        """Globale Verschiebung per Phasenkorrelation, in Pixeln bei FLOW_SIZE."""
+        (dx, dy), _ = cv2.phaseCorrelate(self.reference_gray, self._gate_gray(frame), self.gate_window)
+        return float(np.hypot(dx, dy)) * FLOW_SIZE[0] / self.gate_size[0]
+
+    def flow_magnitudes(self, frames):
+        """Mittlere RAFT-Flow-Magnitude jedes Frames gegenüber der Referenz, in einem Batch berechnet."""
+        batch = torch.stack([self._preprocess(frame) for frame in frames]).to(self.device)
+        with torch.no_grad():
+            list_of_flows = self.model(self.reference.expand(len(frames), -1, -1, -1), batch)
+        flow = list_of_flows[-1]
+        magnitude = torch.norm(flow, dim=1).mean(dim=(1, 2)) * self.magnitude_scale
+        return magnitude.tolist()
+
+    def first_moving(self, frames, motion_threshold):
+        """
+        Sucht den ersten Frame, dessen Bewegung gegenüber der Referenz die Schwelle überschreitet.
+        Gibt (Index oder None, Bewegungswerte der ausgewerteten Frames) zurück.
+        """
+        motions = [None] * len(frames)
+        decided_keep = None
+        needs_raft = []
+        for j, frame in enumerate(frames):
+            if self.pregate == "phase":
+                shift = self.estimate_shift(frame)
+                if shift < self.pregate_low * motion_threshold:
+                    motions[j] = shift
+                    continue
+                if shift > self.pregate_high * motion_threshold:
+                    motions[j] = shift
+                    decided_keep = j
+                    break
+            needs_raft.append(j)
+
+        if needs_raft:
+            for j, motion in zip(needs_raft, self.flow_magnitudes([frames[j] for j in needs_raft])):
+                motions[j] = motion
+
+        for j, motion in enumerate(motions):
+            if j == decided_keep or (motion is not None and motion > motion_threshold):
+                return j, motions[: j + 1]
+        return None, motions
+
+# Qualitätsprüfung eines Frames: Schärfe und Belichtung
+def check_quality(idx, frame, sharpness_threshold, exposure_threshold, debug=False):
+    if frame is None:
+        if debug:
+            print(f"[{idx}] ⚠️ Bild konnte nicht geladen werden")
+        return False
+
+    b_is_blurry, variance = is_blurry(frame, threshold=sharpness_threshold)
+    if b_is_blurry:
+        if debug:
+            print(f"[{idx}] ❌ Unscharf: {variance:.2f}")
+        return False
+
+    b_is_overexposed, mean_brightness = is_overexposed(frame, threshold=exposure_threshold)
+    if b_is_overexposed:
+        if debug:
+            print(f"[{idx}] ❌ Überbelichtet: {mean_brightness:.2f}")
+        return False
+
+    return True
+
+# COLMAP matcht Videoframes sequenziell in Namensreihenfolge, die Nummern sind daher breit genug für lange Videos
+def frame_path(output_frames_dir, idx):
+    return os.path.join(output_frames_dir, f"frame_{idx:06d}.jpg")
+
+class MotionGate:
+    """
+    Bewegungsprüfung gegenüber dem zuletzt gespeicherten Frame. Kandidaten werden gesammelt, bis ein Batch voll
+    ist; jeder Frame, dessen Bewegung die Schwelle überschreitet, wird an write übergeben und wird zur neuen Referenz.
+    """
+
+    def __init__(self, estimator, motion_threshold, batch_size, write, debug=False):
+        self.estimator = estimator
+        self.motion_threshold = motion_threshold
+        self.batch_size = batch_size
+        self.write = write
+        self.debug = debug
+        self.kept_count = 0
+        self.candidates = []  # (idx, frame), die die Qualitätsprüfung bestanden haben und auf RAFT warten
+
+    def _keep(self, idx, frame):
+        self.write(idx, frame)
+        self.estimator.set_reference(frame)
+        self.kept_count += 1
+
+    def _evaluate(self):
+        hit, motions = self.estimator.first_moving([frame for _, frame in self.candidates], self.motion_threshold)
+        for (idx, _), motion in zip(self.candidates, motions):
+            if self.debug and motion is not None and motion <= self.motion_threshold:
+                print(f"[{idx}] 🔸 Zu wenig Bewegung ({motion:.3f})")
+        if hit is None:
+            self.candidates = []
+            return
+        idx, frame = self.candidates[hit]
+        self._keep(idx, frame)
+        if self.debug:
+            print(f"[{idx}] ✅ Gespeichert (Bewegung: {motions[hit]:.3f})")
+        # Kandidaten nach dem gespeicherten Frame werden gegen die neue Referenz erneut geprüft
+        self.candidates = self.candidates[hit + 1 :]
+
+    def push(self, idx, frame):
+        if self.estimator.reference is None:
+            self._keep(idx, frame)
+            if self.debug:
+                print(f"[{idx}] ✅ Erstes Bild gespeichert")
+            return
+        self.candidates.append((idx, frame))
+        while len(self.candidates) >= self.batch_size:
+            self._evaluate()
+
+    def flush(self):
+        while self.candidates:
+            self._evaluate()
+
+# Gemeinsame Auswahl für Video und Einzelbilder, alle Schritte nacheinander in einem Thread
+def select_frames(frames, output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug=False):
+    gate = MotionGate(estimator, motion_threshold, batch_size, lambda idx, frame: cv2.imwrite(frame_path(output_frames_dir, idx), frame), debug)
+    for idx, frame in frames:
+        if check_quality(idx, frame, sharpness_threshold, exposure_threshold, debug):
+            gate.push(idx, frame)
+        progress_bar.update(1)
+    gate.flush()
+    return gate.kept_count
+
+class StageStats:
+    """Frames, aktive Zeit und Füllstand der Eingangs-Queue einer Pipeline-Stufe."""
+
+    def __init__(self, name, input_queue=None, workers=1):
+        self.name = name
+        self.input_queue = input_queue
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.occupancy_sum = 0
+        self.occupancy_max = 0
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def sample_queue(self):
+        occupancy = self.input_queue.qsize()
+        with self.lock:
+            self.occupancy_sum += occupancy
+            self.occupancy_max = max(self.occupancy_max, occupancy)
+            self.samples += 1
+
+    def add(self, seconds, items=1):
+        with self.lock:
+            self.items += items
+            self.busy += seconds
+
+    def utilization(self, wall):
+        return self.busy / (wall * self.workers) if wall > 0 else 0.0
+
+# Auslastung je Stufe ausgeben. Eine volle Eingangs-Queue zeigt die begrenzende Stufe, eine leere eine wartende Stufe.
+def print_pipeline_report(stages, wall):
+    print(f"\n📊 Pipeline-Auslastung ({wall:.1f} s)")
+    for stage in stages:
+        rate = stage.items / stage.busy if stage.busy > 0 else 0.0
+        line = f"  {stage.name:<16} {stage.items:7d} Frames  {rate:8.1f} Frames/s aktiv  Auslastung {stage.utilization(wall):6.1%}"
+        if stage.input_queue is not None and stage.samples:
+            line += f"  Eingangs-Queue Ø {stage.occupancy_sum / stage.samples:4.1f} / max {stage.occupancy_max} von {stage.input_queue.maxsize}"
+        print(line)
+    bottleneck = max(stages, key=lambda stage: stage.utilization(wall))
+    print(f"  ⏱️ Engpass: {bottleneck.name}")
+
+# Wie select_frames, aber Dekodieren, Qualitätsprüfung, RAFT und JPEG-Schreiben laufen als Stufen über begrenzte Queues parallel.
+# RAFT läuft im aufrufenden Thread, die Auswahl ist daher identisch zu select_frames.
+def select_frames_pipelined(frames, output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug=False, queue_size=8, writers=4):
+    done = object()
+    errors = []
+    # Wird bei einem Fehler in irgendeiner Stufe gesetzt, damit keine Stufe an einer vollen oder leeren Queue hängen bleibt
+    stop = threading.Event()
+    decoded = queue.Queue(maxsize=queue_size)
+    checked = queue.Queue(maxsize=queue_size)
+    to_write = queue.Queue(maxsize=queue_size)
+    decode_stats = StageStats("Dekodieren")
+    quality_stats = StageStats("Qualität", decoded)
+    flow_stats = StageStats("Bewegung", checked)
+    write_stats = StageStats("Schreiben", to_write, workers=writers)
+
+    def put(q, item):
+        # False, wenn die Pipeline abgebrochen wurde
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        # done, wenn die Pipeline abgebrochen wurde
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return done
+
+    def start_thread(target, finish):
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                finish()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def decode_stage():
+        frame_iter = iter(frames)
+        while True:
+            start = time.perf_counter()
+            item = next(frame_iter, done)
+            if item is done:
+                return
+            decode_stats.add(time.perf_counter() - start)
+            if not put(decoded, item):
+                return
+
+    def quality_stage():
+        while True:
+            quality_stats.sample_queue()
+            item = get(decoded)
+            if item is done:
+                return
+            start = time.perf_counter()
+            passed = check_quality(*item, sharpness_threshold, exposure_threshold, debug)
+            quality_stats.add(time.perf_counter() - start)
+            progress_bar.update(1)
+            if passed and not put(checked, item):
+                return
+
+    def write_stage():
+        while True:
+            write_stats.sample_queue()
+            item = get(to_write)
+            if item is done:
+                return
+            start = time.perf_counter()
+            idx, frame = item
+            cv2.imwrite(frame_path(output_frames_dir, idx), frame)
+            write_stats.add(time.perf_counter() - start)
+
+    write_wait = 0.0
+
+    def enqueue_write(idx, frame):
+        nonlocal write_wait
+        start = time.perf_counter()
+        put(to_write, (idx, frame))
+        write_wait += time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    threads = [
+        start_thread(decode_stage, lambda: put(decoded, done)),
+        start_thread(quality_stage, lambda: put(checked, done)),
+    ]
+    writer_threads = [start_thread(write_stage, lambda: None) for _ in range(writers)]
+
+    gate = MotionGate(estimator, motion_threshold, batch_size, enqueue_write, debug)
+    try:
+        while True:
+            flow_stats.sample_queue()
+            item = get(checked)
+            if item is done:
+                break
+            start, wait_before = time.perf_counter(), write_wait
+            gate.push(*item)
+            flow_stats.add(time.perf_counter() - start - (write_wait - wait_before))
+        if not stop.is_set():
+            start, wait_before = time.perf_counter(), write_wait
+            gate.flush()
+            flow_stats.add(time.perf_counter() - start - (write_wait - wait_before), items=0)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for _ in writer_threads:
+            put(to_write, done)
+        for thread in writer_threads + threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    print_pipeline_report([decode_stats, quality_stats, flow_stats, write_stats], time.perf_counter() - wall_start)
+    return gate.kept_count
 
 # Verarbeitung von Video
-def process_video(input_video_path, output_frames_dir, motion_threshold=2.0, sharpness_threshold=100.0, exposure_threshold=240.0, debug=False):
+def process_video(input_video_path, output_frames_dir, motion_threshold=2.0, sharpness_threshold=100.0, exposure_threshold=240.0, debug=False, estimator=None, batch_size=1, pipelined=True, queue_size=8, writers=4):
     cap = cv2.VideoCapture(input_video_path)
     if not cap.isOpened():
         print("❌ Fehler beim Öffnen des Videos!")
@@ -56,61 +389,29 @@ def process_video(input_video_path, output_frames_dir, motion_threshold=2.0, sha
     os.makedirs(output_frames_dir, exist_ok=True)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     progress_bar = tqdm(total=total_frames, desc="🔍 Verarbeite Frames", unit="Frame", disable=debug)
+    estimator = estimator or MotionEstimator()
+    frame_count = 0
 
-    frame_idx = 0
-    kept_count = 0
-    prev_frame = None
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        b_is_blurry, variance = is_blurry(frame, threshold=sharpness_threshold)
-        if b_is_blurry:
-            if debug:
-                print(f"[{frame_idx}] ❌ Unscharf: {variance:.2f}")
-            frame_idx += 1
-            progress_bar.update(1)
-            continue
+    def read_frames():
+        nonlocal frame_count
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_count, frame
+            frame_count += 1
 
-        b_is_overexposed, mean_brightness = is_overexposed(frame, threshold=exposure_threshold)
-        if b_is_overexposed:
-            if debug:
-                print(f"[{frame_idx}] ❌ Überbelichtet: {mean_brightness:.2f}")
-            frame_idx += 1
-            progress_bar.update(1)
-            continue
-
-        if prev_frame is not None:
-            motion_intensity = calculate_optical_flow(prev_frame, frame)
-            if motion_intensity > motion_threshold:
-                frame_filename = f"frame_{frame_idx:04d}.jpg"
-                cv2.imwrite(os.path.join(output_frames_dir, frame_filename), frame)
-                kept_count += 1
-                if debug:
-                    print(f"[{frame_idx}] ✅ Gespeichert (Bewegung: {motion_intensity:.3f}, Sharpness: {variance:.3f}, Mean_Brightness: {mean_brightness:.3f})")
-                prev_frame = frame
-            else:
-                if debug:
-                    print(f"[{frame_idx}] 🔸 Zu wenig Bewegung ({motion_intensity:.3f})")
-        else:
-            frame_filename = f"frame_{frame_idx:04d}.jpg"
-            cv2.imwrite(os.path.join(output_frames_dir, frame_filename), frame)
-            kept_count += 1
-            if debug:
-                print(f"[{frame_idx}] ✅ Erstes Bild gespeichert")
-            prev_frame = frame
-
-        frame_idx += 1
-        progress_bar.update(1)
+    if pipelined:
+        kept_count = select_frames_pipelined(read_frames(), output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug, queue_size, writers)
+    else:
+        kept_count = select_frames(read_frames(), output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug)
 
     cap.release()
     progress_bar.close()
-    print(f"\n🎉 {kept_count} von {frame_idx} Frames wurden gespeichert in '{output_frames_dir}'")
+    print(f"\n🎉 {kept_count} von {frame_count} Frames wurden gespeichert in '{output_frames_dir}'")
 
 # Verarbeitung von Einzelbildern
-def process_images(input_images_dir, output_frames_dir, motion_threshold=2.0, sharpness_threshold=100.0, exposure_threshold=240.0, debug=False):
+def process_images(input_images_dir, output_frames_dir, motion_threshold=2.0, sharpness_threshold=100.0, exposure_threshold=240.0, debug=False, estimator=None, batch_size=1, pipelined=True, queue_size=8, writers=4):
     image_files = sorted([
         os.path.join(input_images_dir, f)
         for f in os.listdir(input_images_dir)
@@ -123,53 +424,13 @@ def process_images(input_images_dir, output_frames_dir, motion_threshold=2.0, sh
 
     os.makedirs(output_frames_dir, exist_ok=True)
     progress_bar = tqdm(total=len(image_files), desc="🔍 Verarbeite Bilder", unit="Bild", disable=debug)
+    estimator = estimator or MotionEstimator()
 
-    kept_count = 0
-    prev_frame = None
-
-    for idx, image_path in enumerate(image_files):
-        frame = cv2.imread(image_path)
-        if frame is None:
-            if debug:
-                print(f"[{idx}] ⚠️ Bild konnte nicht geladen werden: {image_path}")
-            progress_bar.update(1)
-            continue
-
-        b_is_blurry, variance = is_blurry(frame, threshold=sharpness_threshold)
-        if b_is_blurry:
-            if debug:
-                print(f"[{idx}] ❌ Unscharf: {variance:.2f}")
-            progress_bar.update(1)
-            continue
-
-        b_is_overexposed, mean_brightness = is_overexposed(frame, threshold=exposure_threshold)
-        if b_is_overexposed:
-            if debug:
-                print(f"[{idx}] ❌ Überbelichtet: {mean_brightness:.2f}")
-            progress_bar.update(1)
-            continue
-
-        if prev_frame is not None:
-            motion_intensity = calculate_optical_flow(prev_frame, frame)
-            if motion_intensity > motion_threshold:
-                frame_filename = f"frame_{idx:04d}.jpg"
-                cv2.imwrite(os.path.join(output_frames_dir, frame_filename), frame)
-                kept_count += 1
-                if debug:
-                    print(f"[{idx}] ✅ Gespeichert (Bewegung: {motion_intensity:.3f}, Sharpness: {variance:.3f}, Mean_Brightness: {mean_brightness:.3f})")
-                prev_frame = frame
-            else:
-                if debug:
-                    print(f"[{idx}] 🔸 Zu wenig Bewegung ({motion_intensity:.3f})")
-        else:
-            frame_filename = f"frame_{idx:04d}.jpg"
-            cv2.imwrite(os.path.join(output_frames_dir, frame_filename), frame)
-            kept_count += 1
-            if debug:
-                print(f"[{idx}] ✅ Erstes Bild gespeichert")
-            prev_frame = frame
-
-        progress_bar.update(1)
+    frames = ((idx, cv2.imread(image_path)) for idx, image_path in enumerate(image_files))
+    if pipelined:
+        kept_count = select_frames_pipelined(frames, output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug, queue_size, writers)
+    else:
+        kept_count = select_frames(frames, output_frames_dir, estimator, motion_threshold, sharpness_threshold, exposure_threshold, batch_size, progress_bar, debug)
 
     progress_bar.close()
     print(f"\n🎉 {kept_count} von {len(image_files)} Bildern wurden gespeichert in '{output_frames_dir}'")
@@ -183,9 +444,27 @@ if __name__ == "__main__":
     parser.add_argument('--sharpness_threshold', type=float, default=100.0, help='Unschärfeschwelle')
     parser.add_argument('--exposure_threshold', type=float, default=240.0, help='Helligkeitsschwelle')
     parser.add_argument('--debug', action='store_true', help='Aktiviere Debugmodus mit detaillierten Ausgaben')
+    parser.add_argument('--model', choices=['auto', 'large', 'small'], default='auto', help='RAFT-Modell. auto: large auf GPU, small auf CPU')
+    parser.add_argument('--flow_scale', type=float, default=None, help='Skalierung der Flow-Auflösung relativ zu 960x520 (Standard: 1.0 auf GPU, 0.5 auf CPU)')
+    parser.add_argument('--batch_size', type=int, default=1, help='Anzahl Kandidaten-Frames pro RAFT-Forward-Pass gegen den letzten gespeicherten Frame')
+    parser.add_argument('--pregate', choices=['none', 'phase'], default='none', help='Günstige Vorabschätzung per Phasenkorrelation, überspringt RAFT bei eindeutiger Bewegung')
+    parser.add_argument('--pregate_low', type=float, default=0.25, help='Unterhalb von pregate_low * motion_threshold gilt ein Frame ohne RAFT als zu wenig bewegt')
+    parser.add_argument('--pregate_high', type=float, default=4.0, help='Oberhalb von pregate_high * motion_threshold wird ein Frame ohne RAFT gespeichert')
+    parser.add_argument('--sequential', action='store_true', help='Alle Schritte nacheinander in einem Thread ausführen statt als Pipeline')
+    parser.add_argument('--queue_size', type=int, default=8, help='Maximale Anzahl Frames je Queue zwischen den Pipeline-Stufen')
+    parser.add_argument('--writers', type=int, default=4, help='Anzahl Threads zum Schreiben der JPEGs')
 
     args = parser.parse_args()
 
+    on_gpu = device.type == "cuda"
+    estimator = MotionEstimator(
+        model=args.model if args.model != 'auto' else ('large' if on_gpu else 'small'),
+        flow_scale=args.flow_scale if args.flow_scale is not None else (1.0 if on_gpu else 0.5),
+        pregate=args.pregate,
+        pregate_low=args.pregate_low,
+        pregate_high=args.pregate_high,
+    )
+
     if os.path.isdir(args.input_path):
         process_images(
             args.input_path,
@@ -193,7 +472,12 @@ if __name__ == "__main__":
             motion_threshold=args.motion_threshold,
             sharpness_threshold=args.sharpness_threshold,
             exposure_threshold=args.exposure_threshold,
-            debug=args.debug
+            debug=args.debug,
+            estimator=estimator,
+            batch_size=args.batch_size,
+            pipelined=not args.sequential,
+            queue_size=args.queue_size,
+            writers=args.writers
         )
     else:
         process_video(
@@ -202,5 +486,10 @@ if __name__ == "__main__":
             motion_threshold=args.motion_threshold,
             sharpness_threshold=args.sharpness_threshold,
             exposure_threshold=args.exposure_threshold,
-            debug=args.debug
+            debug=args.debug,
+            estimator=estimator,
+            batch_size=args.batch_size,
+            pipelined=not args.sequential,
+            queue_size=args.queue_size,
+            writers=args.writers
         )
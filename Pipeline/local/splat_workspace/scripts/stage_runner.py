@@ -0,0 +1,296 @@
+import hashlib
+import inspect
+import json
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+
+class Stage:
+    """
+    One pipeline stage. run(*args) reads the input paths and writes the output paths, which are files or
+    directories. A stage whose inputs, parameters and code of run are unchanged is not run again: its outputs are
+    restored from the cache.
+    """
+
+    def __init__(self, name, run, args, inputs, outputs, params=None):
+        self.name = name
+        self.run = run
+        self.args = tuple(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+
+
+def order_stages(stages):
+    """Stages in an order where every stage comes after the stages producing its inputs."""
+    producers = {output: stage for stage in stages for output in stage.outputs}
+    ordered, visiting = [], set()
+
+    def visit(stage):
+        if stage in ordered:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Stage {stage.name} depends on itself")
+        visiting.add(stage.name)
+        for path in stage.inputs:
+            for output, producer in producers.items():
+                if producer is not stage and (path == output or path.startswith(output.rstrip("/") + "/")):
+                    visit(producer)
+        visiting.discard(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def copy_path(src, dst):
+    remove_path(dst)
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+class ContentHasher:
+    """SHA-256 of files and directory trees. File hashes are reused while size and mtime do not change."""
+
+    def __init__(self):
+        self.memo = {}
+
+    def file(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self.memo:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self.memo[key] = digest.hexdigest()
+        return self.memo[key]
+
+    def path(self, path):
+        """Hash of a file, or of the relative paths and contents of all files of a directory. None if missing."""
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode() + b"\0" + self.file(file_path).encode())
+        return digest.hexdigest()
+
+
+def process_tree_rss():
+    """Resident memory in bytes of this process and all its descendants, from /proc."""
+    parents = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # The command name in parentheses may contain spaces
+                parents[int(pid)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree = {os.getpid()}
+    added = True
+    while added:
+        added = False
+        for pid, parent in parents.items():
+            if parent in tree and pid not in tree:
+                tree.add(pid)
+                added = True
+    rss = 0
+    for pid in tree:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                rss += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss
+
+
+def gpu_memory_used():
+    """Memory in bytes used on all visible GPUs, or None without nvidia-smi."""
+    try:
+        output = subprocess.run(
+            ["nvidia-smi", "--query-gpu=memory.used", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10, check=True
+        ).stdout
+        return sum(int(line) for line in output.split()) << 20
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+class ResourceMonitor:
+    """Samples the peak memory of the process tree and the GPUs in the background while a stage runs."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_gpu = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _sample(self):
+        self.peak_rss = max(self.peak_rss, process_tree_rss() if os.path.isdir("/proc") else 0)
+        gpu = gpu_memory_used()
+        if gpu is not None:
+            self.peak_gpu = max(self.peak_gpu or 0, gpu)
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        self._sample()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        self._sample()
+        # Children that peaked between two samples, ru_maxrss is in kilobytes
+        children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if children_maxrss > self.children_maxrss:
+            self.peak_rss = max(self.peak_rss, children_maxrss * 1024)
+
+
+class StageRunner:
+    """
+    Runs stages in dependency order with a content-addressed cache. The cache key of a stage is the hash of its
+    name, code, parameters and the content of its inputs. After a stage ran, its outputs are copied to
+    <cache_dir>/<stage>/<key>/ together with a manifest of all hashes. A later run with the same key restores the
+    outputs instead of running the stage, so a rerun resumes after the last stage that succeeded, and runs that only
+    differ in e.g. the training iterations share the extraction and COLMAP results.
+    A JSON report with the status, wall time, peak RSS and peak GPU memory of every stage is written to report_path.
+    """
+
+    def __init__(self, cache_dir, report_path, use_cache=True):
+        self.cache_dir = cache_dir
+        self.report_path = report_path
+        self.use_cache = use_cache
+        self.hasher = ContentHasher()
+        self.report = {"stages": []}
+
+    def stage_key(self, stage, input_hashes):
+        try:
+            code = inspect.getsource(stage.run)
+        except (OSError, TypeError):
+            code = stage.run.__qualname__
+        payload = json.dumps(
+            {"stage": stage.name, "code": code, "args": stage.args, "params": stage.params, "inputs": input_hashes},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _write_report(self):
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path + ".tmp", "w") as f:
+            json.dump(self.report, f, indent=4)
+        os.replace(self.report_path + ".tmp", self.report_path)
+
+    def _restore(self, stage, entry_dir, manifest):
+        """Put the cached outputs of a stage in place, keeping outputs that already match."""
+        for i, path in enumerate(stage.outputs):
+            if self.hasher.path(path) != manifest["outputs"][path]:
+                copy_path(os.path.join(entry_dir, "outputs", str(i)), path)
+
+    def _store(self, stage, entry_dir, manifest):
+        """
+        Copy the outputs of a stage to the cache. Every job writes to its own temporary directory, which is renamed to
+        the entry at once, so concurrent jobs see it complete. Containers all run as PID 1, so the directory is unique
+        by name rather than by PID.
+        """
+        stage_dir = os.path.dirname(entry_dir)
+        os.makedirs(stage_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=stage_dir, prefix=os.path.basename(entry_dir) + ".tmp-")
+        try:
+            for i, path in enumerate(stage.outputs):
+                copy_path(path, os.path.join(tmp_dir, "outputs", str(i)))
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=4)
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another job stored the same entry first, or the copy failed
+            remove_path(tmp_dir)
+            if not os.path.exists(os.path.join(entry_dir, "manifest.json")):
+                raise
+
+    def run_stage(self, stage):
+        record = {"name": stage.name, "params": stage.params}
+        self.report["stages"].append(record)
+        start = time.perf_counter()
+        try:
+            input_hashes = {path: self.hasher.path(path) for path in stage.inputs}
+            missing = [path for path, digest in input_hashes.items() if digest is None]
+            if missing:
+                raise FileNotFoundError(f"Stage {stage.name} is missing its inputs {missing}")
+            key = self.stage_key(stage, input_hashes)
+            entry_dir = os.path.join(self.cache_dir, stage.name, key)
+            manifest_path = os.path.join(entry_dir, "manifest.json")
+            record.update(key=key, inputs=input_hashes)
+
+            if self.use_cache and os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+                self._restore(stage, entry_dir, manifest)
+                record.update(status="cached", outputs=manifest["outputs"])
+                print(f"Stage {stage.name}: unchanged, reusing the cached outputs.")
+                return
+
+            for path in stage.outputs:
+                remove_path(path)
+            with ResourceMonitor() as monitor:
+                stage.run(*stage.args)
+            output_hashes = {path: self.hasher.path(path) for path in stage.outputs}
+            missing = [path for path, digest in output_hashes.items() if digest is None]
+            if missing:
+                raise RuntimeError(f"Stage {stage.name} did not produce {missing}")
+            record.update(
+                status="ran",
+                outputs=output_hashes,
+                peak_rss_mb=round(monitor.peak_rss / (1 << 20), 1),
+                peak_gpu_memory_mb=None if monitor.peak_gpu is None else round(monitor.peak_gpu / (1 << 20), 1),
+            )
+            if self.use_cache:
+                manifest = {
+                    "stage": stage.name, "key": key, "params": stage.params,
+                    "inputs": input_hashes, "outputs": output_hashes, "created": time.time(),
+                }
+                self._store(stage, entry_dir, manifest)
+        except BaseException as e:
+            record.update(status="failed", error=str(e))
+            raise
+        finally:
+            record["wall_time_s"] = round(time.perf_counter() - start, 3)
+            self._write_report()
+
+    def run(self, stages):
+        """Run all stages in dependency order, stopping at the first failure."""
+        start = time.perf_counter()
+        try:
+            for stage in order_stages(stages):
+                self.run_stage(stage)
+        finally:
+            self.report["wall_time_s"] = round(time.perf_counter() - start, 3)
+            self._write_report()
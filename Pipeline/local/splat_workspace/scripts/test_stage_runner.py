@@ -0,0 +1,118 @@
+"""
+Test caching, resuming and the report of the stage runner
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from stage_runner import Stage, StageRunner
+
+calls = []
+
+
+def count_lines(in_path, out_path):
+    calls.append("count")
+    with open(in_path) as f:
+        lines = f.readlines()
+    os.makedirs(out_path, exist_ok=True)
+    with open(os.path.join(out_path, "count.txt"), "w") as f:
+        f.write(str(len(lines)))
+
+
+def scale(in_dir, out_path, factor):
+    calls.append("scale")
+    if factor < 0:
+        raise RuntimeError("negative factor")
+    with open(os.path.join(in_dir, "count.txt")) as f:
+        count = int(f.read())
+    with open(out_path, "w") as f:
+        f.write(str(count * factor))
+
+
+def make_stages(workspace, factor):
+    data, counted, scaled = (os.path.join(workspace, name) for name in ("data.txt", "counted", "scaled.txt"))
+    # Declared out of order, the runner orders them by their inputs and outputs
+    return [
+        Stage("scale", scale, (counted, scaled, factor), inputs=[counted], outputs=[scaled], params={"factor": factor}),
+        Stage("count", count_lines, (data, counted), inputs=[data], outputs=[counted]),
+    ]
+
+
+def run(workspace, cache_dir, factor=2):
+    calls.clear()
+    report_path = os.path.join(workspace, "report.json")
+    try:
+        StageRunner(str(cache_dir), report_path).run(make_stages(str(workspace), factor))
+    finally:
+        with open(report_path) as f:
+            report = json.load(f)
+    return {stage["name"]: stage["status"] for stage in report["stages"]}, report
+
+
+def test_stage_runner(tmp_path):
+    workspace, cache_dir = tmp_path / "job1", tmp_path / "cache"
+    workspace.mkdir()
+    (workspace / "data.txt").write_text("a\nb\nc\n")
+
+    statuses, report = run(workspace, cache_dir)
+    assert statuses == {"count": "ran", "scale": "ran"} and calls == ["count", "scale"]
+    assert (workspace / "scaled.txt").read_text() == "6"
+    stage = report["stages"][0]
+    assert stage["wall_time_s"] >= 0 and stage["peak_rss_mb"] > 0 and "peak_gpu_memory_mb" in stage
+    assert set(stage["inputs"]) == {str(workspace / "data.txt")} and set(stage["outputs"]) == {str(workspace / "counted")}
+
+    # Nothing changed
+    statuses, _ = run(workspace, cache_dir)
+    assert statuses == {"count": "cached", "scale": "cached"} and calls == []
+
+    # Only a parameter of the last stage changed, in a new job with an empty workspace at the same path
+    shutil.rmtree(workspace)
+    workspace.mkdir()
+    (workspace / "data.txt").write_text("a\nb\nc\n")
+    statuses, _ = run(workspace, cache_dir, factor=3)
+    assert statuses == {"count": "cached", "scale": "ran"} and calls == ["scale"]
+    assert (workspace / "counted" / "count.txt").read_text() == "3"
+    assert (workspace / "scaled.txt").read_text() == "9"
+
+    # The input changed
+    (workspace / "data.txt").write_text("a\n")
+    statuses, _ = run(workspace, cache_dir)
+    assert statuses == {"count": "ran", "scale": "ran"}
+    assert (workspace / "scaled.txt").read_text() == "2"
+
+
+def test_stage_runner_resumes_after_failure(tmp_path):
+    workspace, cache_dir = tmp_path / "job", tmp_path / "cache"
+    workspace.mkdir()
+    (workspace / "data.txt").write_text("a\nb\n")
+
+    with pytest.raises(RuntimeError):
+        run(workspace, cache_dir, factor=-1)
+    with open(workspace / "report.json") as f:
+        failed = json.load(f)
+    assert [stage["status"] for stage in failed["stages"]] == ["ran", "failed"]
+    assert failed["stages"][1]["error"] == "negative factor"
+    assert not (workspace / "scaled.txt").exists()
+
+    # Only the failed stage runs again
+    statuses, _ = run(workspace, cache_dir, factor=5)
+    assert statuses == {"count": "cached", "scale": "ran"} and calls == ["scale"]
+    assert (workspace / "scaled.txt").read_text() == "10"
+
+
+def test_stage_runner_concurrent_store(tmp_path):
+    # A second job storing the same entry, e.g. from another container that also runs as PID 1, keeps the first one
+    # and leaves no temporary directory behind
+    (tmp_path / "data.txt").write_text("a\n")
+    stage = make_stages(str(tmp_path), 2)[1]
+    count_lines(*stage.args)
+    runners = [StageRunner(str(tmp_path / "cache"), str(tmp_path / f"report{i}.json")) for i in range(2)]
+    entry_dir = os.path.join(str(tmp_path / "cache"), "count", "key")
+    manifest = {"outputs": {stage.outputs[0]: "digest"}}
+    runners[0]._store(stage, entry_dir, manifest)
+    runners[1]._store(stage, entry_dir, manifest)
+    assert os.listdir(tmp_path / "cache" / "count") == ["key"]
+    assert (tmp_path / "cache" / "count" / "key" / "outputs" / "0" / "count.txt").read_text() == "1"
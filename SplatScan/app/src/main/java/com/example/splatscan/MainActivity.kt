@@ -33,6 +33,7 @@ import okhttp3.OkHttpClient
 import okhttp3.Request
 import okhttp3.RequestBody
 import okio.BufferedSink
+import org.json.JSONObject
 
 
 class MainActivity : AppCompatActivity() {
@@ -195,11 +196,16 @@ class MainActivity : AppCompatActivity() {
         }
     }
 
-    private fun startPollingJobStatus() {
+    private fun startPollingJobStatus(jobId: String?) {
         Thread {
             while (true) {
                 try {
-                    val statusUrl = "https://$urlPart.share.zrok.io/status"
+                    // Poll the own job, or any job for servers without a job queue
+                    val statusUrl = if (jobId != null) {
+                        "https://$urlPart.share.zrok.io/status?job_id=$jobId"
+                    } else {
+                        "https://$urlPart.share.zrok.io/status"
+                    }
                     val request = Request.Builder().url(statusUrl).get().build()
                     val client = OkHttpClient()
                     val response = client.newCall(request).execute()
@@ -285,6 +291,13 @@ class MainActivity : AppCompatActivity() {
                     .build()
 
                 val response = client.newCall(request).execute()
+                val responseBody = response.body?.string() ?: ""
+                // Servers with a job queue answer with the ID of the queued job
+                val jobId = try {
+                    JSONObject(responseBody).optString("job_id").ifEmpty { null }
+                } catch (e: Exception) {
+                    null
+                }
 
                 runOnUiThread {
                     uploadProgressBar.visibility = View.GONE
@@ -293,7 +306,7 @@ class MainActivity : AppCompatActivity() {
                         200 -> {
                             generatingLayout.visibility = View.VISIBLE // Spinner zeigen
                             Toast.makeText(this, "Upload successful, job started!", Toast.LENGTH_SHORT).show()
-                            startPollingJobStatus() // Polling starten, Jobstatus abfragen
+                            startPollingJobStatus(jobId) // Polling starten, Jobstatus abfragen
                         }
                         429 -> Toast.makeText(this, "Another video is being processed please wait", Toast.LENGTH_LONG).show()
                         else -> Toast.makeText(this, "Upload failed: ${response.code}", Toast.LENGTH_SHORT).show()
@@ -321,7 +334,9 @@ class MainActivity : AppCompatActivity() {
                 val responseBody = response.body?.string()
 
                 runOnUiThread {
-                    if (response.isSuccessful && responseBody?.contains("idle") == true) {
+                    // Servers with a job queue accept uploads while other jobs are running
+                    val hasJobQueue = responseBody?.contains("active_jobs") == true
+                    if (response.isSuccessful && (hasJobQueue || responseBody?.contains("idle") == true)) {
                         Toast.makeText(this, "Upload started...", Toast.LENGTH_SHORT).show()
                         isUploading = true
                         uploadVideo()